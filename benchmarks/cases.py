@@ -0,0 +1,152 @@
+"""Times the loaders and aggregations of one analysis directory.
+
+Run by ``run.py`` in a separate interpreter for every directory of a
+synthetic tree, so that the directory's own ``utils`` module and the
+``common`` package of that tree are imported. Timings are printed as JSON.
+
+    python benchmarks/cases.py <tree>/real_time_analysis --repeat 3
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+CLASSIFIERS = ['LDA', 'RDA', 'QDA']
+
+
+def _remove(pattern):
+    for path in glob.glob(pattern):
+        os.remove(path)
+
+
+def real_time_analysis_cases(data):
+    import pandas as pd
+    from utils import get_df_early_late, get_df_mean_rates
+    from utils import get_early_late_times
+    path = os.path.join(data, 'experimental_results.csv')
+    df = pd.read_csv(path)
+    df_average = get_df_early_late(df)
+    return [('read_csv', lambda: pd.read_csv(path)),
+            ('get_df_mean_rates', lambda: get_df_mean_rates(df)),
+            ('get_df_early_late', lambda: get_df_early_late(df)),
+            ('get_early_late_times',
+             lambda: get_early_late_times(df_average))]
+
+
+def emg_power_cases(data):
+    import pandas as pd
+    from utils import get_df_early_late
+    path = os.path.join(data, 'raw_emg_power_trial.csv')
+    df = pd.read_csv(path)
+    return [('read_csv', lambda: pd.read_csv(path)),
+            ('get_df_early_late', lambda: get_df_early_late(df))]
+
+
+def offline_analysis_cases(data):
+    from utils import load_results, load_confusion_matrices
+    from nonparametric import nonparametric_tests
+    results_path = os.path.join(data, 'offline_analysis_results.csv')
+    cm_path = os.path.join(data, 'confusion_matrices_all.npy')
+    results_df = load_results(results_path)
+
+    def load_cold():
+        _remove(os.path.join(data, '*.means.npy*'))
+        return load_confusion_matrices(cm_path)
+    return [('load_results', lambda: load_results(results_path)),
+            ('load_confusion_matrices[cold]', load_cold),
+            ('load_confusion_matrices[warm]',
+             lambda: load_confusion_matrices(cm_path)),
+            ('nonparametric_tests',
+             lambda: nonparametric_tests(results_df, value='logloss',
+                                         treatments=CLASSIFIERS))]
+
+
+def metrics_cases(data):
+    import pandas as pd
+    from utils import robust_reg_model_p
+    df = pd.read_csv(os.path.join(data, 'average_results.csv'))
+    return [('robust_reg_model_p',
+             lambda: robust_reg_model_p(df['Balanced cross-entropy loss'],
+                                        df['Average completion time']))]
+
+
+def confidence_rejection_cases(data):
+    import pandas as pd
+    from roc import threshold_index
+    path = os.path.join(data, 'roc_lateral.csv')
+    roc = pd.read_csv(path)
+    return [('read_csv', lambda: pd.read_csv(path)),
+            ('threshold_index',
+             lambda: threshold_index(roc.FPR.values, 0.0005))]
+
+
+def working_principle_cases(data):
+    from loaders import load_txt
+    from features import extract_features
+    from controller import control_state
+    emg_path = os.path.join(data, 'raw_emg_channel_1.txt')
+
+    def load_cold():
+        _remove(emg_path + '.npy*')
+        return load_txt(emg_path)
+    emg = load_txt(emg_path)
+    proba = load_txt(os.path.join(data, 'posterior_proba.txt'))
+    thresh = load_txt(os.path.join(data, 'rejection_thresholds.txt'))
+    return [('load_txt[cold]', load_cold),
+            ('load_txt[warm]', lambda: load_txt(emg_path)),
+            ('extract_features', lambda: extract_features(emg[:, None])),
+            ('control_state', lambda: control_state(proba, thresh))]
+
+
+CASES = {'real_time_analysis': real_time_analysis_cases,
+         'emg_power': emg_power_cases,
+         'offline_analysis': offline_analysis_cases,
+         'metrics': metrics_cases,
+         'confidence_rejection': confidence_rejection_cases,
+         'working_principle': working_principle_cases}
+
+
+def run_cases(directory, repeat=3):
+    """Times the cases of an analysis directory.
+
+    Parameters
+    ----------
+    directory : str
+        Analysis directory of a synthetic tree.
+    repeat : int (default: 3)
+        Number of runs of every case; the fastest is reported.
+
+    Returns
+    -------
+    records : list of dict
+        Name and time in seconds of every case.
+    """
+    directory = os.path.abspath(directory)
+    sys.path.insert(0, directory)
+    cases = CASES[os.path.basename(directory)](
+        os.path.join(directory, 'data'))
+    records = []
+    for name, func in cases:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        records.append({'name': name, 'time': min(times)})
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the functions of an analysis directory.")
+    parser.add_argument('directory', help="analysis directory")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs of every case (default: 3)")
+    args = parser.parse_args(argv)
+    json.dump(run_cases(args.directory, repeat=args.repeat), sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""Synthetic cohorts matching the schemas of all data files.
+
+The generated values only need to look plausible enough for every script to
+run; the sizes are what matters. A cohort is described by its number of
+subjects and trials and by the length of the real-time recording, and
+``scale_params`` derives these from a multiple of the shipped data set.
+
+Examples
+--------
+Write a cohort ten times the size of the shipped data set to ``cohort``:
+
+    python benchmarks/generate.py cohort --scale 10
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Size of the shipped data set
+N_SUBJECTS = 14
+N_AMPUTEES = 2
+N_TRIALS = 10
+RECORDING_SECONDS = 26.9
+
+# Constants of the experiments (see working_principle/features.py and
+# offline_analysis/confusion_store.py)
+RAW_FS = 2000
+PROC_FS = 20
+N_SENSORS = 16
+CLASSIFIERS = ['LDA', 'RDA', 'QDA']
+MOVEMENTS = ['rest', 'power', 'lateral', 'tripod', 'pointer', 'open']
+GROUPS = [('Able-bodied', 'AB'), ('Amputee', 'Amp')]
+
+ROC_POINTS_PER_BIN = 7 # ROC curve points per decision bin, as shipped
+TXT_CHUNK = 1 << 20 # Samples written to text files at once
+
+
+def scale_params(scale):
+    """Returns the cohort parameters for a multiple of the shipped data.
+
+    Subjects and recording length grow with ``scale``; the number of trials
+    per subject is that of the experiment.
+    """
+    return {'n_subjects': int(round(N_SUBJECTS * scale)),
+            'n_trials': N_TRIALS,
+            'recording_seconds': RECORDING_SECONDS * scale}
+
+
+def make_subjects(n_subjects):
+    """Subject registry with the same proportion of amputees as shipped."""
+    n_amputees = max(1, int(round(n_subjects * N_AMPUTEES / N_SUBJECTS)))
+    n_able = max(1, n_subjects - n_amputees)
+    participant = np.repeat([g for g, _ in GROUPS], [n_able, n_amputees])
+    abbreviation = np.repeat([a for _, a in GROUPS], [n_able, n_amputees])
+    return pd.DataFrame({'Subject number': np.arange(1, participant.size + 1),
+                         'Participant': participant,
+                         'Abbreviation': abbreviation})
+
+
+def make_experimental_results(subjects, n_trials, rng):
+    """Real-time trials (``real_time_analysis``); failed trials have no
+    completion time."""
+    n = len(subjects)
+    trial = np.tile(np.arange(1, n_trials + 1), n)
+    success = (rng.uniform(size=trial.size) < 0.85).astype(int)
+    # Completion times decrease with practice
+    time = (20. + 20. * np.exp(-(trial - 1) / 4.)) * rng.lognormal(
+        0., 0.25, trial.size)
+    return pd.DataFrame({
+        'Subject number': np.repeat(subjects['Subject number'].values,
+                                    n_trials),
+        'Participant': np.repeat(subjects['Participant'].values, n_trials),
+        'Trial': trial,
+        'Trial_success': success,
+        'Trial_time': np.where(success == 1, time, np.nan)})
+
+
+def make_emg_power(subjects, n_trials, rng):
+    """EMG variance of used and unused electrodes (``emg_power``)."""
+    n = len(subjects)
+    reps = n_trials * 2
+    trial = np.tile(np.repeat(np.arange(1, n_trials + 1), 2), n)
+    used = np.tile(['Used', 'Not used'], n * n_trials)
+    level = np.where(used == 'Used', 3e-9, 1.5e-9)
+    return pd.DataFrame({
+        'Subject number': np.repeat(subjects['Subject number'].values, reps),
+        'Subject type': np.repeat(subjects['Participant'].values, reps),
+        'Trial': trial,
+        'Electrodes': used,
+        'EMG variance': level * rng.lognormal(0., 0.3, trial.size)})
+
+
+def make_offline_results(subjects, rng):
+    """Offline cross-entropy loss for every classifier and number of
+    sensors (``offline_analysis``)."""
+    n, n_cls = len(subjects), len(CLASSIFIERS)
+    reps = N_SENSORS * n_cls
+    sensors = np.tile(np.repeat(np.arange(1, N_SENSORS + 1), n_cls), n)
+    offset = np.tile([0.1, 0., 0.2], n * N_SENSORS)
+    logloss = (0.35 + offset + 0.6 * np.exp(-(sensors - 1) / 3.)) * \
+        rng.lognormal(0., 0.15, sensors.size)
+    return pd.DataFrame({
+        'subject': np.repeat(subjects['Subject number'].values, reps),
+        'Classifier': np.tile(CLASSIFIERS, n * N_SENSORS),
+        'number of sensors': sensors,
+        'logloss': logloss,
+        'participant': np.repeat(subjects['Participant'].values, reps)})
+
+
+def make_confusion_matrices(subjects, rng):
+    """Confusion-matrix tensor and coordinates of its sidecar
+    (``offline_analysis``)."""
+    n_classes = len(MOVEMENTS)
+    shape = (len(subjects), N_SENSORS, len(CLASSIFIERS), n_classes,
+             n_classes)
+    rates = np.full((n_classes, n_classes), 50.)
+    np.fill_diagonal(rates, 1000.)
+    data = rng.poisson(rates, size=shape).astype(np.float64)
+    coords = {'subject': subjects['Subject number'].tolist(),
+              'group': subjects['Participant'].tolist(),
+              'n_sensors': list(range(1, N_SENSORS + 1)),
+              'classifier': list(CLASSIFIERS),
+              'true': list(MOVEMENTS),
+              'predicted': list(MOVEMENTS)}
+    return data, coords
+
+
+def make_average_results(subjects, rng):
+    """Offline metrics against real-time performance (``metrics``)."""
+    n = len(subjects)
+    loss = rng.uniform(0.3, 0.9, n)
+    return pd.DataFrame({
+        'Subject number': subjects['Subject number'].values,
+        'Participant': subjects['Participant'].values,
+        'Balanced classification accuracy': 100. - 30. * loss +
+            rng.normal(0., 2., n),
+        'Balanced cross-entropy loss': loss,
+        'Completion rate': rng.uniform(0.6, 1., n),
+        'Average completion time': 20. + 20. * loss + rng.normal(0., 3., n)})
+
+
+def make_roc(n_points, rng):
+    """ROC curve of one class (``confidence_rejection``)."""
+    fpr = np.sort(rng.beta(0.3, 3., n_points))
+    fpr[0] = 0.
+    tpr = np.maximum.accumulate(np.clip(
+        1. - (1. - fpr) ** 40 + rng.normal(0., 0.01, n_points), 0., 1.))
+    thresholds = np.linspace(1., 0., n_points, endpoint=False)
+    return pd.DataFrame({'Thresholds': thresholds, 'TPR': tpr, 'FPR': fpr})
+
+
+def make_session(n_bins, rng):
+    """Decision streams of a real-time session (``working_principle``),
+    without the raw EMG."""
+    n_classes = len(MOVEMENTS)
+    # Movements held for 1-3 s
+    lengths = rng.randint(PROC_FS, 3 * PROC_FS, n_bins // PROC_FS + 1)
+    pred = np.repeat(rng.randint(0, n_classes, lengths.size), lengths)
+    pred = pred[:n_bins]
+    logits = rng.normal(0., 1., (n_bins, n_classes))
+    logits[np.arange(n_bins), pred] += 6.
+    proba = np.exp(logits)
+    proba /= proba.sum(axis=1, keepdims=True)
+    thresholds = rng.uniform(0.9, 0.995, n_classes)
+    # Controller: accepted decisions of movements change the state
+    accept = (proba.max(axis=1) >= thresholds[pred]) & (pred != 0)
+    last = np.maximum.accumulate(np.where(accept, np.arange(n_bins), -1))
+    state = np.where(last >= 0, pred[np.maximum(last, 0)], 0)
+    return {'pred': pred.astype(np.float64), 'pred_proba': proba,
+            'state': state.astype(np.float64), 'thresh': thresholds}
+
+
+def write_emg(path, n_samples, rng):
+    """Writes a raw EMG channel in chunks, so that long recordings are not
+    held in memory."""
+    with open(path, 'wb') as f:
+        for start in range(0, n_samples, TXT_CHUNK):
+            size = min(TXT_CHUNK, n_samples - start)
+            t = np.arange(start, start + size) / float(RAW_FS)
+            envelope = 1e-5 * (1. + np.sin(2. * np.pi * t / 3.) ** 2)
+            np.savetxt(f, envelope * rng.normal(0., 1., size))
+
+
+def generate(root, n_subjects=N_SUBJECTS, n_trials=N_TRIALS,
+             recording_seconds=RECORDING_SECONDS, seed=0):
+    """Writes a synthetic cohort in the data layout of the repository.
+
+    Files are written to ``<root>/<directory>/data`` for every analysis
+    directory and the subject registry to ``<root>/common/data``.
+
+    Parameters
+    ----------
+    root : str
+        Output root.
+    n_subjects : int (default: N_SUBJECTS)
+        Number of subjects.
+    n_trials : int (default: N_TRIALS)
+        Number of real-time trials per subject.
+    recording_seconds : float (default: RECORDING_SECONDS)
+        Length of the real-time recording in ``working_principle``, which
+        also sets the number of points of the ROC curve.
+    seed : int (default: 0)
+        Random seed.
+
+    Returns
+    -------
+    sizes : dict
+        Size in bytes of every written file, keyed by path relative to
+        ``root``.
+    """
+    rng = np.random.RandomState(seed)
+    paths = {}
+
+    def path(directory, name):
+        data_dir = os.path.join(root, directory, 'data')
+        if not os.path.isdir(data_dir):
+            os.makedirs(data_dir)
+        paths[os.path.join(directory, 'data', name)] = None
+        return os.path.join(data_dir, name)
+
+    subjects = make_subjects(n_subjects)
+    subjects.to_csv(path('common', 'subjects.csv'), index=False)
+    make_experimental_results(subjects, n_trials, rng).to_csv(
+        path('real_time_analysis', 'experimental_results.csv'), index=False)
+    make_emg_power(subjects, n_trials, rng).to_csv(
+        path('emg_power', 'raw_emg_power_trial.csv'), index=False)
+    make_offline_results(subjects, rng).to_csv(
+        path('offline_analysis', 'offline_analysis_results.csv'),
+        index=False)
+    data, coords = make_confusion_matrices(subjects, rng)
+    np.save(path('offline_analysis', 'confusion_matrices_all.npy'), data)
+    del data
+    with open(path('offline_analysis', 'confusion_matrices_all.json'),
+              'w') as f:
+        json.dump({'axes': ['subject', 'n_sensors', 'classifier', 'true',
+                            'predicted'],
+                   'coords': coords}, f)
+    make_average_results(subjects, rng).to_csv(
+        path('metrics', 'average_results.csv'), index=False)
+
+    n_samples = int(round(recording_seconds * RAW_FS))
+    n_bins = max(n_samples // (RAW_FS // PROC_FS), 1)
+    make_roc(n_bins * ROC_POINTS_PER_BIN, rng).to_csv(
+        path('confidence_rejection', 'roc_lateral.csv'), index=False)
+    for channel in (1, 2):
+        write_emg(path('working_principle',
+                       'raw_emg_channel_{}.txt'.format(channel)),
+                  n_samples, rng)
+    session = make_session(n_bins, rng)
+    for name, filename in [('pred', 'prediction.txt'),
+                           ('pred_proba', 'posterior_proba.txt'),
+                           ('state', 'control_state.txt'),
+                           ('thresh', 'rejection_thresholds.txt')]:
+        np.savetxt(path('working_principle', filename), session[name])
+
+    return {p: os.path.getsize(os.path.join(root, p)) for p in paths}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic cohort matching all data schemas.")
+    parser.add_argument('root', help="output root")
+    parser.add_argument('--scale', type=float, default=1.,
+                        help="size relative to the shipped data set "
+                        "(default: 1)")
+    parser.add_argument('--subjects', type=int, default=None,
+                        help="number of subjects (overrides --scale)")
+    parser.add_argument('--trials', type=int, default=None,
+                        help="number of trials per subject")
+    parser.add_argument('--seconds', type=float, default=None,
+                        help="length of the real-time recording in seconds "
+                        "(overrides --scale)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    params = scale_params(args.scale)
+    for key, value in [('n_subjects', args.subjects),
+                       ('n_trials', args.trials),
+                       ('recording_seconds', args.seconds)]:
+        if value is not None:
+            params[key] = value
+    sizes = generate(args.root, seed=args.seed, **params)
+    for name in sorted(sizes):
+        print("{:<60} {:>12,d}".format(name, sizes[name]))
+
+
+if __name__ == '__main__':
+    main()
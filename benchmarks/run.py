@@ -0,0 +1,308 @@
+"""Benchmarks all loaders, aggregations and scripts on synthetic cohorts.
+
+For every scale (a multiple of the shipped data set, see
+``generate.scale_params``), the code of the analysis directories and of
+``common`` is copied to a temporary tree, a synthetic cohort is written to
+its data directories and
+
+* the functions of every directory are timed (see ``cases.py``),
+* every figure and report script is run with stage tracing (see
+  ``common.instrumentation``), so that time and peak memory are recorded
+  for the whole script and for its stages. Scripts are run ``--runs``
+  times; runs after the first use the caches written by the first one.
+
+Results are saved as JSON records and summarised with the empirical
+scaling exponent between consecutive scales (1 for linear scaling). Given
+a baseline from an earlier run, benchmarks slower than the baseline by more
+than ``--tolerance`` are reported and the exit status is non-zero.
+
+Examples
+--------
+    python benchmarks/run.py --output benchmarks.json
+    python benchmarks/run.py --scales 10 100 --baseline benchmarks.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.normpath(os.path.join(HERE, os.pardir))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from build_all import find_targets, run_target
+from cases import CASES
+from generate import generate, scale_params
+
+DEFAULT_SCALES = [10, 100, 1000]
+DEFAULT_TIMEOUT = 600
+
+# Generated or cached files not copied to the synthetic tree
+_IGNORE = shutil.ignore_patterns('data', '__pycache__', '*.pdf', '.*cache')
+
+
+def make_tree(root, params, seed=0):
+    """Copies the code to ``root`` and writes a synthetic cohort.
+
+    Returns
+    -------
+    sizes : dict
+        Size in bytes of every data file.
+    """
+    for directory in sorted(CASES) + ['common']:
+        shutil.copytree(os.path.join(ROOT, directory),
+                        os.path.join(root, directory), ignore=_IGNORE)
+    return generate(root, seed=seed, **params)
+
+
+def time_functions(root, repeat=3, timeout=DEFAULT_TIMEOUT):
+    """Times the cases of every analysis directory of a tree."""
+    records = []
+    for directory in sorted(CASES):
+        try:
+            proc = subprocess.run(
+                [sys.executable, os.path.join(HERE, 'cases.py'),
+                 os.path.join(root, directory), '--repeat', str(repeat)],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                universal_newlines=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            records.append({'target': directory, 'name': None, 'time': None,
+                            'status': 'timeout'})
+            continue
+        if proc.returncode != 0:
+            records.append({'target': directory, 'name': None, 'time': None,
+                            'status': 'failed', 'output': proc.stderr})
+            continue
+        for case in json.loads(proc.stdout):
+            records.append(dict(case, target=directory, status='ok'))
+    return [dict(r, kind='function') for r in records]
+
+
+def time_scripts(root, runs=1, timeout=DEFAULT_TIMEOUT, keywords=None):
+    """Runs every figure and report script of a tree with stage tracing."""
+    trace_dir = os.path.join(root, 'traces')
+    records = []
+    for target in find_targets(root=root, keywords=keywords):
+        for run in range(runs):
+            result = run_target(target, root=root, timeout=timeout,
+                                trace_dir=trace_dir)
+            status = ('ok' if result['returncode'] == 0 else
+                      'timeout' if result['returncode'] is None else
+                      'failed')
+            record = {'kind': 'script', 'target': target,
+                      'name': 'run {}'.format(run + 1),
+                      'time': result['time'], 'status': status}
+            if result['trace'] is not None:
+                record['peak_rss'] = result['trace']['peak_rss']
+                record['stages'] = [
+                    {key: s[key] for key in ('stage', 'wall_time',
+                                             'cpu_time', 'peak_rss')}
+                    for s in result['trace']['stages'] if s['depth'] == 0]
+            if status != 'ok':
+                record['output'] = result['output'][-2000:]
+            records.append(record)
+    return records
+
+
+def run_scale(scale, repeat=3, runs=1, timeout=DEFAULT_TIMEOUT,
+              keywords=None, seed=0, keep=None):
+    """Benchmarks all functions and scripts at one scale.
+
+    Parameters
+    ----------
+    scale : float
+        Size relative to the shipped data set.
+    repeat : int (default: 3)
+        Runs of every function; the fastest is reported.
+    runs : int (default: 1)
+        Runs of every script.
+    timeout : float (default: DEFAULT_TIMEOUT)
+        Timeout in seconds of every script and directory of functions.
+    keywords : list of str or None (default: None)
+        If not None, only scripts whose path contains any of the keywords
+        are run.
+    seed : int (default: 0)
+        Random seed of the cohort.
+    keep : str or None (default: None)
+        If not None, the synthetic tree is written to this directory and
+        kept; otherwise a temporary directory is used.
+
+    Returns
+    -------
+    records : list of dict
+        One record per function or script run, with the scale and cohort
+        parameters, time in seconds and status.
+    """
+    params = scale_params(scale)
+    root = keep or tempfile.mkdtemp(prefix='two_sensor_bench_')
+    try:
+        start = time.perf_counter()
+        sizes = make_tree(root, params, seed=seed)
+        generation = time.perf_counter() - start
+        records = [{'kind': 'generate', 'target': None, 'name': None,
+                    'time': generation, 'status': 'ok',
+                    'data_bytes': sum(sizes.values())}]
+        records += time_functions(root, repeat=repeat, timeout=timeout)
+        records += time_scripts(root, runs=runs, timeout=timeout,
+                                keywords=keywords)
+    finally:
+        if keep is None:
+            shutil.rmtree(root, ignore_errors=True)
+    return [dict(r, scale=scale, **params) for r in records]
+
+
+def benchmark_id(record):
+    return '{}:{}:{}'.format(record['kind'], record['target'] or '',
+                             record['name'] or '')
+
+
+def scaling_exponents(records):
+    """Returns the empirical scaling exponent of every benchmark between
+    consecutive scales, keyed by benchmark and pair of scales."""
+    times = {}
+    for r in records:
+        if r['status'] == 'ok' and r['time']:
+            times.setdefault(benchmark_id(r), {})[r['scale']] = r['time']
+    exponents = {}
+    for key, by_scale in times.items():
+        scales = sorted(by_scale)
+        for s1, s2 in zip(scales[:-1], scales[1:]):
+            exponents[key, s1, s2] = (
+                math.log(by_scale[s2] / by_scale[s1]) / math.log(s2 / s1))
+    return exponents
+
+
+def compare(records, baseline, tolerance=1.5, min_time=0.05):
+    """Finds benchmarks slower than in a baseline.
+
+    Parameters
+    ----------
+    records, baseline : list of dict
+        Records of ``run_scale``.
+    tolerance : float (default: 1.5)
+        Largest accepted ratio of time to baseline time.
+    min_time : float (default: 0.05)
+        Time differences below this many seconds are ignored.
+
+    Returns
+    -------
+    regressions : list of tuple
+        Benchmark, scale, time and baseline time (None if the baseline
+        succeeded and the benchmark did not).
+    """
+    reference = {(benchmark_id(r), r['scale']): r for r in baseline}
+    regressions = []
+    for r in records:
+        base = reference.get((benchmark_id(r), r['scale']))
+        if base is None or base['status'] != 'ok':
+            continue
+        if r['status'] != 'ok':
+            regressions.append((benchmark_id(r), r['scale'], None,
+                                base['time']))
+        elif (r['time'] > tolerance * base['time'] and
+              r['time'] - base['time'] > min_time):
+            regressions.append((benchmark_id(r), r['scale'], r['time'],
+                                base['time']))
+    return regressions
+
+
+def print_summary(records):
+    """Prints the time of every benchmark at every scale and its scaling
+    exponent between the two largest scales."""
+    scales = sorted(set(r['scale'] for r in records))
+    rows = {}
+    for r in records:
+        cell = ('{:.3f}'.format(r['time']) if r['status'] == 'ok'
+                else r['status'])
+        rows.setdefault(benchmark_id(r), {})[r['scale']] = cell
+    exponents = scaling_exponents(records)
+    print("{:<64}".format("Benchmark") +
+          "".join("{:>10}".format('{:g}x'.format(s)) for s in scales) +
+          "{:>10}".format("Exponent"))
+    for key in sorted(rows):
+        pairs = sorted((s1, s2) for k, s1, s2 in exponents if k == key)
+        exponent = ('{:.2f}'.format(exponents[(key,) + pairs[-1]])
+                    if pairs else '-')
+        print("{:<64}".format(key[:63]) +
+              "".join("{:>10}".format(rows[key].get(s, '-'))
+                      for s in scales) +
+              "{:>10}".format(exponent))
+
+
+def environment():
+    import numpy
+    import pandas
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'numpy': numpy.__version__,
+            'pandas': pandas.__version__}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark loaders, aggregations and scripts on "
+        "synthetic cohorts.")
+    parser.add_argument('--scales', type=float, nargs='+',
+                        default=DEFAULT_SCALES,
+                        help="sizes relative to the shipped data set "
+                        "(default: 10 100 1000)")
+    parser.add_argument('-k', '--keywords', nargs='+', default=None,
+                        help="only run scripts whose path contains any of "
+                        "these strings")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs of every function (default: 3)")
+    parser.add_argument('--runs', type=int, default=1,
+                        help="runs of every script (default: 1)")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help="timeout in seconds of every script "
+                        "(default: {})".format(DEFAULT_TIMEOUT))
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    parser.add_argument('--output', default=None,
+                        help="path of the JSON results")
+    parser.add_argument('--baseline', default=None,
+                        help="JSON results of an earlier run to compare "
+                        "against")
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="largest accepted slow-down relative to the "
+                        "baseline (default: 1.5)")
+    parser.add_argument('--keep', default=None, metavar='DIR',
+                        help="write the synthetic trees to sub-directories "
+                        "of DIR and keep them")
+    args = parser.parse_args(argv)
+
+    records = []
+    for scale in args.scales:
+        keep = (os.path.join(args.keep, '{:g}x'.format(scale))
+                if args.keep is not None else None)
+        records += run_scale(scale, repeat=args.repeat, runs=args.runs,
+                             timeout=args.timeout, keywords=args.keywords,
+                             seed=args.seed, keep=keep)
+    print_summary(records)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'records': records}, f,
+                      indent=2)
+    status = int(any(r['status'] != 'ok' for r in records))
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['records']
+        regressions = compare(records, baseline, tolerance=args.tolerance)
+        for key, scale, new, old in regressions:
+            print("Regression: {} at {:g}x: {} s (baseline {:.3f} s)".format(
+                key, scale, 'failed' if new is None else
+                '{:.3f}'.format(new), old))
+        status = status or int(bool(regressions))
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""Builds all figures and statistical reports in parallel.
+
+Every ``Figure_*.py``, ``statistical_comparisons.py`` and
+``summary_results.py`` script in the sub-directories is run in its own
+interpreter with the non-interactive Agg backend, so the total build time is
+roughly that of the slowest script. Console output and timings of every
+script are collected and printed in a fixed order.
+
+Examples
+--------
+Build everything, using one worker per CPU:
+
+    python build_all.py
+
+Build only Figure 3 and Figure 5 and save a JSON report:
+
+    python build_all.py -k Figure_3 Figure_5 --report build_report.json
+
+Record the time and memory use of the stages of every script (see
+``common.instrumentation``) and profile them:
+
+    python build_all.py --trace traces --profile
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common.instrumentation import PROFILE_ENV, START_ENV, TRACE_ENV
+from common.instrumentation import trace_name
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Script name patterns, in build order within each directory
+TARGET_PATTERNS = ['Figure_*.py', 'statistical_comparisons.py',
+                   'summary_results.py']
+
+
+def find_targets(root=ROOT, keywords=None, patterns=TARGET_PATTERNS):
+    """Finds the figure and report scripts of all sub-directories.
+
+    Parameters
+    ----------
+    root : str (default: ROOT)
+        Repository root.
+    keywords : list of str or None (default: None)
+        If not None, only scripts whose relative path contains any of the
+        keywords are returned.
+    patterns : list of str (default: TARGET_PATTERNS)
+        Script name patterns.
+
+    Returns
+    -------
+    targets : list of str
+        Paths of the scripts, relative to ``root``.
+    """
+    targets = []
+    for directory in sorted(os.listdir(root)):
+        if not os.path.isdir(os.path.join(root, directory)):
+            continue
+        for pattern in patterns:
+            paths = glob.glob(os.path.join(root, directory, pattern))
+            targets.extend(os.path.relpath(path, root)
+                           for path in sorted(paths))
+    if keywords:
+        targets = [t for t in targets if any(k in t for k in keywords)]
+    return targets
+
+
+def run_target(target, root=ROOT, timeout=None, trace_dir=None,
+               profile=False):
+    """Runs a script in a separate interpreter with the Agg backend.
+
+    Parameters
+    ----------
+    target : str
+        Path of the script, relative to ``root``.
+    root : str (default: ROOT)
+        Repository root.
+    timeout : float or None (default: None)
+        Timeout in seconds.
+    trace_dir : str or None (default: None)
+        If not None, the script writes a trace of its stages to this
+        directory, which is added to the result.
+    profile : bool (default: False)
+        Whether the script is also profiled. Only used with ``trace_dir``.
+
+    Returns
+    -------
+    result : dict
+        Target, return code (None on timeout), wall time in seconds,
+        combined stdout/stderr output and trace (None if not traced).
+    """
+    env = dict(os.environ, MPLBACKEND='Agg')
+    for name in (TRACE_ENV, PROFILE_ENV, START_ENV):
+        env.pop(name, None)
+    if trace_dir is not None:
+        env[TRACE_ENV] = os.path.abspath(trace_dir)
+        if profile:
+            env[PROFILE_ENV] = '1'
+        trace_path = os.path.join(trace_dir, trace_name(
+            os.path.join(root, target)) + '.json')
+        if os.path.exists(trace_path):
+            os.remove(trace_path) # Left by a previous build
+    start = time.time()
+    if trace_dir is not None:
+        # Traces then cover interpreter start-up and imports
+        env[START_ENV] = repr(start)
+    try:
+        proc = subprocess.run([sys.executable, os.path.join(root, target)],
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT,
+                              universal_newlines=True, env=env,
+                              timeout=timeout)
+        returncode, output = proc.returncode, proc.stdout
+    except subprocess.TimeoutExpired as e:
+        returncode = None
+        output = e.output or ''
+        if isinstance(output, bytes): # Not decoded on timeout
+            output = output.decode('utf-8', 'replace')
+        output += '\nTimed out after {} s.\n'.format(timeout)
+    elapsed = time.time() - start
+    trace = None
+    if trace_dir is not None and os.path.exists(trace_path):
+        with open(trace_path, 'r') as f:
+            trace = json.load(f)
+    return {'target': target, 'returncode': returncode,
+            'time': elapsed, 'output': output, 'trace': trace}
+
+
+def build(targets, n_jobs=None, root=ROOT, timeout=None, trace_dir=None,
+          profile=False):
+    """Runs scripts in parallel.
+
+    Parameters
+    ----------
+    targets : list of str
+        Paths of the scripts, relative to ``root``.
+    n_jobs : int or None (default: None)
+        Number of scripts run at once. If None, the number of CPUs is used.
+    root : str (default: ROOT)
+        Repository root.
+    timeout : float or None (default: None)
+        Timeout per script in seconds.
+    trace_dir : str or None (default: None)
+        Directory of the stage traces; if None, scripts are not traced.
+    profile : bool (default: False)
+        Whether traced scripts are also profiled.
+
+    Returns
+    -------
+    results : list of dict
+        Output of ``run_target`` for each target, in the order given.
+    """
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, len(targets)))
+    # Each script runs in its own process; threads only wait on them
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        return list(executor.map(
+            lambda target: run_target(target, root=root, timeout=timeout,
+                                      trace_dir=trace_dir, profile=profile),
+            targets))
+
+
+def print_stages(results):
+    """Prints the top-level stages of traced scripts, slowest first.
+
+    Repeated stages are summed, with the largest peak resident set size.
+    Interpreter start-up and the imports preceding instrumentation are shown
+    as ``(startup)`` and the rest of the time spent outside any stage as
+    ``(other)``.
+    """
+    print("{:<50} {:<10} {:>8} {:>8} {:>9}".format(
+        "Script", "Stage", "Wall [s]", "CPU [s]", "RSS [MiB]"))
+    for result in results:
+        trace = result.get('trace')
+        if not trace:
+            continue
+        totals = {}
+        for s in trace['stages']:
+            if s['depth'] == 0:
+                wall, cpu, rss = totals.get(s['stage'], (0., 0., None))
+                totals[s['stage']] = (
+                    wall + s['wall_time'], cpu + s['cpu_time'],
+                    max(rss, s['peak_rss']) if rss is not None
+                    else s['peak_rss'])
+        totals['(startup)'] = (trace['startup_wall_time'],
+                               trace['startup_cpu_time'], None)
+        totals['(other)'] = (
+            trace['wall_time'] - sum(t[0] for t in totals.values()),
+            trace['cpu_time'] - sum(t[1] for t in totals.values()),
+            trace['peak_rss'])
+        for name, (wall, cpu, rss) in sorted(totals.items(),
+                                             key=lambda item: -item[1][0]):
+            print("{:<50} {:<10} {:>8.2f} {:>8.2f} {:>9}".format(
+                result['target'], name, wall, cpu,
+                '{:.0f}'.format(rss) if rss is not None else '-'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build all figures and statistical reports.")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of scripts run at once "
+                        "(default: number of CPUs)")
+    parser.add_argument('-k', '--keywords', nargs='+', default=None,
+                        help="only run scripts whose path contains any of "
+                        "these strings")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="timeout per script in seconds")
+    parser.add_argument('--report', default=None,
+                        help="path of a JSON report with outputs and timings")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="do not print script outputs")
+    parser.add_argument('--trace', default=None, metavar='DIR',
+                        help="write a JSON trace of the stages of every "
+                        "script to this directory and print them")
+    parser.add_argument('--profile', action='store_true',
+                        help="with --trace, also save cProfile statistics "
+                        "of every script")
+    args = parser.parse_args(argv)
+
+    targets = find_targets(keywords=args.keywords)
+    if not targets:
+        parser.error("no scripts found")
+    start = time.time()
+    if args.profile and args.trace is None:
+        parser.error("--profile requires --trace")
+    results = build(targets, n_jobs=args.jobs, timeout=args.timeout,
+                    trace_dir=args.trace, profile=args.profile)
+    total = time.time() - start
+
+    if not args.quiet:
+        for result in results:
+            print("=" * 79)
+            print(result['target'])
+            print("=" * 79)
+            print(result['output'])
+    print("{:<50} {:>8} {:>10}".format("Script", "Status", "Time [s]"))
+    for result in results:
+        status = ('ok' if result['returncode'] == 0 else
+                  'timeout' if result['returncode'] is None else 'failed')
+        print("{:<50} {:>8} {:>10.1f}".format(result['target'], status,
+                                              result['time']))
+    print("Total wall time: {:.1f} s".format(total))
+    if args.trace is not None:
+        print_stages(results)
+
+    if args.report is not None:
+        with open(args.report, 'w') as f:
+            json.dump({'total_time': total, 'results': results}, f, indent=2)
+    return int(any(result['returncode'] != 0 for result in results))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
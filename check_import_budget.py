@@ -0,0 +1,161 @@
+"""Checks the import cost of the statistical analysis scripts.
+
+Every ``statistical_comparisons.py`` and ``summary_results.py`` script is
+run with ``python -X importtime`` (Python 3.7+). The check fails if a script
+imports a plotting library or if the total import time of its top-level
+imports exceeds its budget.
+
+Budgets are relative to the import time of the numerical libraries a script
+is expected to need (its reference imports), measured in the same run, so
+that they do not depend on the speed of the machine.
+
+Examples
+--------
+    python check_import_budget.py
+
+The allowance over the reference imports can be changed:
+
+    python check_import_budget.py --ratio 1.5 --margin 500
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from build_all import ROOT, find_targets
+
+STATS_PATTERNS = ['statistical_comparisons.py', 'summary_results.py']
+
+# Modules the statistical scripts must never import
+FORBIDDEN = ['matplotlib', 'seaborn']
+
+# Reference imports of the scripts. Scripts using scipy.stats are compared
+# with a larger reference than those depending on numpy and pandas only.
+DEFAULT_REFERENCE = 'numpy, pandas, scipy.stats'
+REFERENCES = {
+    os.path.join('real_time_analysis', 'summary_results.py'): 'numpy, pandas',
+}
+
+RATIO = 1.25 # Largest accepted ratio of import time to reference time
+MARGIN = 300 # Import time in milliseconds allowed on top of the ratio
+REFERENCE_RUNS = 2 # Runs of every reference; the slowest is used
+
+
+def import_times(target, root=ROOT):
+    """Runs a script with ``-X importtime`` and parses the timings.
+
+    Parameters
+    ----------
+    target : str
+        Path of the script, relative to ``root``, or Python statements
+        starting with ``import``.
+    root : str (default: ROOT)
+        Repository root.
+
+    Returns
+    -------
+    modules : list of str
+        All imported modules, in import order.
+    total : float
+        Cumulative import time of the top-level imports, in milliseconds.
+    """
+    if target.startswith('import '):
+        args = ['-c', target]
+    else:
+        args = [os.path.join(root, target)]
+    proc = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          universal_newlines=True,
+                          env=dict(os.environ, MPLBACKEND='Agg'))
+    if proc.returncode != 0:
+        raise RuntimeError("{} failed:\n{}".format(target, proc.stderr))
+    modules, total = [], 0.
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue # Header line
+        name = fields[2]
+        modules.append(name.strip())
+        # Nested imports are indented by two spaces per level
+        if not name[1:].startswith(' '):
+            total += int(fields[1]) / 1000.
+    return modules, total
+
+
+def reference_time(modules, runs=REFERENCE_RUNS):
+    """Returns the import time in milliseconds of a comma-separated list of
+    modules, the slowest of ``runs`` runs."""
+    return max(import_times('import ' + modules)[1] for _ in range(runs))
+
+
+def check_target(target, reference, ratio=RATIO, margin=MARGIN, root=ROOT):
+    """Checks the imports of a script against the forbidden modules and its
+    budget.
+
+    Parameters
+    ----------
+    target : str
+        Path of the script, relative to ``root``.
+    reference : float
+        Import time of the reference imports of the script in milliseconds
+        (see ``reference_time``).
+    ratio : float (default: RATIO)
+        Largest accepted ratio of import time to ``reference``.
+    margin : float (default: MARGIN)
+        Import time in milliseconds allowed on top of the ratio.
+    root : str (default: ROOT)
+        Repository root.
+
+    Returns
+    -------
+    errors : list of str
+        Problems found, empty if the script passes.
+    total : float
+        Import time in milliseconds.
+    """
+    modules, total = import_times(target, root=root)
+    errors = []
+    if not modules:
+        errors.append("no import timings (-X importtime needs Python 3.7+)")
+    forbidden = sorted(set(m.split('.')[0] for m in modules) &
+                       set(FORBIDDEN))
+    if forbidden:
+        errors.append("imports {}".format(', '.join(forbidden)))
+    budget = reference * ratio + margin
+    if total > budget:
+        errors.append("import time {:.0f} ms exceeds budget of {:.0f} "
+                      "ms".format(total, budget))
+    return errors, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check the import cost of the statistical scripts.")
+    parser.add_argument('--ratio', type=float, default=RATIO,
+                        help="largest accepted ratio of import time to "
+                        "reference time (default: {:g})".format(RATIO))
+    parser.add_argument('--margin', type=float, default=MARGIN,
+                        help="import time in ms allowed on top of the ratio "
+                        "(default: {:g})".format(MARGIN))
+    args = parser.parse_args(argv)
+
+    references = {}
+    failed = False
+    for target in find_targets(patterns=STATS_PATTERNS):
+        modules = REFERENCES.get(target, DEFAULT_REFERENCE)
+        if modules not in references:
+            references[modules] = reference_time(modules)
+            print("{:<50} {:>8.0f} ms  reference".format(
+                'import ' + modules, references[modules]))
+        errors, total = check_target(target, references[modules],
+                                     ratio=args.ratio, margin=args.margin)
+        print("{:<50} {:>8.0f} ms  {}".format(
+            target, total, 'ok' if not errors else '; '.join(errors)))
+        failed |= bool(errors)
+    return int(failed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""Code shared by the analysis directories.
+
+Scripts can be run from any working directory (``build_all.py`` runs them
+by absolute path from the repository root). Python puts the directory of a
+script on ``sys.path``, so its own ``utils`` module is found. That module
+adds the repository root to ``sys.path`` before importing this package.
+Data files are located relative to the script, not the working directory.
+"""
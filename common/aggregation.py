@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+
+def block_labels(df, blocks):
+    """Labels the rows of a data frame by block (e.g. early/late trials).
+
+    Parameters
+    ----------
+    df : DataFrame
+        Data frame with one row per trial.
+    blocks : list of (str, array) tuples
+        Block label and boolean row mask for each block. Blocks are
+        expected not to overlap; if they do, the first match wins.
+
+    Returns
+    -------
+    labels : array, shape=(n_rows,)
+        Block label of each row, or None for rows outside all blocks.
+    """
+    labels = np.empty(len(df), dtype=object)
+    assigned = np.zeros(len(df), dtype=bool)
+    for label, mask in blocks:
+        mask = np.asarray(mask, dtype=bool) & ~assigned
+        labels[mask] = label
+        assigned |= mask
+    return labels
+
+
+def aggregate_blocks(df, value, blocks, levels, func='mean',
+                     block_name='Block'):
+    """Aggregates a value per group and block in a single groupby pass.
+
+    The output has one row for every combination of the given levels and
+    blocks, in the order given, so groups without any trials in a block
+    (e.g. no successful early trials) appear with a NaN value.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Data frame with one row per trial.
+    value : str
+        Column to aggregate.
+    blocks : list of (str, array) tuples
+        Block label and boolean row mask for each block.
+    levels : list of (str, sequence) tuples
+        Grouping columns in output order, each with the full list of its
+        levels (e.g. ``[('Subject number', subject_ids())]``).
+    func : str or callable (default: 'mean')
+        Aggregation function passed to ``groupby.agg``.
+    block_name : str (default: 'Block')
+        Name of the block column in the output.
+
+    Returns
+    -------
+    df_blocks : DataFrame
+        Data frame with the grouping columns, ``block_name`` and ``value``.
+    """
+    columns = [name for name, _ in levels]
+    labels = block_labels(df, blocks)
+    in_block = pd.notnull(labels)
+    selected = df.loc[in_block, columns + [value]].copy()
+    selected[block_name] = labels[in_block]
+    aggregated = selected.groupby(columns + [block_name])[value].agg(func)
+
+    index = pd.MultiIndex.from_product(
+        [list(values) for _, values in levels] + [[b for b, _ in blocks]],
+        names=columns + [block_name])
+    return aggregated.reindex(index).reset_index()
+
+
+def paired_blocks(df_blocks, index, block_name, value, first, second):
+    """Returns paired values of two blocks, dropping incomplete pairs.
+
+    Parameters
+    ----------
+    df_blocks : DataFrame
+        Data frame in the format returned by ``aggregate_blocks``.
+    index : str
+        Column identifying pairs (e.g. ``'Subject number'``).
+    block_name : str
+        Block column.
+    value : str
+        Value column.
+    first : str
+        Label of the first block.
+    second : str
+        Label of the second block.
+
+    Returns
+    -------
+    first_values : array
+        Values of the first block, in order of first appearance of
+        ``index``.
+    second_values : array
+        Values of the second block, paired with ``first_values``.
+    """
+    wide = df_blocks.pivot(index=index, columns=block_name, values=value)
+    wide = wide.reindex(pd.unique(df_blocks[index]))[[first, second]]
+    wide = wide.dropna(how='any')
+    return (wide[first].values.astype(np.float64),
+            wide[second].values.astype(np.float64))
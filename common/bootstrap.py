@@ -0,0 +1,277 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def _median(a):
+    """Median along the last axis using a partial sort."""
+    n = a.shape[-1]
+    kth = [(n - 1) // 2, n // 2]
+    part = np.partition(a, kth, axis=-1)
+    return 0.5 * (part[..., kth[0]] + part[..., kth[1]])
+
+
+def _mean(a):
+    return np.mean(a, axis=-1)
+
+
+# Estimators applied along the last axis of a batch of resamples
+ESTIMATORS = {'median': _median, 'mean': _mean}
+
+MAX_ELEMENTS = 1 << 24 # Upper bound on resampled values held at once
+
+_MEMORY_CACHE = {}
+
+
+def _cache_key(values, codes, labels, estimator, n_boot, ci, seed, adaptive,
+               tol, batch):
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(codes, dtype=np.int64).tobytes())
+    digest.update(repr(list(labels)).encode('utf-8'))
+    digest.update(repr((estimator, n_boot, ci, seed, adaptive, tol,
+                        batch)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _percentiles(boots, ci):
+    return np.percentile(boots, [50 - ci / 2., 50 + ci / 2.], axis=-1)
+
+
+def _bootstrap_bucket(data, func, n_boot, ci, rng, adaptive, tol, batch):
+    """Bootstraps groups of equal size. ``data`` has shape (n_groups, n)."""
+    n_groups, n = data.shape
+    group_idx = np.arange(n_groups)[:, np.newaxis, np.newaxis]
+    step = n_boot if not adaptive else min(batch, n_boot)
+    boots = np.empty((n_groups, 0))
+    previous = None
+    while boots.shape[1] < n_boot:
+        size = min(step, n_boot - boots.shape[1])
+        # Resample in blocks of groups to bound memory
+        rows = max(1, MAX_ELEMENTS // max(size * n, 1))
+        new = np.empty((n_groups, size))
+        for start in range(0, n_groups, rows):
+            stop = min(start + rows, n_groups)
+            idx = rng.randint(0, n, size=(stop - start, size, n))
+            new[start:stop] = func(data[group_idx[start:stop], idx])
+        boots = np.concatenate((boots, new), axis=1)
+        if adaptive:
+            current = _percentiles(boots, ci)
+            if previous is not None:
+                scale = np.maximum(np.abs(current[1] - current[0]),
+                                   np.finfo(float).eps)
+                if np.all(np.abs(current - previous) <= tol * scale):
+                    break
+            previous = current
+    return _percentiles(boots, ci), boots.shape[1]
+
+
+def bootstrap_ci(values, groups, estimator='median', n_boot=1000, ci=95,
+                 seed=0, adaptive=False, tol=0.01, batch=200,
+                 cache_dir=None):
+    """Computes bootstrap confidence intervals for many groups at once.
+
+    Groups of equal size are resampled together with one index matrix per
+    batch and the estimator is applied to all resamples in one call (medians
+    use a partial sort). Intervals are percentile intervals, as in seaborn.
+    Results are cached by data hash and parameters, in memory and
+    optionally on disk.
+
+    Parameters
+    ----------
+    values : array, shape=(n_samples,)
+        Observations. NaN values are ignored.
+    groups : array, shape=(n_samples,)
+        Group label of each observation.
+    estimator : str (default: 'median')
+        One of ``ESTIMATORS``.
+    n_boot : int (default: 1000)
+        (Maximum) number of bootstrap resamples.
+    ci : float (default: 95)
+        Size of the confidence interval, in percent.
+    seed : int (default: 0)
+        Seed of the random number generator.
+    adaptive : bool (default: False)
+        If True, resamples are drawn in batches of ``batch`` and resampling
+        stops early once no interval endpoint moves by more than ``tol``
+        times the interval width between batches.
+    tol : float (default: 0.01)
+        Relative tolerance for the adaptive mode.
+    batch : int (default: 200)
+        Batch size for the adaptive mode.
+    cache_dir : str or None (default: None)
+        If not None, results are also cached in this directory.
+
+    Returns
+    -------
+    result : DataFrame
+        Data frame indexed by group label (in sorted order), with columns
+        ``estimate``, ``ci_low``, ``ci_high``, ``n`` (group size) and
+        ``n_boot`` (resamples drawn). Intervals are NaN for groups with
+        fewer than two observations.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups)
+    valid = ~np.isnan(values)
+    values, groups = values[valid], groups[valid]
+    labels, codes = np.unique(groups, return_inverse=True)
+
+    key = _cache_key(values, codes, labels, estimator, n_boot, ci, seed,
+                     adaptive, tol, batch)
+    if key in _MEMORY_CACHE:
+        return _MEMORY_CACHE[key].copy()
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, key + '.npz')
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                result = pd.DataFrame({name: cached[name] for name in
+                                       ['estimate', 'ci_low', 'ci_high', 'n',
+                                        'n_boot']}, index=labels)
+            _MEMORY_CACHE[key] = result
+            return result.copy()
+
+    func = ESTIMATORS[estimator]
+    rng = np.random.RandomState(seed)
+    order = np.argsort(codes, kind='mergesort')
+    sizes = np.bincount(codes, minlength=labels.size)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    estimate = np.full(labels.size, np.nan)
+    low = np.full(labels.size, np.nan)
+    high = np.full(labels.size, np.nan)
+    used = np.zeros(labels.size, dtype=np.int64)
+    for n in np.unique(sizes):
+        members = np.where(sizes == n)[0]
+        data = values[order[starts[members][:, np.newaxis] + np.arange(n)]]
+        estimate[members] = func(data)
+        if n < 2:
+            continue
+        (low[members], high[members]), used[members] = _bootstrap_bucket(
+            data, func, n_boot, ci, rng, adaptive, tol, batch)
+
+    result = pd.DataFrame({'estimate': estimate, 'ci_low': low,
+                           'ci_high': high, 'n': sizes, 'n_boot': used},
+                          index=labels,
+                          columns=['estimate', 'ci_low', 'ci_high', 'n',
+                                   'n_boot'])
+    _MEMORY_CACHE[key] = result
+    if cache_path is not None:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        np.savez(cache_path, **{name: result[name].values
+                                for name in result.columns})
+    return result.copy()
+
+
+def bootstrap_frame(df, value, by, **kwargs):
+    """Computes bootstrap confidence intervals for every group of a data
+    frame.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Data frame in long format.
+    value : str
+        Column with observations.
+    by : str or list of str
+        Grouping column(s).
+    **kwargs
+        Passed on to ``bootstrap_ci``.
+
+    Returns
+    -------
+    result : DataFrame
+        Data frame with the grouping columns followed by the columns
+        returned by ``bootstrap_ci``.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    grouped = df.groupby(by, sort=True)
+    codes = grouped.ngroup().values
+    keys = grouped.size().reset_index()[by]
+    valid = codes >= 0
+    result = bootstrap_ci(df[value].values[valid], codes[valid], **kwargs)
+    return pd.concat([keys.iloc[result.index].reset_index(drop=True),
+                      result.reset_index(drop=True)], axis=1)
+
+
+def plot_intervals(ax, x, ci_low, ci_high, color, errwidth=None,
+                   capsize=None):
+    """Draws precomputed confidence intervals the way seaborn does.
+
+    Parameters
+    ----------
+    ax : Axes
+        Axes to draw on.
+    x : array
+        Positions on the categorical axis.
+    ci_low, ci_high : array
+        Interval endpoints. Intervals with NaN endpoints are skipped.
+    color : color
+        Line color.
+    errwidth : float or None (default: None)
+        Line width. If None, 1.8 times the default line width is used.
+    capsize : float or None (default: None)
+        Width of the caps, in categorical axis units.
+    """
+    kws = {'color': color}
+    if errwidth is not None:
+        kws['lw'] = errwidth
+    else:
+        import matplotlib as mpl
+        kws['lw'] = mpl.rcParams['lines.linewidth'] * 1.8
+    for at, low, high in zip(x, ci_low, ci_high):
+        if np.isnan(low) or np.isnan(high):
+            continue
+        ax.plot([at, at], [low, high], **kws)
+        if capsize is not None:
+            ax.plot([at - capsize / 2., at + capsize / 2.], [low, low], **kws)
+            ax.plot([at - capsize / 2., at + capsize / 2.], [high, high],
+                    **kws)
+
+
+def plot_point_intervals(ax, ci_frame, x, hue, hue_order, palette,
+                         dodge=False, errwidth=None, capsize=None):
+    """Adds precomputed intervals to a seaborn pointplot drawn with
+    ``ci=None``.
+
+    Points are placed the way seaborn places them: at the index of their
+    ``x`` level, shifted by the dodge offset of their hue level. Positions
+    and colours do not depend on the artists seaborn draws, which differ
+    between versions.
+
+    Parameters
+    ----------
+    ax : Axes
+        Axes holding the pointplot.
+    ci_frame : DataFrame
+        Output of ``bootstrap_frame`` grouped by ``[hue, x]``.
+    x : str
+        Categorical (numeric) x variable.
+    hue : str
+        Hue variable.
+    hue_order : list
+        Hue levels, in plotting order.
+    palette : list of colors
+        Colours of the hue levels, as passed to the pointplot.
+    dodge : bool or float (default: False)
+        Dodge of the pointplot.
+    errwidth, capsize
+        See ``plot_intervals``.
+    """
+    if len(palette) < len(hue_order):
+        raise ValueError("A colour is needed for every hue level.")
+    n_hue = len(hue_order)
+    if dodge is True:
+        dodge = .025 * n_hue
+    if dodge and n_hue > 1:
+        offsets = np.linspace(-dodge / 2., dodge / 2., n_hue)
+    else:
+        offsets = np.zeros(n_hue)
+    x_levels = np.sort(ci_frame[x].unique())
+    for level, offset, color in zip(hue_order, offsets, palette):
+        sub = ci_frame[ci_frame[hue] == level].set_index(x).reindex(x_levels)
+        plot_intervals(ax, np.arange(len(x_levels)) + offset,
+                       sub['ci_low'].values, sub['ci_high'].values, color,
+                       errwidth=errwidth, capsize=capsize)
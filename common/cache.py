@@ -0,0 +1,270 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1 # Bump to invalidate all cached frames
+
+DEFAULT_MAX_BYTES = 256 << 20 # Size above which old frames are evicted
+
+# Content hashes of input files, keyed by path, size and modification time
+_HASHES = {}
+_HASH_DIR = 'hashes' # One record per input file in the cache directory
+
+
+def _atomic_write(path, write):
+    # Unique per process and thread, so concurrent writers never share it
+    tmp = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+    with open(tmp, 'wb') as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def file_hash(path, cache_dir=None):
+    """Returns the SHA-1 hash of the contents of a file.
+
+    Hashes are remembered by path, size and modification time, in memory
+    and, if ``cache_dir`` is given, in a small record per file in that
+    directory, so that unchanged files are only read once. Records of
+    different files are independent, so concurrent processes never lose
+    each other's hashes.
+
+    Parameters
+    ----------
+    path : str
+        File path.
+    cache_dir : str or None (default: None)
+        Cache directory.
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal hash.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    if path in _HASHES and _HASHES[path][0] == stamp:
+        return _HASHES[path][1]
+    record_path = None
+    if cache_dir is not None:
+        record_path = os.path.join(
+            cache_dir, _HASH_DIR,
+            hashlib.sha1(path.encode('utf-8')).hexdigest() + '.json')
+    record = None
+    if record_path is not None and os.path.exists(record_path):
+        try:
+            with open(record_path, 'r') as f:
+                record = json.load(f)
+        except (IOError, OSError, ValueError):
+            pass # Unreadable; rehash
+    if record is not None and record[:2] == [path, stamp]:
+        digest = record[2]
+    else:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        if record_path is not None:
+            os.makedirs(os.path.dirname(record_path), exist_ok=True)
+            _atomic_write(record_path, lambda f: f.write(
+                json.dumps([path, stamp, digest]).encode('utf-8')))
+    _HASHES[path] = (stamp, digest)
+    return digest
+
+
+def _unwrap(func):
+    while hasattr(func, '__wrapped__'): # Decorated, e.g. with ``staged``
+        func = func.__wrapped__
+    return func
+
+
+def source_files(*objects):
+    """Returns the source files defining functions, classes or modules.
+
+    Useful as dependencies of a cached frame (see ``cached_frame``), so that
+    cached frames are not used after the code computing them is edited.
+    Objects without a source file (e.g. built-ins) are skipped.
+    """
+    paths = []
+    for obj in objects:
+        try:
+            path = inspect.getsourcefile(_unwrap(obj))
+        except TypeError:
+            path = None
+        if path is not None and path not in paths:
+            paths.append(path)
+    return paths
+
+
+def _function_id(func):
+    """Name and bytecode of a function, so that cached results are not used
+    after the function is edited."""
+    func = _unwrap(func)
+    code = getattr(func, '__code__', None)
+    return [func.__module__, getattr(func, '__qualname__', func.__name__),
+            hashlib.sha1(code.co_code).hexdigest() if code else None,
+            repr(code.co_consts) if code else None]
+
+
+def frame_key(func, paths, params=None, cache_dir=None):
+    """Returns the cache key of a derived frame.
+
+    Parameters
+    ----------
+    func : callable
+        Function computing the frame.
+    paths : list of str
+        Input files and source files the frame depends on. The source file
+        defining ``func`` is added to them.
+    params : dict or None (default: None)
+        Keyword arguments of ``func``. Values must have a stable ``repr``.
+    cache_dir : str or None (default: None)
+        Cache directory, used to remember file hashes.
+
+    Returns
+    -------
+    key : str
+        Hexadecimal hash.
+    """
+    params = params or {}
+    paths = list(paths) + [path for path in source_files(func)
+                           if path not in paths]
+    description = [CACHE_VERSION, _function_id(func),
+                   [file_hash(path, cache_dir) for path in paths],
+                   [(name, repr(params[name])) for name in sorted(params)]]
+    return hashlib.sha1(repr(description).encode('utf-8')).hexdigest()
+
+
+def save_frame(path, df):
+    """Saves a data frame with a default index as one array per column.
+
+    Text columns are stored as fixed-width unicode with a mask of missing
+    values, so that the archive can be read without pickle.
+    """
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        raise ValueError("Only frames with a default index can be cached.")
+    arrays = {'columns': np.array([str(c) for c in df.columns]),
+              'text': np.zeros(len(df.columns), dtype=bool)}
+    for i, name in enumerate(df.columns):
+        values = df[name]
+        if values.dtype.kind in 'biufcmM':
+            arrays['c{}'.format(i)] = values.values
+        else:
+            missing = pd.isnull(values).values
+            arrays['c{}'.format(i)] = np.array(
+                ['' if m else str(v) for v, m in zip(values, missing)])
+            arrays['m{}'.format(i)] = missing
+            arrays['text'][i] = True
+    _atomic_write(path, lambda f: np.savez(f, **arrays))
+
+
+def load_frame(path):
+    """Loads a data frame saved with ``save_frame``."""
+    with np.load(path, allow_pickle=False) as f:
+        columns = list(f['columns'])
+        data = {}
+        for i, (name, text) in enumerate(zip(columns, f['text'])):
+            values = f['c{}'.format(i)]
+            if text:
+                values = values.astype(object)
+                values[f['m{}'.format(i)]] = np.nan
+            data[name] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def evict(cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+    """Removes the least recently used frames until the cached frames take
+    at most ``max_bytes``.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Cache directory.
+    max_bytes : int (default: DEFAULT_MAX_BYTES)
+        Size limit.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.npz'):
+            try:
+                stat = os.stat(os.path.join(cache_dir, name))
+            except OSError:
+                continue # Removed by another process
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass # Removed by another process
+        total -= size
+
+
+def cached_frame(func, path, params=None, depends=(), cache_dir=None,
+                 max_bytes=DEFAULT_MAX_BYTES, loader=pd.read_csv):
+    """Computes a frame derived from an input file, or loads it from the
+    cache.
+
+    Frames are keyed by the content hashes of the input file, of its
+    dependencies and of the source file defining ``func``, the name and
+    code of ``func`` and its parameters. Code called by ``func`` in other
+    modules must be listed in ``depends`` (see ``source_files``), or
+    ``CACHE_VERSION`` bumped when it changes. A hit
+    skips reading the input file altogether. Frames are written atomically,
+    so several scripts can share a cache directory, and the least recently
+    used frames are evicted when the directory grows beyond ``max_bytes``.
+
+    Parameters
+    ----------
+    func : callable
+        Function computing the frame from the loaded input file, e.g.
+        ``get_df_early_late``. Its output must have a default index.
+    path : str
+        Input file.
+    params : dict or None (default: None)
+        Keyword arguments passed to ``func``, e.g. ``{'early_limit': 3}``.
+    depends : list of str (default: ())
+        Other files the frame depends on (e.g. the subject registry or the
+        source files of the functions called by ``func``).
+    cache_dir : str or None (default: None)
+        Cache directory. If None, the frame is computed without caching.
+    max_bytes : int (default: DEFAULT_MAX_BYTES)
+        Size limit of the cached frames.
+    loader : callable (default: pd.read_csv)
+        Function loading the input file.
+
+    Returns
+    -------
+    df : DataFrame
+        Derived frame.
+    """
+    params = params or {}
+    if cache_dir is None:
+        return func(loader(path), **params)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    key = frame_key(func, [path] + list(depends), params, cache_dir)
+    frame_path = os.path.join(cache_dir, key + '.npz')
+    if os.path.exists(frame_path):
+        try:
+            df = load_frame(frame_path)
+        except (IOError, OSError, KeyError, ValueError):
+            pass # Evicted or unreadable; recompute
+        else:
+            try:
+                os.utime(frame_path, None) # Mark as recently used
+            except OSError:
+                pass
+            return df
+    df = func(loader(path), **params)
+    save_frame(frame_path, df)
+    evict(cache_dir, max_bytes)
+    return df
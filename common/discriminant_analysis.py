@@ -0,0 +1,285 @@
+import numpy as np
+
+CLASSIFIERS = ["LDA", "RDA", "QDA"]
+
+# Regularisation parameters for each classifier (see DiscriminantAnalysis).
+# The RDA values are a starting point; tune them per user (see
+# common.model_selection.tune_rda).
+CLASSIFIER_PARAMS = {'LDA': {'reg_lambda': 1., 'reg_gamma': 0.},
+                     'RDA': {'reg_lambda': 0.5, 'reg_gamma': 0.1},
+                     'QDA': {'reg_lambda': 0., 'reg_gamma': 0.}}
+
+
+def make_classifier(name, **kwargs):
+    """Returns a discriminant analysis classifier by name.
+
+    Parameters
+    ----------
+    name : str
+        One of ['LDA', 'RDA', 'QDA'].
+    **kwargs
+        Override the default parameters in ``CLASSIFIER_PARAMS``.
+
+    Returns
+    -------
+    clf : DiscriminantAnalysis
+        Unfitted classifier.
+    """
+    params = dict(CLASSIFIER_PARAMS[name])
+    params.update(kwargs)
+    return DiscriminantAnalysis(**params)
+
+
+def class_statistics(X, y):
+    """Estimates class means and covariances.
+
+    Parameters
+    ----------
+    X : array, shape=(n_samples, n_features)
+        Training data.
+    y : array, shape=(n_samples,)
+        Class labels.
+
+    Returns
+    -------
+    classes : array, shape=(n_classes,)
+        Sorted class labels.
+    counts : array, shape=(n_classes,)
+        Number of samples of each class.
+    means : array, shape=(n_classes, n_features)
+        Class means.
+    class_covariances : array, shape=(n_classes, n_features, n_features)
+        Unbiased class covariance matrices.
+    pooled_covariance : array, shape=(n_features, n_features)
+        Pooled within-class covariance matrix.
+    """
+    classes, y_idx = np.unique(y, return_inverse=True)
+    n_classes = classes.size
+    n_samples, n_features = X.shape
+    counts = np.bincount(y_idx, minlength=n_classes)
+
+    means = np.zeros((n_classes, n_features))
+    np.add.at(means, y_idx, X)
+    means /= counts[:, np.newaxis]
+    Xc = X - means[y_idx]
+    scatter = np.zeros((n_classes, n_features, n_features))
+    for k in range(n_classes):
+        Xk = Xc[y_idx == k]
+        scatter[k] = Xk.T.dot(Xk)
+    class_covariances = scatter / (counts - 1.)[:, None, None]
+    pooled_covariance = scatter.sum(axis=0) / (n_samples - n_classes)
+    return classes, counts, means, class_covariances, pooled_covariance
+
+
+def regularize_covariances(class_covariances, pooled_covariance,
+                           reg_lambda, reg_gamma):
+    """Applies discriminant analysis regularisation to class covariances.
+
+    The regularised covariance of class k is
+
+        (1 - reg_gamma) * ((1 - reg_lambda) * S_k + reg_lambda * S)
+        + reg_gamma * I
+
+    where S_k is the class covariance and S the pooled covariance. Features
+    are expected to be standardised, so the identity is a sensible target.
+
+    Parameters
+    ----------
+    class_covariances : array, shape=(n_classes, n_features, n_features)
+        Class covariance matrices.
+    pooled_covariance : array, shape=(n_features, n_features)
+        Pooled within-class covariance matrix.
+    reg_lambda : float
+        Blend between class (0) and pooled (1) covariances.
+    reg_gamma : float
+        Shrinkage towards the identity matrix.
+
+    Returns
+    -------
+    covariances : array, shape=(n_classes, n_features, n_features)
+        Regularised covariance matrices.
+    """
+    cov = ((1. - reg_lambda) * class_covariances +
+           reg_lambda * pooled_covariance[np.newaxis])
+    cov *= 1. - reg_gamma
+    idx = np.arange(cov.shape[-1])
+    cov[:, idx, idx] += reg_gamma
+    return cov
+
+
+class DiscriminantAnalysis(object):
+    """Gaussian discriminant analysis with Friedman-style regularisation.
+
+    LDA (``reg_lambda=1``), QDA (``reg_lambda=0``) and RDA (anything in
+    between and/or ``reg_gamma > 0``) share this implementation; see
+    ``regularize_covariances`` for the exact form.
+
+    Inverse covariances, log-determinants and all terms that do not depend
+    on the input are computed once in ``fit``. ``predict_proba`` then scores
+    a whole feature matrix with a single einsum, whereas
+    ``predict_proba_one`` scores one sample using buffers allocated at fit
+    time, for use in the real-time control loop.
+
+    Parameters
+    ----------
+    reg_lambda : float (default: 0.)
+        Blend between class (0) and pooled (1) covariances.
+    reg_gamma : float (default: 0.)
+        Shrinkage towards the identity matrix.
+    priors : array, shape=(n_classes,) or None (default: None)
+        Class priors. If None, class frequencies in the training data are
+        used.
+    """
+    def __init__(self, reg_lambda=0., reg_gamma=0., priors=None):
+        self.reg_lambda = reg_lambda
+        self.reg_gamma = reg_gamma
+        self.priors = priors
+
+    def fit(self, X, y):
+        """Estimates class means and covariances.
+
+        Parameters
+        ----------
+        X : array, shape=(n_samples, n_features)
+            Training data.
+        y : array, shape=(n_samples,)
+            Class labels.
+
+        Returns
+        -------
+        self : DiscriminantAnalysis
+        """
+        X = np.asarray(X, dtype=np.float64)
+        (self.classes_, counts, self.means_, self.class_covariances_,
+         self.pooled_covariance_) = class_statistics(X, y)
+        if self.priors is None:
+            self.priors_ = counts / float(X.shape[0])
+        else:
+            self.priors_ = np.asarray(self.priors, dtype=np.float64)
+
+        self.covariances_ = regularize_covariances(
+            self.class_covariances_, self.pooled_covariance_,
+            self.reg_lambda, self.reg_gamma)
+        self._precompute()
+        return self
+
+    def _precompute(self):
+        """Computes all input-independent terms and scoring buffers."""
+        chol = np.linalg.cholesky(self.covariances_)
+        self.log_dets_ = 2. * np.sum(
+            np.log(np.diagonal(chol, axis1=1, axis2=2)), axis=1)
+        precisions = np.linalg.inv(self.covariances_)
+        self.precisions_ = 0.5 * (precisions +
+                                  np.swapaxes(precisions, 1, 2))
+
+        n_classes, n_features = self.means_.shape
+        self._linear = np.einsum('kpq,kq->kp', self.precisions_,
+                                 self.means_)
+        self._const = (-0.5 * np.einsum('kp,kp->k', self.means_,
+                                        self._linear) -
+                       0.5 * self.log_dets_ + np.log(self.priors_))
+
+        # Buffers for the single-sample path
+        self._precisions_flat = np.ascontiguousarray(
+            self.precisions_.reshape(n_classes * n_features, n_features))
+        self._buf = np.empty(n_classes * n_features)
+        self._buf_2d = self._buf.reshape(n_classes, n_features)
+        self._quad = np.empty(n_classes)
+        self._out = np.empty(n_classes)
+
+    def decision_function(self, X):
+        """Returns unnormalised log posteriors for a feature matrix.
+
+        Parameters
+        ----------
+        X : array, shape=(n_samples, n_features)
+            Feature matrix.
+
+        Returns
+        -------
+        scores : array, shape=(n_samples, n_classes)
+            Log joint likelihoods up to an additive constant.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        quad = np.einsum('np,kpq,nq->nk', X, self.precisions_, X,
+                         optimize=True)
+        return -0.5 * quad + X.dot(self._linear.T) + self._const
+
+    def predict_log_proba(self, X):
+        """Returns log posterior class probabilities.
+
+        Parameters
+        ----------
+        X : array, shape=(n_samples, n_features)
+            Feature matrix.
+
+        Returns
+        -------
+        log_proba : array, shape=(n_samples, n_classes)
+            Log posterior probabilities.
+        """
+        scores = self.decision_function(X)
+        scores -= scores.max(axis=1, keepdims=True)
+        scores -= np.log(np.sum(np.exp(scores), axis=1, keepdims=True))
+        return scores
+
+    def predict_proba(self, X):
+        """Returns posterior class probabilities.
+
+        Parameters
+        ----------
+        X : array, shape=(n_samples, n_features)
+            Feature matrix.
+
+        Returns
+        -------
+        proba : array, shape=(n_samples, n_classes)
+            Posterior probabilities.
+        """
+        return np.exp(self.predict_log_proba(X))
+
+    def predict(self, X):
+        """Returns the most probable class for each sample."""
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
+
+    def predict_proba_one(self, x, out=None):
+        """Returns posterior class probabilities for a single sample.
+
+        No arrays are allocated provided that ``x`` is a contiguous float64
+        vector.
+
+        Parameters
+        ----------
+        x : array, shape=(n_features,)
+            Feature vector.
+        out : array, shape=(n_classes,) or None (default: None)
+            Output array. If None, an internal buffer is used, which is
+            overwritten by the next call.
+
+        Returns
+        -------
+        proba : array, shape=(n_classes,)
+            Posterior probabilities.
+        """
+        if x.dtype != np.float64 or not x.flags.c_contiguous:
+            x = np.ascontiguousarray(x, dtype=np.float64)
+        if out is None:
+            out = self._out
+        # Quadratic terms x' P_k x for all classes
+        np.dot(self._precisions_flat, x, out=self._buf)
+        np.multiply(self._buf_2d, x, out=self._buf_2d)
+        np.add.reduce(self._buf_2d, axis=1, out=self._quad)
+        np.multiply(self._quad, -0.5, out=self._quad)
+        # Linear and constant terms
+        np.dot(self._linear, x, out=out)
+        np.add(out, self._quad, out=out)
+        np.add(out, self._const, out=out)
+        # Normalise
+        np.subtract(out, out.max(), out=out)
+        np.exp(out, out=out)
+        np.divide(out, out.sum(), out=out)
+        return out
+
+    def predict_one(self, x):
+        """Returns the most probable class for a single sample."""
+        return self.classes_[np.argmax(self.predict_proba_one(x))]
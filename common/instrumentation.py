@@ -0,0 +1,242 @@
+"""Stage-level timing and memory instrumentation of the analysis scripts.
+
+Instrumentation is disabled unless the ``TWO_SENSOR_TRACE`` environment
+variable names a directory. Each script then writes a JSON trace to that
+directory when it exits, with the wall time, CPU time and peak resident set
+size of every stage. If ``TWO_SENSOR_PROFILE`` is also set (to any non-empty
+value), the whole run is profiled with cProfile and the statistics are saved
+next to the trace.
+
+CPU times are counted from the start of the process. Wall times are counted
+from the start of the process if ``TWO_SENSOR_START`` holds its start time
+(a ``time.time`` value, set by ``build_all.py``), and otherwise from the
+import of this module, in which case interpreter start-up and earlier
+imports are missing from the trace.
+
+Only the standard library is imported here, so that the statistical scripts
+stay free of plotting libraries.
+
+Examples
+--------
+Mark stages with a context manager or a decorator:
+
+    with stage('load'):
+        df = pd.read_csv(path)
+
+    @staged('aggregate')
+    def get_df_early_late(df):
+        ...
+
+Trace all scripts of a build:
+
+    TWO_SENSOR_TRACE=traces python build_all.py
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+TRACE_ENV = 'TWO_SENSOR_TRACE'
+PROFILE_ENV = 'TWO_SENSOR_PROFILE'
+START_ENV = 'TWO_SENSOR_START'
+
+_TRACE_DIR = os.environ.get(TRACE_ENV) or None
+
+
+def _origin():
+    """Returns the ``time.perf_counter`` value at the start of the process,
+    if known, or now, and whether it is the start of the process."""
+    now = time.perf_counter()
+    try:
+        started = float(os.environ.get(START_ENV, ''))
+    except ValueError:
+        return now, False
+    return now - max(time.time() - started, 0.), True
+
+
+_START, _FROM_PROCESS_START = _origin()
+# Wall and CPU time spent before this module was imported
+_STARTUP = (time.perf_counter() - _START, time.process_time())
+_STAGES = [] # Finished stages, in order of completion
+_OPEN = [] # Names of open stages, outermost first
+_PROFILER = None
+
+
+def enabled():
+    """Returns whether instrumentation is enabled."""
+    return _TRACE_DIR is not None
+
+
+def peak_rss():
+    """Returns the peak resident set size of the process in MiB, or None if
+    it cannot be measured on this platform."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+
+
+class _Stage(object):
+    """Context manager recording one stage."""
+    __slots__ = ('name', 'wall', 'cpu', 'rss')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _OPEN.append(self.name)
+        self.rss = peak_rss()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        rss = peak_rss()
+        path = '/'.join(_OPEN)
+        _OPEN.pop()
+        _STAGES.append({
+            'stage': path,
+            'depth': len(_OPEN),
+            'start': self.wall - _START,
+            'wall_time': wall - self.wall,
+            'cpu_time': cpu - self.cpu,
+            'peak_rss': rss,
+            'peak_rss_increase': (rss - self.rss if rss is not None
+                                  else None)})
+        return False
+
+
+class _NullStage(object):
+    """Context manager doing nothing, used when instrumentation is
+    disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """Returns a context manager recording a stage.
+
+    Stages can be nested; nested stages are named after the enclosing ones
+    (e.g. ``'plot/bootstrap'``). When instrumentation is disabled, a shared
+    no-op context manager is returned.
+
+    Parameters
+    ----------
+    name : str
+        Stage name, e.g. ``'load'``, ``'aggregate'``, ``'bootstrap'``,
+        ``'layout'`` or ``'save'``.
+
+    Returns
+    -------
+    context : context manager
+    """
+    if _TRACE_DIR is None:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def staged(name=None):
+    """Decorator recording every call of a function as a stage.
+
+    When instrumentation is disabled, the function is returned unchanged.
+
+    Parameters
+    ----------
+    name : str or None (default: None)
+        Stage name. If None, the name of the function is used.
+    """
+    def decorator(func):
+        if _TRACE_DIR is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Stage(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_name(script=None):
+    """Returns the base name of the trace files of a script, made of its
+    directory and file name (e.g. ``'emg_power.Figure_6'``)."""
+    script = os.path.abspath(script or sys.argv[0] or 'interactive')
+    directory = os.path.basename(os.path.dirname(script))
+    return '{}.{}'.format(directory, os.path.splitext(
+        os.path.basename(script))[0])
+
+
+def get_trace():
+    """Returns the trace of the stages finished so far.
+
+    Returns
+    -------
+    trace : dict
+        Script, total wall and CPU time, the part of them spent before
+        instrumentation was loaded (``startup_wall_time`` and
+        ``startup_cpu_time``, mostly interpreter start-up and imports),
+        whether wall times count from the start of the process
+        (``from_process_start``), peak resident set size in MiB and the list
+        of stages. Times are in seconds and ``start`` is relative to the
+        start of the trace.
+    """
+    return {'script': os.path.abspath(sys.argv[0]) if sys.argv[0] else None,
+            'wall_time': time.perf_counter() - _START,
+            'cpu_time': time.process_time(),
+            'startup_wall_time': _STARTUP[0],
+            'startup_cpu_time': _STARTUP[1],
+            'from_process_start': _FROM_PROCESS_START,
+            'peak_rss': peak_rss(),
+            'stages': list(_STAGES)}
+
+
+def write_trace(directory=None):
+    """Writes the trace as JSON and, if profiling, the cProfile statistics.
+
+    Parameters
+    ----------
+    directory : str or None (default: None)
+        Output directory. If None, the ``TWO_SENSOR_TRACE`` directory is
+        used.
+
+    Returns
+    -------
+    path : str
+        Path of the trace file.
+    """
+    directory = directory or _TRACE_DIR
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    base = os.path.join(directory, trace_name())
+    if _PROFILER is not None:
+        _PROFILER.disable()
+        _PROFILER.dump_stats(base + '.prof')
+    with open(base + '.json', 'w') as f:
+        json.dump(get_trace(), f, indent=2)
+    return base + '.json'
+
+
+if _TRACE_DIR is not None:
+    if os.environ.get(PROFILE_ENV):
+        import cProfile
+        _PROFILER = cProfile.Profile()
+        _PROFILER.enable()
+    atexit.register(write_trace)
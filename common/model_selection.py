@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from common.discriminant_analysis import class_statistics
+
+DEFAULT_LAMBDAS = np.linspace(0., 1., 11)
+DEFAULT_GAMMAS = np.linspace(0., 1., 11)
+
+
+def stratified_folds(y, n_folds=5, seed=None):
+    """Splits samples into folds with similar class proportions.
+
+    Parameters
+    ----------
+    y : array, shape=(n_samples,)
+        Class labels.
+    n_folds : int (default: 5)
+        Number of folds.
+    seed : int or None (default: None)
+        Seed of the random shuffling of each class.
+
+    Returns
+    -------
+    folds : list of (array, array)
+        Training and test indices of each fold.
+    """
+    rng = np.random.RandomState(seed)
+    fold_of = np.empty(len(y), dtype=int)
+    for label in np.unique(y):
+        idx = np.flatnonzero(np.asarray(y) == label)
+        fold_of[rng.permutation(idx)] = np.arange(idx.size) % n_folds
+    return [(np.flatnonzero(fold_of != k), np.flatnonzero(fold_of == k))
+            for k in range(n_folds)]
+
+
+def _grid_log_losses(eigvals, projected, log_priors, y_test, reg_gammas):
+    """Summed test cross-entropy loss for every ``reg_gamma``, given the
+    eigendecomposition of the unshrunk covariances.
+
+    Parameters
+    ----------
+    eigvals : array, shape=(n_classes, n_features)
+        Eigenvalues of each class covariance before shrinkage.
+    projected : array, shape=(n_classes, n_test, n_features)
+        Test samples centred on each class mean, in the eigenbasis of the
+        class covariance.
+    log_priors : array, shape=(n_classes,)
+        Log class priors.
+    y_test : array, shape=(n_test,)
+        Class indices of the test samples.
+    reg_gammas : array, shape=(n_gammas,)
+        Shrinkage values.
+
+    Returns
+    -------
+    losses : array, shape=(n_gammas,)
+        Loss for every shrinkage value, inf where a covariance is singular.
+    """
+    # Shrinkage towards the identity only rescales the eigenvalues
+    g = reg_gammas[:, np.newaxis, np.newaxis]
+    scaled = (1. - g) * eigvals[np.newaxis] + g
+    singular = np.any(scaled <= 0, axis=(1, 2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quad = np.einsum('knp,gkp->gkn', projected ** 2, 1. / scaled)
+        log_dets = np.sum(np.log(scaled), axis=2)
+        scores = (-0.5 * quad - 0.5 * log_dets[:, :, np.newaxis] +
+                  log_priors[np.newaxis, :, np.newaxis])
+        top = scores.max(axis=1)
+        log_norm = top + np.log(np.sum(np.exp(scores - top[:, np.newaxis]),
+                                       axis=1))
+    true_scores = scores[:, y_test, np.arange(y_test.size)]
+    losses = np.sum(log_norm - true_scores, axis=1)
+    losses[singular] = np.inf
+    return losses
+
+
+def tune_rda(X, y, reg_lambdas=DEFAULT_LAMBDAS, reg_gammas=DEFAULT_GAMMAS,
+             folds=None):
+    """Grid search of the RDA regularisation parameters by cross-validated
+    cross-entropy loss.
+
+    Class statistics are estimated once per fold. For every ``reg_lambda``
+    the blended covariance of each class is eigendecomposed once; shrinkage
+    towards the identity leaves its eigenvectors unchanged and maps each
+    eigenvalue d to ``(1 - reg_gamma) * d + reg_gamma``, so the whole
+    ``reg_gamma`` axis of the grid is evaluated in closed form from the same
+    factors. Losses equal those of refitting
+    ``common.discriminant_analysis.DiscriminantAnalysis`` at every grid
+    point.
+
+    Parameters
+    ----------
+    X : array, shape=(n_samples, n_features)
+        Feature matrix.
+    y : array, shape=(n_samples,)
+        Class labels.
+    reg_lambdas : array (default: DEFAULT_LAMBDAS)
+        Values of ``reg_lambda`` (blend between class and pooled
+        covariances).
+    reg_gammas : array (default: DEFAULT_GAMMAS)
+        Values of ``reg_gamma`` (shrinkage towards the identity).
+    folds : list of (array, array) or None (default: None)
+        Training and test indices of the cross-validation folds. If None,
+        ``stratified_folds(y)`` is used.
+
+    Returns
+    -------
+    best_params : dict
+        ``reg_lambda`` and ``reg_gamma`` with the lowest loss.
+    losses : DataFrame, shape=(n_lambdas, n_gammas)
+        Mean cross-entropy loss for every grid point, indexed by
+        ``reg_lambda`` and with ``reg_gamma`` columns. Grid points where a
+        covariance is singular have infinite loss.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    reg_lambdas = np.asarray(reg_lambdas, dtype=np.float64)
+    reg_gammas = np.asarray(reg_gammas, dtype=np.float64)
+    if folds is None:
+        folds = stratified_folds(y)
+
+    total = np.zeros((reg_lambdas.size, reg_gammas.size))
+    n_test = 0
+    for train, test in folds:
+        classes, counts, means, class_cov, pooled = class_statistics(
+            X[train], y[train])
+        log_priors = np.log(counts / float(train.size))
+        y_test = np.searchsorted(classes, y[test])
+        if not np.array_equal(classes[y_test], y[test]):
+            raise ValueError("Test labels missing from the training data.")
+        centred = X[test][np.newaxis] - means[:, np.newaxis]
+        for i, reg_lambda in enumerate(reg_lambdas):
+            if reg_lambda == 1.:
+                # All classes share the pooled covariance
+                eigvals, eigvecs = np.linalg.eigh(pooled)
+                eigvals = np.broadcast_to(eigvals, means.shape)
+                projected = np.einsum('knp,pq->knq', centred, eigvecs)
+            else:
+                eigvals, eigvecs = np.linalg.eigh(
+                    (1. - reg_lambda) * class_cov + reg_lambda * pooled)
+                projected = np.einsum('knp,kpq->knq', centred, eigvecs)
+            total[i] += _grid_log_losses(eigvals, projected, log_priors,
+                                         y_test, reg_gammas)
+        n_test += test.size
+
+    losses = pd.DataFrame(total / n_test,
+                          index=pd.Index(reg_lambdas, name='reg_lambda'),
+                          columns=pd.Index(reg_gammas, name='reg_gamma'))
+    i, j = np.unravel_index(np.argmin(losses.values), losses.shape)
+    best_params = {'reg_lambda': float(reg_lambdas[i]),
+                   'reg_gamma': float(reg_gammas[j])}
+    return best_params, losses
@@ -0,0 +1,120 @@
+import numpy as np
+from matplotlib.artist import allow_rasterization
+from matplotlib.lines import Line2D
+
+
+def minmax_indices(x, y, x_min, x_max, n_bins):
+    """Selects the points of a series needed to draw it at a given width.
+
+    The visible x range is split into ``n_bins`` bins (pixel columns) and,
+    in every bin, the first, last, lowest and highest points are kept. A
+    line through the selected points covers the same pixels as a line
+    through all of them. The nearest points outside the visible range are
+    also kept, so that the line reaches the edges of the axes.
+
+    Parameters
+    ----------
+    x : array, shape=(n_points,)
+        Positions, sorted in non-decreasing order.
+    y : array, shape=(n_points,)
+        Values.
+    x_min, x_max : float
+        Visible x range.
+    n_bins : int
+        Number of bins.
+
+    Returns
+    -------
+    idx : array
+        Sorted indices of the selected points.
+    """
+    lo = max(np.searchsorted(x, x_min, side='left') - 1, 0)
+    hi = min(np.searchsorted(x, x_max, side='right') + 1, x.size)
+    if hi - lo <= 4 * n_bins or not x_max > x_min:
+        return np.arange(lo, hi)
+    xs, ys = x[lo:hi], y[lo:hi]
+    # Points outside the visible range fall in bins -1 and n_bins
+    bins = np.floor((xs - x_min) / (x_max - x_min) * n_bins)
+    bins = np.clip(bins, -1, n_bins).astype(np.intp)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    counts = np.diff(np.r_[starts, xs.size])
+    selected = [starts, starts + counts - 1]
+    for extreme in (np.fmin, np.fmax):
+        # First point of every bin equal to the extreme value of its bin
+        hits = np.flatnonzero(ys == np.repeat(extreme.reduceat(ys, starts),
+                                              counts))
+        if hits.size:
+            selected.append(hits[np.minimum(np.searchsorted(hits, starts),
+                                            hits.size - 1)])
+    return np.unique(np.concatenate(selected)) + lo
+
+
+class DecimatedLine(Line2D):
+    """Line that only draws the points visible at the output resolution.
+
+    All data are kept, and every time the line is drawn the points needed
+    for the current view limits and the size of the axes in output pixels
+    are selected with ``minmax_indices``. When saving to a vector format
+    with ``dpi``, pixels are those of that resolution, which is also the
+    one used for rasterised artists. The number of drawn points therefore
+    depends on the size of the figure but not on the length of the series.
+
+    Positions must be sorted; otherwise all points are drawn.
+
+    Parameters
+    ----------
+    x, y : array, shape=(n_points,)
+        Data.
+    **kwargs
+        Passed to ``matplotlib.lines.Line2D``.
+    """
+    def __init__(self, x, y, **kwargs):
+        self._full_x = np.asarray(x, dtype=np.float64)
+        self._full_y = np.asarray(y, dtype=np.float64)
+        self._sorted = bool(np.all(self._full_x[1:] >= self._full_x[:-1]))
+        self._view = None
+        super(DecimatedLine, self).__init__(self._full_x, self._full_y,
+                                            **kwargs)
+
+    @allow_rasterization
+    def draw(self, renderer):
+        if self.axes is not None and self._sorted:
+            x_min, x_max = sorted(self.axes.viewLim.intervalx)
+            # Axes width in inches times the output (or raster) resolution
+            n_bins = int(np.ceil(self.axes.bbox.width / self.figure.dpi *
+                                 getattr(renderer, 'dpi', self.figure.dpi)))
+            view = (x_min, x_max, max(n_bins, 1))
+            if view != self._view:
+                idx = minmax_indices(self._full_x, self._full_y, *view)
+                self.set_data(self._full_x[idx], self._full_y[idx])
+                self._view = view
+        # The parent method without its rasterisation wrapper, which has
+        # already been applied to this one
+        Line2D.draw.__wrapped__(self, renderer)
+
+
+def plot_decimated(ax, x, y, rasterized=True, **kwargs):
+    """Plots a long series as a ``DecimatedLine``.
+
+    Parameters
+    ----------
+    ax : Axes
+        Axes to plot on.
+    x, y : array, shape=(n_points,)
+        Data, sorted by ``x``.
+    rasterized : bool (default: True)
+        Whether the line is rasterised in vector output. Axes, labels and
+        all other artists stay vector.
+    **kwargs
+        Line properties, e.g. ``color``, ``linewidth`` and ``label``. Unlike
+        ``ax.plot``, the colour does not follow the property cycle.
+
+    Returns
+    -------
+    line : DecimatedLine
+    """
+    line = DecimatedLine(x, y, **kwargs)
+    line.set_rasterized(rasterized)
+    ax.add_line(line)
+    ax.autoscale_view()
+    return line
@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Subject registry: one row per subject with its ID, participant group and
+# the abbreviation of the group used in figures
+SUBJECTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'data', 'subjects.csv')
+
+_REGISTRY = {}
+
+
+def load_subjects(path=SUBJECTS_PATH):
+    """Loads the subject registry.
+
+    The registry is read once per path and shared by all callers, so it
+    should not be modified.
+
+    Parameters
+    ----------
+    path : str (default: SUBJECTS_PATH)
+        Registry file, with columns ``Subject number``, ``Participant`` and
+        ``Abbreviation``.
+
+    Returns
+    -------
+    subjects : DataFrame
+        Registry indexed and sorted by ``Subject number``, with columns
+        ``Participant``, ``Abbreviation`` and ``Label``, the label of each
+        subject in figures (e.g. ``'AB 1'``, the abbreviation of its group
+        followed by its rank within the group).
+    """
+    if path not in _REGISTRY:
+        subjects = pd.read_csv(path, index_col='Subject number')
+        if not subjects.index.is_unique:
+            raise ValueError("Duplicate subject numbers in {}.".format(path))
+        subjects = subjects.sort_index(kind='mergesort')
+        rank = subjects.groupby('Participant', sort=False).cumcount() + 1
+        subjects['Label'] = subjects['Abbreviation'] + ' ' + rank.astype(str)
+        _REGISTRY[path] = subjects
+    return _REGISTRY[path]
+
+
+def load_groups(path=SUBJECTS_PATH):
+    """Returns the participant groups of the registry.
+
+    Parameters
+    ----------
+    path : str (default: SUBJECTS_PATH)
+        Registry file.
+
+    Returns
+    -------
+    groups : DataFrame
+        One row per group, in order of first appearance in the registry,
+        indexed by ``Participant``, with columns ``Abbreviation`` and
+        ``Subjects`` (number of subjects).
+    """
+    subjects = load_subjects(path)
+    groups = subjects.drop_duplicates('Participant').set_index(
+        'Participant')[['Abbreviation']]
+    groups['Subjects'] = subjects['Participant'].value_counts().reindex(
+        groups.index).values
+    return groups
+
+
+def subject_ids(group=None, among=None, path=SUBJECTS_PATH):
+    """Returns subject IDs in registry order.
+
+    Parameters
+    ----------
+    group : str or None (default: None)
+        If not None, only subjects of this participant group are returned.
+    among : array or None (default: None)
+        If not None, only subjects in this array (e.g. the subject column of
+        a data set) are returned.
+    path : str (default: SUBJECTS_PATH)
+        Registry file.
+
+    Returns
+    -------
+    ids : array
+        Subject IDs.
+    """
+    subjects = load_subjects(path)
+    mask = np.ones(len(subjects), dtype=bool)
+    if group is not None:
+        mask &= (subjects['Participant'] == group).values
+    if among is not None:
+        mask &= np.isin(subjects.index.values, np.asarray(among))
+    return subjects.index.values[mask]
+
+
+def subject_attribute(ids, attribute='Participant', path=SUBJECTS_PATH):
+    """Looks up an attribute of every subject in an array.
+
+    Parameters
+    ----------
+    ids : array
+        Subject IDs, e.g. a column of a data frame.
+    attribute : str (default: 'Participant')
+        Registry column (see ``load_subjects``).
+    path : str (default: SUBJECTS_PATH)
+        Registry file.
+
+    Returns
+    -------
+    values : array, shape=(len(ids),)
+        Attribute of each subject; NaN for subjects missing from the
+        registry.
+    """
+    return load_subjects(path)[attribute].reindex(np.asarray(ids)).values
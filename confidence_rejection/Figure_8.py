@@ -1,16 +1,22 @@
-import numpy as np
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as 
+import seaborn as sns
 import warnings
 
+from roc import threshold_index
+from utils import plot_decimated, stage
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
 warnings.filterwarnings("ignore")
 
 # Cutoff for False positive rate
 FPR_CUTOFF = 0.0005
 
 # Load data for shown participant and movement class
-roc_data = pd.read_csv('data/roc_lateral.csv')
+with stage('load'):
+    roc_data = pd.read_csv(os.path.join(HERE, 'data', 'roc_lateral.csv'))
 
 sns.set(rc={'axes.facecolor':'#f5f5f5'}, style="darkgrid", font="Times New Roman", font_scale=0.8)
 
@@ -21,11 +27,13 @@ fig = plt.figure(figsize=figsize)
 
 # First row: threshold selection example
 palette = sns.color_palette("Greys", 4)[1:]
-thresh =  roc_data.Thresholds[np.where(roc_data.FPR>FPR_CUTOFF)[0][0]]
+thresh_idx = threshold_index(roc_data.FPR.values, FPR_CUTOFF)
+thresh = roc_data.Thresholds[thresh_idx]
 lw=2
 ax1 = fig.add_subplot(2,1,1)
 ax1.plot([-0.015, -0.015, 1], [0, 1.005, 1.005], color=palette[1], lw=lw, linestyle='-.', label='Perfect')
-ax1.plot(roc_data.FPR, roc_data.TPR,lw=lw, color=palette[2], label='RDA')
+plot_decimated(ax1, roc_data.FPR.values, roc_data.TPR.values,
+               rasterized=False, lw=lw, color=palette[2], label='RDA')
 ax1.plot([0, 1], [0, 1], color=palette[0], lw=lw, linestyle='--', label='Random')
 
 ax1.set_xlim([-0.1, 1.01])
@@ -38,13 +46,15 @@ ax1.legend(loc='lower right', frameon=True, edgecolor=".3", bbox_to_anchor=(0.99
 ax1.set_title("ROC (original scale)")
 
 ax2 = fig.add_subplot(2,1,2)
-ax2.plot(roc_data.FPR, roc_data.TPR, label='RDA classifier', color=palette[2], lw=lw)
+plot_decimated(ax2, roc_data.FPR.values, roc_data.TPR.values,
+               rasterized=False, label='RDA classifier', color=palette[2],
+               lw=lw)
 ax2.set_xlim([-0.0001, 0.002])
 ax2.set_xlabel("False positive rate")
 ax2.set_ylabel("True positive rate")
 ax2.vlines(x=FPR_CUTOFF, ymin=0, ymax=1, colors='grey', linestyles='--', color=palette[0], label='FPR cut-off')
 ax2.annotate(r'$\theta_c $ = {:.3f}'.format(thresh), 
-             xy=(FPR_CUTOFF, roc_data.TPR[np.where(roc_data.FPR>FPR_CUTOFF)[0][0]]), 
+             xy=(FPR_CUTOFF, roc_data.TPR[thresh_idx]), 
              xytext=(FPR_CUTOFF+3*1e-4, 0.25),
              arrowprops=dict(facecolor='black', color='k', shrink=0.01, width=1, headwidth=4, headlength=4),)
 ax2.legend(loc='upper right', bbox_to_anchor=[0.78, 1.025],
@@ -55,6 +65,8 @@ plt.ticklabel_format(style='sci', axis='x', scilimits=(0,0))
 fig.text(0.02, 0.95, "a", weight="bold")
 fig.text(0.02, 0.5, "b", weight="bold")
 
-fig.tight_layout()
-plt.savefig('Figure_8.pdf', dpi=600, bbox_inches='tight',
-            transparent=False, pad_inches=0)
\ No newline at end of file
+with stage('layout'):
+    fig.tight_layout()
+with stage('save'):
+    plt.savefig(os.path.join(HERE, 'Figure_8.pdf'), dpi=600,
+                bbox_inches='tight', transparent=False, pad_inches=0)
@@ -0,0 +1,330 @@
+import numpy as np
+import pandas as pd
+
+LABELS = ['rest', 'power', 'lateral', 'tripod', 'pointer', 'open']
+
+
+def threshold_index(fpr, fpr_cutoff):
+    """Returns the index of the first ROC point with FPR above a cutoff.
+
+    Equivalent to ``np.where(fpr > fpr_cutoff)[0][0]`` but uses binary
+    search, since the FPR of a ROC curve is non-decreasing. Like it, fails
+    if no FPR exceeds the cutoff.
+
+    Parameters
+    ----------
+    fpr : array, shape=(n_thresholds,)
+        False positive rates, sorted by decreasing threshold.
+    fpr_cutoff : float
+        Cutoff for the false positive rate.
+
+    Returns
+    -------
+    idx : int
+        Index into the ROC curve arrays.
+
+    Raises
+    ------
+    ValueError
+        If no FPR exceeds the cutoff.
+    """
+    idx = int(np.searchsorted(fpr, fpr_cutoff, side='right'))
+    if idx == len(fpr):
+        raise ValueError("No false positive rate exceeds the cutoff "
+                         "{}.".format(fpr_cutoff))
+    return idx
+
+
+class OneVsRestROC(object):
+    """One-vs-rest ROC curves for all classes of a probabilistic classifier.
+
+    Scores of every class are sorted once (O(n log n)) and the resulting
+    curves are kept, so that thresholds for any FPR cutoff are found by
+    binary search.
+
+    Attributes
+    ----------
+    thresholds_ : list of arrays
+        Distinct score thresholds of each class, in decreasing order.
+    tpr_ : list of arrays
+        True positive rate at each threshold.
+    fpr_ : list of arrays
+        False positive rate at each threshold.
+    """
+    def fit(self, proba, y):
+        """Computes ROC curves.
+
+        Parameters
+        ----------
+        proba : array, shape=(n_samples, n_classes)
+            Posterior class probabilities.
+        y : array, shape=(n_samples,)
+            True class indices.
+
+        Returns
+        -------
+        self : OneVsRestROC
+        """
+        proba = np.asarray(proba)
+        y = np.asarray(y)
+        n_classes = proba.shape[1]
+        order = np.argsort(-proba, axis=0, kind='mergesort')
+        scores_sorted = np.take_along_axis(proba, order, axis=0)
+        positive_sorted = y[order] == np.arange(n_classes)
+
+        self.thresholds_, self.tpr_, self.fpr_ = [], [], []
+        for k in range(n_classes):
+            scores = scores_sorted[:, k]
+            # Last position of every distinct score
+            distinct = np.r_[np.where(np.diff(scores))[0], scores.size - 1]
+            tps = np.cumsum(positive_sorted[:, k])[distinct]
+            fps = distinct + 1 - tps
+            self.thresholds_.append(scores[distinct])
+            self.tpr_.append(tps / float(max(tps[-1], 1)))
+            self.fpr_.append(fps / float(max(fps[-1], 1)))
+        return self
+
+    def roc_frame(self, k):
+        """Returns the ROC curve of a class as a data frame.
+
+        Parameters
+        ----------
+        k : int
+            Class index.
+
+        Returns
+        -------
+        roc_data : DataFrame
+            Data frame with columns ``Thresholds``, ``TPR`` and ``FPR``, in
+            the format of ``data/roc_lateral.csv``.
+        """
+        return pd.DataFrame({'Thresholds': self.thresholds_[k],
+                             'TPR': self.tpr_[k],
+                             'FPR': self.fpr_[k]},
+                            columns=['Thresholds', 'TPR', 'FPR'])
+
+    def threshold_at_fpr(self, fpr_cutoff, max_threshold=None):
+        """Returns the rejection threshold of every class for an FPR cutoff.
+
+        For each class, the threshold is that of the first ROC point whose
+        FPR exceeds the cutoff (see ``threshold_index``, which raises
+        ``ValueError`` if there is none).
+
+        Parameters
+        ----------
+        fpr_cutoff : float or array, shape=(n_classes,)
+            Cutoff for the false positive rate, common or per class.
+        max_threshold : float or None (default: None)
+            If not None, thresholds are capped at this value.
+
+        Returns
+        -------
+        thresholds : array, shape=(n_classes,)
+            Rejection thresholds.
+        """
+        n_classes = len(self.thresholds_)
+        cutoffs = np.broadcast_to(fpr_cutoff, (n_classes,))
+        thresholds = np.array([
+            self.thresholds_[k][threshold_index(self.fpr_[k], cutoffs[k])]
+            for k in range(n_classes)])
+        if max_threshold is not None:
+            thresholds = np.minimum(thresholds, max_threshold)
+        return thresholds
+
+    def save_thresholds(self, path, fpr_cutoff, max_threshold=None):
+        """Writes the thresholds of all classes in the format of
+        ``rejection_thresholds.txt``.
+
+        Parameters
+        ----------
+        path : str
+            Output path.
+        fpr_cutoff : float or array, shape=(n_classes,)
+            Cutoff for the false positive rate.
+        max_threshold : float or None (default: None)
+            If not None, thresholds are capped at this value.
+
+        Returns
+        -------
+        thresholds : array, shape=(n_classes,)
+            Rejection thresholds.
+        """
+        thresholds = self.threshold_at_fpr(fpr_cutoff,
+                                           max_threshold=max_threshold)
+        np.savetxt(path, thresholds)
+        return thresholds
+
+
+def complement_log_edges(n_bins=4096, min_gap=1e-12):
+    """Returns histogram bin edges in [0, 1] that are dense close to 1.
+
+    The lower half of the bins is spread uniformly over [0, 0.5] and the
+    upper half logarithmically in the distance from 1, down to
+    ``min_gap``. Posterior probabilities of confident classifiers pile up
+    just below 1, which is also where rejection thresholds lie.
+
+    Parameters
+    ----------
+    n_bins : int (default: 4096)
+        Number of bins.
+    min_gap : float (default: 1e-12)
+        Distance from 1 of the highest inner edge.
+
+    Returns
+    -------
+    edges : array, shape=(n_bins + 1,)
+        Increasing bin edges, starting at 0 and ending at 1.
+    """
+    n_low = n_bins // 2
+    n_high = n_bins - n_low
+    low = np.linspace(0., 0.5, n_low, endpoint=False)
+    high = 1. - np.logspace(np.log10(0.5), np.log10(min_gap), n_high)
+    return np.concatenate((low, high, [1.]))
+
+
+class StreamingROC(object):
+    """Approximate one-vs-rest ROC curves from streaming score histograms.
+
+    Scores of positive and negative samples of every class are accumulated
+    chunk by chunk into fixed-bin histograms, so memory does not depend on
+    the number of samples. Accumulators built on separate chunks or
+    workers with the same bin edges can be merged.
+
+    Error bound: ROC points are reported at the lower bin edges, where
+    they are exact, i.e. each reported (threshold, TPR, FPR) triple lies
+    on the exact ROC curve. Only the resolution is reduced. For an FPR
+    cutoff, the exact threshold selected as in ``threshold_at_fpr`` of
+    ``OneVsRestROC`` lies in the bin whose lower edge is returned:
+
+        returned <= exact < returned + bin width
+
+    and the returned FPR (TPR) exceeds the exact one by at most the
+    fraction of negative (positive) samples falling in that bin.
+
+    Parameters
+    ----------
+    n_classes : int
+        Number of classes.
+    edges : array, shape=(n_bins + 1,) or None (default: None)
+        Increasing bin edges covering the score range. If None,
+        ``complement_log_edges()`` is used.
+    """
+    def __init__(self, n_classes, edges=None):
+        if edges is None:
+            edges = complement_log_edges()
+        self.n_classes = n_classes
+        self.edges = np.asarray(edges, dtype=np.float64)
+        n_bins = self.edges.size - 1
+        self.pos_counts = np.zeros((n_classes, n_bins), dtype=np.int64)
+        self.neg_counts = np.zeros((n_classes, n_bins), dtype=np.int64)
+
+    def update(self, proba, y):
+        """Adds a chunk of scores to the histograms.
+
+        Parameters
+        ----------
+        proba : array, shape=(n_samples, n_classes)
+            Posterior class probabilities.
+        y : array, shape=(n_samples,)
+            True class indices.
+
+        Returns
+        -------
+        self : StreamingROC
+        """
+        n_bins = self.edges.size - 1
+        idx = np.searchsorted(self.edges, proba, side='right') - 1
+        np.clip(idx, 0, n_bins - 1, out=idx)
+        idx += np.arange(self.n_classes) * n_bins
+        positive = np.asarray(y)[:, np.newaxis] == np.arange(self.n_classes)
+        size = self.n_classes * n_bins
+        self.pos_counts += np.bincount(
+            idx[positive], minlength=size).reshape(self.n_classes, n_bins)
+        self.neg_counts += np.bincount(
+            idx[~positive], minlength=size).reshape(self.n_classes, n_bins)
+        return self
+
+    def merge(self, other):
+        """Adds the histograms of another accumulator in place.
+
+        Parameters
+        ----------
+        other : StreamingROC
+            Accumulator with the same classes and bin edges.
+
+        Returns
+        -------
+        self : StreamingROC
+        """
+        if (other.n_classes != self.n_classes or
+                not np.array_equal(other.edges, self.edges)):
+            raise ValueError("Accumulators must have the same number of "
+                             "classes and bin edges.")
+        self.pos_counts += other.pos_counts
+        self.neg_counts += other.neg_counts
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def roc(self, k):
+        """Returns the approximate ROC curve of a class.
+
+        Parameters
+        ----------
+        k : int
+            Class index.
+
+        Returns
+        -------
+        thresholds : array
+            Lower edges of non-empty bins, in decreasing order.
+        tpr : array
+            True positive rate at each threshold.
+        fpr : array
+            False positive rate at each threshold.
+        """
+        pos = self.pos_counts[k][::-1]
+        neg = self.neg_counts[k][::-1]
+        nonempty = (pos + neg) > 0
+        tps = np.cumsum(pos)[nonempty]
+        fps = np.cumsum(neg)[nonempty]
+        thresholds = self.edges[:-1][::-1][nonempty]
+        tpr = tps / float(max(pos.sum(), 1))
+        fpr = fps / float(max(neg.sum(), 1))
+        return thresholds, tpr, fpr
+
+    def roc_frame(self, k):
+        """Returns the approximate ROC curve of a class as a data frame
+        with columns ``Thresholds``, ``TPR`` and ``FPR``."""
+        thresholds, tpr, fpr = self.roc(k)
+        return pd.DataFrame({'Thresholds': thresholds, 'TPR': tpr,
+                             'FPR': fpr},
+                            columns=['Thresholds', 'TPR', 'FPR'])
+
+    def threshold_at_fpr(self, fpr_cutoff, max_threshold=None):
+        """Returns the rejection threshold of every class for an FPR cutoff.
+
+        See the class docstring for the error bound. Raises ``ValueError``
+        if no FPR of a class exceeds its cutoff (see ``threshold_index``).
+
+        Parameters
+        ----------
+        fpr_cutoff : float or array, shape=(n_classes,)
+            Cutoff for the false positive rate, common or per class.
+        max_threshold : float or None (default: None)
+            If not None, thresholds are capped at this value.
+
+        Returns
+        -------
+        thresholds : array, shape=(n_classes,)
+            Rejection thresholds.
+        """
+        cutoffs = np.broadcast_to(fpr_cutoff, (self.n_classes,))
+        thresholds = np.empty(self.n_classes)
+        for k in range(self.n_classes):
+            thresh, _, fpr = self.roc(k)
+            thresholds[k] = thresh[threshold_index(fpr, cutoffs[k])]
+        if max_threshold is not None:
+            thresholds = np.minimum(thresholds, max_threshold)
+        return thresholds
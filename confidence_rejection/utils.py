@@ -0,0 +1,10 @@
+import os
+import sys
+
+_ROOT = os.path.normpath(os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), os.pardir))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from common.instrumentation import stage
+from common.plotting import plot_decimated
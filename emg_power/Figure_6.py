@@ -1,15 +1,21 @@
-import pandas as pd
+import os
 import warnings
 from matplotlib import pyplot as plt
 import seaborn as sns
 
-from utils import get_df_early_late
+from utils import get_df_early_late, load_cached, stage
 from utils import swarmplot
 
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, '.frame_cache')
+
 warnings.filterwarnings("ignore")
 
-df = pd.read_csv('data/raw_emg_power_trial.csv')
-df_early_late = get_df_early_late(df)
+with stage('load'):
+    df_early_late = load_cached(
+            get_df_early_late,
+            os.path.join(HERE, 'data', 'raw_emg_power_trial.csv'),
+            cache_dir=CACHE_DIR)
 
 # Make the plot
 # Style options
@@ -56,5 +62,6 @@ y, h, col = 0.85e-8, 2e-10, 'k'
 plt.plot([x1, x1, x2, x2], [y, y+h, y+h, y], lw=1.5, c=col)
 plt.text((x1+x2)*.5, y+0.8*h, "*", ha='center', va='bottom', color=col,
          fontsize=12)
-plt.savefig('Figure_6.pdf', dpi=600, bbox_inches='tight',
-            transparent=False, pad_inches=0)
\ No newline at end of file
+with stage('save'):
+    plt.savefig(os.path.join(HERE, 'Figure_6.pdf'), dpi=600,
+                bbox_inches='tight', transparent=False, pad_inches=0)
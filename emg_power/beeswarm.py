@@ -0,0 +1,182 @@
+import numpy as np
+
+# Minimum number of candidate positions tested at once; blocks grow
+# geometrically when all candidates of a block overlap the swarm
+_MIN_BLOCK = 16
+_BLOCK_GROWTH = 4
+# Largest number of candidate-neighbour pairs tested without pruning
+_DENSE_SIZE = 4096
+
+
+def _neighbour_starts(y, d):
+    """Returns, for every point, the index of the first earlier point that
+    could overlap with it.
+
+    Earlier points ``j`` with ``starts[i] <= j < i`` are the neighbours of
+    point ``i``: the longest run of points preceding ``i`` with
+    ``y[i] - y[j] < d``. Points are expected to be sorted by ``y``, in which
+    case the runs are found by binary search; otherwise they are found by
+    scanning backwards from each point.
+    """
+    n = y.size
+    idx = np.arange(n)
+    if n > 1 and not np.all(y[1:] >= y[:-1]):
+        starts = idx.copy()
+        for i in range(n):
+            j = i
+            while j > 0 and y[i] - y[j - 1] < d:
+                j -= 1
+            starts[i] = j
+        return starts
+
+    starts = np.minimum(np.searchsorted(y, y - d, side='right'), idx)
+    # The search compares y[j] with y[i] - d; correct for rounding so that
+    # y[i] - y[j] < d holds exactly as in the scan
+    while True:
+        prev = np.maximum(starts - 1, 0)
+        extend = (starts > 0) & (y - y[prev] < d)
+        if not extend.any():
+            break
+        starts[extend] -= 1
+    while True:
+        first = np.minimum(starts, n - 1)
+        shrink = (starts < idx) & ~(y - y[first] < d)
+        if not shrink.any():
+            break
+        starts[shrink] += 1
+    return starts
+
+
+def _candidates(x_i, neighbours_x, dx):
+    """Returns candidate x positions in the order of the reference
+    implementation: the original position, then the positions touching each
+    neighbour, alternately left first and right first."""
+    left = neighbours_x - dx
+    right = neighbours_x + dx
+    pairs = np.empty((neighbours_x.size, 2))
+    pairs[0::2, 0] = left[0::2]
+    pairs[0::2, 1] = right[0::2]
+    pairs[1::2, 0] = right[1::2]
+    pairs[1::2, 1] = left[1::2]
+    return np.concatenate(([x_i], pairs.ravel()))
+
+
+def _first_free(candidates_x, neighbours_x, dy_square, d, block_size):
+    """Returns the rank of the first candidate position that does not overlap
+    any neighbour, or None.
+
+    Candidates are tested in blocks, starting with ``block_size``. Small
+    blocks are tested against all neighbours at once; otherwise neighbours
+    are sorted by x so that each candidate is only tested against those
+    within ``2 d`` of it along x, all others being too far to overlap.
+    """
+    d_square = d ** 2
+    reach = 2 * d
+    sorted_x = None
+    start, size = 0, block_size
+    while start < candidates_x.size:
+        block = candidates_x[start:start + size]
+        # Candidates are NaN where a neighbour is too far along y to touch;
+        # like in the reference algorithm they are never valid
+        overlaps = np.isnan(block)
+        if block.size * neighbours_x.size <= _DENSE_SIZE:
+            sq_distances = (np.power(neighbours_x - block[:, np.newaxis],
+                                     2.0) + dy_square)
+            overlaps |= ~np.all(sq_distances >= d_square, axis=1)
+        else:
+            if sorted_x is None:
+                order = np.argsort(neighbours_x, kind='mergesort')
+                sorted_x = neighbours_x[order]
+                sorted_dy_square = dy_square[order]
+            bounds = np.searchsorted(sorted_x, np.concatenate(
+                (block - reach, block + reach)))
+            lo, hi = bounds[:block.size], bounds[block.size:]
+            counts = hi - lo
+            owner = np.repeat(np.arange(block.size), counts)
+            pos = (np.arange(owner.size) -
+                   np.repeat(np.cumsum(counts) - counts - lo, counts))
+            sq_distances = (np.power(sorted_x[pos] - block[owner], 2.0) +
+                            sorted_dy_square[pos])
+            overlaps[owner[~(sq_distances >= d_square)]] = True
+        if not overlaps.all():
+            return start + int(np.argmin(overlaps))
+        start += size
+        size *= _BLOCK_GROWTH
+    return None
+
+
+def beeswarm(orig_xy, d):
+    """Adjusts the positions of points along the categorical axis so that
+    they do not overlap.
+
+    Produces the same layout as the point-by-point algorithm of seaborn's
+    swarm plot (up to rounding in the last bit of the positions): every
+    point is placed at the position closest to the centre of the swarm that
+    does not overlap the points placed before it. Placed
+    points are kept sorted along the value axis, so the neighbours of each
+    new point are found by binary search, and candidate positions are
+    generated and tested for overlap with array operations. The cost grows
+    with the number of points times the number of neighbours of each point,
+    rather than the square of the number of points.
+
+    Parameters
+    ----------
+    orig_xy : array, shape=(n_points, 2)
+        Point positions in point coordinates, with the categorical axis
+        first. Points should be sorted by the second coordinate.
+    d : float
+        Point diameter, in point coordinates.
+
+    Returns
+    -------
+    new_xy : array, shape=(n_points, 2)
+        Adjusted positions.
+    """
+    orig_xy = np.asarray(orig_xy, dtype=np.float64)
+    new_xy = orig_xy.copy()
+    if orig_xy.shape[0] < 2:
+        return new_xy
+    midline = orig_xy[0, 0]
+    x, y = new_xy[:, 0], orig_xy[:, 1]
+    starts = _neighbour_starts(y, d)
+    # Neighbouring points usually find room at a similar rank among their
+    # candidates, so the previous rank sets the size of the first block
+    block_size = _MIN_BLOCK
+    for i in np.where(starts < np.arange(y.size))[0]:
+        neighbours_x = x[starts[i]:i]
+        neighbours_y = y[starts[i]:i]
+        dx = np.sqrt(d ** 2 - (y[i] - neighbours_y) ** 2) * 1.05
+        candidates_x = _candidates(orig_xy[i, 0], neighbours_x, dx)
+        # Sort candidates by their centrality
+        candidates_x = candidates_x[np.argsort(np.abs(candidates_x -
+                                                      midline))]
+        rank = _first_free(candidates_x, neighbours_x,
+                           np.power(neighbours_y - y[i], 2.0), d, block_size)
+        if rank is None:
+            raise Exception('No non-overlapping candidates found. '
+                            'This should not happen.')
+        x[i] = candidates_x[rank]
+        block_size = max(_MIN_BLOCK, 2 * rank + 1)
+    return new_xy
+
+
+def add_gutters(points, center, width):
+    """Stops points from extending beyond their territory.
+
+    Parameters
+    ----------
+    points : array
+        Positions along the categorical axis, modified in place.
+    center : float
+        Centre of the swarm.
+    width : float
+        Width available to the swarm.
+
+    Returns
+    -------
+    points : array
+        The clipped positions.
+    """
+    half_width = width / 2
+    np.clip(points, center - half_width, center + half_width, out=points)
+    return points
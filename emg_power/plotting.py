@@ -0,0 +1,329 @@
+import colorsys
+import warnings
+
+import numpy as np
+import pandas as pd
+from matplotlib import pyplot as plt
+import matplotlib as mpl
+import seaborn as sns
+
+from beeswarm import beeswarm, add_gutters
+
+
+def _categorical_order(values, order=None):
+    """Returns the order of the levels of a categorical variable, as in
+    seaborn: categories of a categorical, sorted levels of a numeric
+    variable, or levels in order of appearance otherwise."""
+    if order is not None:
+        return list(order)
+    values = pd.Series(values)
+    if hasattr(values, 'cat'):
+        return list(values.cat.categories)
+    order = list(pd.unique(values.dropna()))
+    if pd.api.types.is_numeric_dtype(values):
+        order = sorted(order)
+    return order
+
+
+def _infer_orient(x, y, orient=None):
+    """Returns 'v' if ``x`` is the categorical variable and 'h' otherwise."""
+    if orient is not None:
+        return 'h' if orient.lower().startswith('h') else 'v'
+    if not pd.api.types.is_numeric_dtype(pd.Series(x)):
+        return 'v'
+    if not pd.api.types.is_numeric_dtype(pd.Series(y)):
+        return 'h'
+    return 'v'
+
+
+# Adapt the swarmplot a bit so that swarm points are sitting in the middle
+# of boxplots. Only long-form data is supported. Only public seaborn
+# functions are used and points are laid out by ``beeswarm.beeswarm``.
+class _SwarmPlotter(object):
+    def __init__(self, x, y, hue, data, order, hue_order,
+                 dodge, orient, color, palette):
+        """Initialize the plotter."""
+        self.establish_variables(x, y, hue, data, orient, order, hue_order)
+        self.establish_colors(color, palette)
+
+        # Set object attributes
+        self.dodge = dodge
+        self.width = .8
+
+    def establish_variables(self, x, y, hue, data, orient, order, hue_order):
+        """Group the values by level of the categorical (and hue) variable."""
+        if x is None or y is None:
+            raise ValueError("Both x and y must be given.")
+        if data is not None:
+            x, y = [data[v] if isinstance(v, str) else v for v in (x, y)]
+            if isinstance(hue, str):
+                hue = data[hue]
+
+        self.orient = _infer_orient(x, y, orient)
+        vals, groups = (y, x) if self.orient == "v" else (x, y)
+        self.value_label = getattr(vals, "name", None)
+        self.group_label = getattr(groups, "name", None)
+        self.group_names = _categorical_order(groups, order)
+        groups = np.asarray(groups)
+        vals = np.asarray(vals)
+        self.plot_data = [vals[groups == g] for g in self.group_names]
+
+        if hue is None:
+            self.hue_names = self.plot_hues = self.hue_title = None
+        else:
+            self.hue_title = getattr(hue, "name", None)
+            self.hue_names = _categorical_order(hue, hue_order)
+            hue = np.asarray(hue)
+            self.plot_hues = [hue[groups == g] for g in self.group_names]
+
+    def establish_colors(self, color, palette):
+        """Get a list of colors for the main component of the plots."""
+        if self.hue_names is None:
+            n_colors = len(self.plot_data)
+        else:
+            n_colors = len(self.hue_names)
+
+        if color is None and palette is None:
+            if n_colors <= len(sns.color_palette()):
+                colors = sns.color_palette(n_colors=n_colors)
+            else:
+                colors = sns.husl_palette(n_colors, l=.7)
+        elif palette is None:
+            if self.hue_names is None:
+                colors = [color] * n_colors
+            else:
+                colors = sns.dark_palette(color, n_colors)
+        else:
+            if isinstance(palette, dict):
+                levels = (self.group_names if self.hue_names is None
+                          else self.hue_names)
+                palette = [palette[l] for l in levels]
+            colors = sns.color_palette(palette, n_colors)
+
+        self.colors = sns.color_palette(colors)
+        # Color of the lines framing the points
+        lum = min(colorsys.rgb_to_hls(*c)[1] for c in self.colors) * .6
+        self.gray = mpl.colors.rgb2hex((lum, lum, lum))
+
+    @property
+    def point_colors(self):
+        """Return a color for each scatter point based on group and hue."""
+        colors = []
+        for i, group_data in enumerate(self.plot_data):
+            group_colors = np.empty((group_data.size, 3))
+            if self.plot_hues is None:
+                group_colors[:] = self.colors[i]
+            else:
+                for j, level in enumerate(self.hue_names):
+                    if group_data.size:
+                        group_colors[self.plot_hues[i] == level] = \
+                            self.colors[j]
+            colors.append(group_colors)
+        return colors
+
+    @property
+    def hue_offsets(self):
+        """A list of center positions for plots when hue nesting is used."""
+        n_levels = len(self.hue_names)
+        if self.dodge:
+            each_width = self.width / n_levels
+            offsets = np.linspace(0, self.width - each_width, n_levels)
+            offsets -= offsets.mean()
+        else:
+            offsets = np.zeros(n_levels)
+        return offsets
+
+    @property
+    def nested_width(self):
+        """A float with the width of plot elements when hue nesting is
+        used."""
+        if self.dodge:
+            return self.width / len(self.hue_names) * .98
+        return self.width
+
+    def swarm_points(self, ax, points, center, width, s, **kws):
+        """Find new positions on the categorical axis for each point."""
+        # Convert from point size (area) to diameter
+        default_lw = mpl.rcParams["patch.linewidth"]
+        lw = kws.get("linewidth", kws.get("lw", default_lw))
+        dpi = ax.figure.dpi
+        d = (np.sqrt(s) + lw) * (dpi / 72)
+
+        # Transform the data coordinates to point coordinates.
+        # We'll figure out the swarm positions in the latter
+        # and then convert back to data coordinates and replot
+        orig_xy = ax.transData.transform(points.get_offsets())
+
+        # Order the variables so that x is the categorical axis
+        if self.orient == "h":
+            orig_xy = orig_xy[:, [1, 0]]
+
+        # Do the beeswarm in point coordinates
+        new_xy = beeswarm(orig_xy, d)
+
+        # Transform the point coordinates back to data coordinates
+        if self.orient == "h":
+            new_xy = new_xy[:, [1, 0]]
+        new_x, new_y = ax.transData.inverted().transform(new_xy).T
+
+        # Add gutters
+        if self.orient == "v":
+            add_gutters(new_x, center, width)
+        else:
+            add_gutters(new_y, center, width)
+
+        # Reposition the points so they do not overlap
+        points.set_offsets(np.c_[new_x, new_y])
+
+    def draw_swarmplot(self, ax, kws):
+        """Plot the data."""
+        s = kws.pop("s")
+
+        centers = []
+        swarms = []
+
+        # Set the categorical axes limits here for the swarm math
+        if self.orient == "v":
+            ax.set_xlim(-.5, len(self.plot_data) - .5)
+        else:
+            ax.set_ylim(-.5, len(self.plot_data) - .5)
+
+        # Plot each swarm
+        for i, group_data in enumerate(self.plot_data):
+
+            if self.plot_hues is None or not self.dodge:
+
+                width = self.width
+
+                if self.hue_names is None:
+                    hue_mask = np.ones(group_data.size, bool)
+                else:
+                    hue_mask = np.array([h in self.hue_names
+                                         for h in self.plot_hues[i]], bool)
+                    # Broken on older numpys
+                    # hue_mask = np.in1d(self.plot_hues[i], self.hue_names)
+
+                swarm_data = group_data[hue_mask]
+
+                # Sort the points for the beeswarm algorithm
+                sorter = np.argsort(swarm_data)
+                swarm_data = swarm_data[sorter]
+                point_colors = self.point_colors[i][hue_mask][sorter]
+
+                # Plot the points in centered positions
+                cat_pos = np.ones(swarm_data.size) * i
+                kws.update(c=point_colors)
+                if self.orient == "v":
+                    points = ax.scatter(cat_pos, swarm_data, s=s, **kws)
+                else:
+                    points = ax.scatter(swarm_data, cat_pos, s=s, **kws)
+
+                centers.append(i)
+                swarms.append(points)
+
+            else:
+                offsets = self.hue_offsets/2
+                width = self.nested_width
+
+                for j, hue_level in enumerate(self.hue_names):
+                    #if i == 0 && j == 0:
+                     #   offsets = offsets + 0.05
+                    hue_mask = self.plot_hues[i] == hue_level
+                    swarm_data = group_data[hue_mask]
+
+                    # Sort the points for the beeswarm algorithm
+                    sorter = np.argsort(swarm_data)
+                    swarm_data = swarm_data[sorter]
+                    point_colors = self.point_colors[i][hue_mask][sorter]
+
+                    # Plot the points in centered positions
+                    center = i + offsets[j]
+                    cat_pos = np.ones(swarm_data.size) * center
+                    kws.update(c=point_colors)
+                    if self.orient == "v":
+                        points = ax.scatter(cat_pos, swarm_data, s=s, **kws)
+                    else:
+                        points = ax.scatter(swarm_data, cat_pos, s=s, **kws)
+
+                    centers.append(center)
+                    swarms.append(points)
+
+        # Update the position of each point on the categorical axis
+        # Do this after plotting so that the numerical axis limits are correct
+        for center, swarm in zip(centers, swarms):
+            if swarm.get_offsets().size:
+                self.swarm_points(ax, swarm, center, width, s, **kws)
+
+    def add_legend_data(self, ax):
+        """Add empty scatterplot artists with labels for the legend."""
+        if self.hue_names is not None:
+            for rgb, label in zip(self.colors, self.hue_names):
+                ax.scatter([], [], color=mpl.colors.rgb2hex(rgb),
+                           label=label, s=60)
+
+    def annotate_axes(self, ax):
+        """Add descriptive labels to an Axes object."""
+        if self.orient == "v":
+            xlabel, ylabel = self.group_label, self.value_label
+        else:
+            xlabel, ylabel = self.value_label, self.group_label
+        if xlabel is not None:
+            ax.set_xlabel(xlabel)
+        if ylabel is not None:
+            ax.set_ylabel(ylabel)
+
+        ticks = np.arange(len(self.plot_data))
+        if self.orient == "v":
+            ax.set_xticks(ticks)
+            ax.set_xticklabels(self.group_names)
+            ax.xaxis.grid(False)
+            ax.set_xlim(-.5, len(self.plot_data) - .5, auto=None)
+        else:
+            ax.set_yticks(ticks)
+            ax.set_yticklabels(self.group_names)
+            ax.yaxis.grid(False)
+            ax.set_ylim(-.5, len(self.plot_data) - .5, auto=None)
+
+        if self.hue_names is not None:
+            leg = ax.legend(loc="best")
+            if self.hue_title is not None:
+                try:
+                    title_size = mpl.rcParams["axes.labelsize"] * .85
+                except TypeError: # labelsize is something like "large"
+                    title_size = mpl.rcParams["axes.labelsize"]
+                leg.set_title(self.hue_title, prop={'size': title_size})
+
+    def plot(self, ax, kws):
+        """Make the full plot."""
+        self.draw_swarmplot(ax, kws)
+        self.add_legend_data(ax)
+        self.annotate_axes(ax)
+        if self.orient == "h":
+            ax.invert_yaxis()
+
+def swarmplot(x=None, y=None, hue=None, data=None, order=None, hue_order=None,
+              dodge=False, orient=None, color=None, palette=None,
+              size=5, edgecolor="gray", linewidth=0, ax=None, **kwargs):
+
+    if "split" in kwargs:
+        dodge = kwargs.pop("split")
+        msg = "The `split` parameter has been renamed to `dodge`."
+        warnings.warn(msg, UserWarning)
+
+    plotter = _SwarmPlotter(x, y, hue, data, order, hue_order,
+                            dodge, orient, color, palette)
+    if ax is None:
+        ax = plt.gca()
+
+    kwargs.setdefault("zorder", 3)
+    size = kwargs.get("s", size)
+    if linewidth is None:
+        linewidth = size / 10
+    if edgecolor == "gray":
+        edgecolor = plotter.gray
+    kwargs.update(dict(s=size ** 2,
+                       edgecolor=edgecolor,
+                       linewidth=linewidth))
+
+    plotter.plot(ax, kwargs)
+    return ax
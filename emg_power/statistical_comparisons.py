@@ -1,13 +1,19 @@
-import pandas as pd
+import os
 from scipy.stats import wilcoxon
 import warnings
 
-from utils import get_df_early_late
+from utils import get_df_early_late, load_cached, stage
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, '.frame_cache')
 
 warnings.filterwarnings("ignore")
 
-df = pd.read_csv('data/raw_emg_power_trial.csv')
-df_early_late = get_df_early_late(df)
+with stage('load'):
+    df_early_late = load_cached(
+            get_df_early_late,
+            os.path.join(HERE, 'data', 'raw_emg_power_trial.csv'),
+            cache_dir=CACHE_DIR)
 
 # Get early and late EMG variance as numpy arrays
 for electrodes in ['Used', 'Not used']:
@@ -15,10 +21,11 @@ for electrodes in ['Used', 'Not used']:
                              (df_early_late["Phase"]=='Early')]['Average EMG variance']
     late_var = df_early_late[(df_early_late["Electrodes"]==electrodes) &
                              (df_early_late["Phase"]=='Late')]['Average EMG variance']
+    with stage('tests'):
+        p = wilcoxon(early_var, late_var)[1]
     
     print("{} electrodes".format(electrodes))
     print("Wilcoxon signed-rank test (early vs. late trials)")
     print("-------------------------------------------------")
-    print("p={:.3f}, n={}".format(wilcoxon(early_var, late_var)[1],
-          early_var.size))
+    print("p={:.3f}, n={}".format(p, early_var.size))
     print("\n")
\ No newline at end of file
@@ -1,21 +1,26 @@
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import warnings
 
-from utils import robust_reg_model_p
+from utils import robust_reg_model_p, plot_robust_fit, stage
+
+HERE = os.path.dirname(os.path.abspath(__file__))
 warnings.filterwarnings("ignore")
 
 # Load data
-df = pd.read_csv('data/average_results.csv')
+with stage('load'):
+    df = pd.read_csv(os.path.join(HERE, 'data', 'average_results.csv'))
 
 # Fit robust regression models between offline metrics (classification
 # accuracy and logarithmic loss) and average completion time.
 
-pvalue_cel = robust_reg_model_p(df["Balanced cross-entropy loss"],
-                                df["Average completion time"])
-pvalue_ca = robust_reg_model_p(df["Balanced classification accuracy"],
-                                df["Average completion time"])
+with stage('fit'):
+    pvalue_cel = robust_reg_model_p(df["Balanced cross-entropy loss"],
+                                    df["Average completion time"])
+    pvalue_ca = robust_reg_model_p(df["Balanced classification accuracy"],
+                                   df["Average completion time"])
 
 # Make the plot
 sns.set(rc={'axes.facecolor':'#f5f5f5'}, style="darkgrid",
@@ -23,10 +28,8 @@ sns.set(rc={'axes.facecolor':'#f5f5f5'}, style="darkgrid",
 figsize=(3.45,4.5)
 palette_subjects = sns.color_palette("Paired", 12)[0:2]
 
-is_robust = True
 n_boot = 1000
 ci = 95
-truncate = False
 scatter_size = 20
 lw = 2
 
@@ -34,14 +37,14 @@ fig, (ax1, ax2) = plt.subplots(2,1, figsize=figsize, sharey=True)
 sns.regplot(x="Balanced cross-entropy loss", 
             y = "Average completion time", 
             data = df,
-            n_boot = n_boot,
-            ci = ci,
-            robust=is_robust, 
-            truncate = truncate,
+            fit_reg = False,
             color = 'grey',
             scatter_kws = {"s" : scatter_size},
-            line_kws = {"lw" : lw},
             ax=ax1)
+with stage('bootstrap'):
+    plot_robust_fit(ax1, df["Balanced cross-entropy loss"].values,
+                    df["Average completion time"].values, color='grey',
+                    n_boot=n_boot, ci=ci, line_kws={"lw" : lw})
 ax1.scatter(
     df[df["Participant"]=="Able-bodied"]["Balanced cross-entropy loss"].values,
     df[df["Participant"]=="Able-bodied"]["Average completion time"].values, 
@@ -65,14 +68,14 @@ ax1.legend(loc=2, bbox_to_anchor=(0.4, 1.02), ncol=1, frameon=True,
 sns.regplot(x="Balanced classification accuracy", 
             y = "Average completion time", 
             data = df,
-            n_boot = n_boot,
-            ci = ci,
-            robust=is_robust, 
-            truncate = truncate,
+            fit_reg = False,
             color = 'grey',
             scatter_kws = {"s" : scatter_size},
-            line_kws = {"lw" : lw},
             ax=ax2)
+with stage('bootstrap'):
+    plot_robust_fit(ax2, df["Balanced classification accuracy"].values,
+                    df["Average completion time"].values, color='grey',
+                    n_boot=n_boot, ci=ci, line_kws={"lw" : lw})
 
 ax2.scatter(
     df[df["Participant"]=="Able-bodied"][
@@ -96,7 +99,9 @@ ax2.annotate("p = {:.3f}".format(pvalue_ca),
 
 fig.text(0.04, 0.96, "a", weight="bold")
 fig.text(0.05, 0.48, "b", weight="bold")
-fig.tight_layout()
-fig.subplots_adjust(wspace=0.1)
-plt.savefig('Figure_7.pdf', dpi=600, bbox_inches='tight',
-            transparent=False, pad_inches=0)
\ No newline at end of file
+with stage('layout'):
+    fig.tight_layout()
+    fig.subplots_adjust(wspace=0.1)
+with stage('save'):
+    plt.savefig(os.path.join(HERE, 'Figure_7.pdf'), dpi=600,
+                bbox_inches='tight', transparent=False, pad_inches=0)
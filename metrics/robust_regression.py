@@ -0,0 +1,217 @@
+import numpy as np
+from scipy.special import erfc
+
+HUBER_T = 1.345 # Huber's tuning constant (statsmodels default)
+MAD_NORM = 0.6744897501960817 # Normal quantile at 0.75
+
+
+def _mad(resid):
+    """Scale estimate used by statsmodels' RLM (MAD around zero)."""
+    return np.median(np.abs(resid), axis=-1) / MAD_NORM
+
+
+def _huber_rho(z, t):
+    absz = np.abs(z)
+    return np.where(absz <= t, 0.5 * z ** 2, absz * t - 0.5 * t ** 2)
+
+
+def _huber_weights(z, t):
+    absz = np.abs(z)
+    return np.where(absz <= t, 1., t / np.maximum(absz, t))
+
+
+def _wls(X, y, w):
+    """Solves a stack of weighted least-squares problems.
+
+    X has shape (n_fits, n_samples, n_params), y and w (n_fits, n_samples).
+    """
+    Xw = X * w[..., np.newaxis]
+    XtWX = np.einsum('bnp,bnq->bpq', Xw, X)
+    XtWy = np.einsum('bnp,bn->bp', Xw, y)
+    return np.einsum('bpq,bq->bp', np.linalg.pinv(XtWX), XtWy)
+
+
+def huber_irls(X, y, t=HUBER_T, maxiter=50, tol=1e-8):
+    """Fits a stack of Huber robust regressions by IRLS.
+
+    Follows ``statsmodels.api.RLM(y, X).fit()`` with its defaults (Huber T
+    norm, MAD scale updated at every iteration, convergence on the
+    deviance): every fit starts from OLS and stops at its own iteration, but
+    all fits that are still running are updated together with stacked
+    weighted least-squares solves.
+
+    Parameters
+    ----------
+    X : array, shape=(n_fits, n_samples, n_params)
+        Design matrices (including the constant).
+    y : array, shape=(n_fits, n_samples)
+        Dependent variables.
+    t : float (default: HUBER_T)
+        Huber tuning constant.
+    maxiter : int (default: 50)
+        Maximum number of iterations.
+    tol : float (default: 1e-8)
+        Convergence tolerance on the deviance.
+
+    Returns
+    -------
+    params : array, shape=(n_fits, n_params)
+        Regression coefficients.
+    scale : array, shape=(n_fits,)
+        Robust scale estimates.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n_fits, n_samples, n_params = X.shape
+    df_resid = n_samples - n_params
+
+    params = _wls(X, y, np.ones_like(y))
+    resid = y - np.einsum('bnp,bp->bn', X, params)
+    scale = _mad(resid)
+    # As in statsmodels, the deviance divides the residuals by the (W)LS
+    # residual variance
+    ols_scale = np.sum(resid ** 2, axis=1) / df_resid
+    deviance = _huber_rho(resid / ols_scale[:, np.newaxis], t).sum(axis=1)
+    active = np.arange(n_fits)
+    iteration = 1
+    while active.size:
+        active = active[scale[active] != 0.]
+        if not active.size:
+            break
+        Xa, ya = X[active], y[active]
+        w = _huber_weights(resid[active] / scale[active, np.newaxis], t)
+        new_params = _wls(Xa, ya, w)
+        new_resid = ya - np.einsum('bnp,bp->bn', Xa, new_params)
+        wls_scale = np.sum(w * new_resid ** 2, axis=1) / df_resid
+        new_deviance = _huber_rho(new_resid / wls_scale[:, np.newaxis],
+                                  t).sum(axis=1)
+
+        params[active] = new_params
+        resid[active] = new_resid
+        scale[active] = _mad(new_resid)
+        converged = np.abs(new_deviance - deviance[active]) <= tol
+        deviance[active] = new_deviance
+        iteration += 1
+        if iteration >= maxiter:
+            break
+        active = active[~converged]
+
+    return params, scale
+
+
+def robust_fit(x, y, t=HUBER_T):
+    """Fits a Huber robust regression of y on x with an intercept.
+
+    Standard errors use statsmodels' default 'H1' covariance and p-values
+    the normal distribution, as in ``RLMResults``.
+
+    Parameters
+    ----------
+    x : array, shape=(n_samples,)
+        The independent variable.
+    y : array, shape=(n_samples,)
+        The dependent variable.
+    t : float (default: HUBER_T)
+        Huber tuning constant.
+
+    Returns
+    -------
+    params : array, shape=(2,)
+        Intercept and slope.
+    bse : array, shape=(2,)
+        Standard errors.
+    pvalues : array, shape=(2,)
+        Two-sided p-values.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    X = np.column_stack((np.ones_like(x), x))
+    n_samples, n_params = X.shape
+    params, scale = huber_irls(X[np.newaxis], y[np.newaxis], t=t)
+    params, scale = params[0], scale[0]
+
+    sresid = (y - X.dot(params)) / scale
+    inside = (np.abs(sresid) <= t).astype(np.float64) # psi'(sresid)
+    psi = np.clip(sresid, -t, t)
+    m = inside.mean()
+    k = 1 + n_params / float(n_samples) * inside.var() / m ** 2
+    normalized_cov = np.linalg.pinv(X.T.dot(X))
+    cov = (k ** 2 * (np.sum(psi ** 2) * scale ** 2 / (n_samples - n_params))
+           / m ** 2 * normalized_cov)
+    bse = np.sqrt(np.diag(cov))
+    pvalues = erfc(np.abs(params / bse) / np.sqrt(2))
+    return params, bse, pvalues
+
+
+def bootstrap_band(x, y, grid, n_boot=1000, ci=95, seed=None, t=HUBER_T):
+    """Computes a bootstrap confidence band for a robust regression line.
+
+    Rows are resampled with replacement as in ``seaborn.regplot`` and all
+    resamples are fitted at once with ``huber_irls``.
+
+    Parameters
+    ----------
+    x : array, shape=(n_samples,)
+        The independent variable.
+    y : array, shape=(n_samples,)
+        The dependent variable.
+    grid : array, shape=(n_points,)
+        Values of x where the band is evaluated.
+    n_boot : int (default: 1000)
+        Number of bootstrap resamples.
+    ci : float (default: 95)
+        Size of the confidence band, in percent.
+    seed : int or None (default: None)
+        Seed of the random number generator.
+    t : float (default: HUBER_T)
+        Huber tuning constant.
+
+    Returns
+    -------
+    yhat : array, shape=(n_points,)
+        Fitted line on the full data.
+    band : array, shape=(2, n_points)
+        Lower and upper limits of the band.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    X = np.column_stack((np.ones_like(x), x))
+    G = np.column_stack((np.ones_like(grid), grid))
+    params, _ = huber_irls(X[np.newaxis], y[np.newaxis], t=t)
+    yhat = G.dot(params[0])
+
+    rng = np.random.RandomState(seed)
+    idx = rng.randint(0, x.size, size=(n_boot, x.size))
+    boot_params, _ = huber_irls(X[idx], y[idx], t=t)
+    yhat_boots = boot_params.dot(G.T)
+    band = np.percentile(yhat_boots, [50 - ci / 2., 50 + ci / 2.], axis=0)
+    return yhat, band
+
+
+def plot_robust_fit(ax, x, y, color, n_boot=1000, ci=95, seed=None,
+                    line_kws=None):
+    """Draws a robust regression line and its bootstrap band like
+    ``seaborn.regplot(robust=True, truncate=False)``.
+
+    Parameters
+    ----------
+    ax : Axes
+        Axes with the data already scattered; the line spans its x-limits.
+    x, y : array, shape=(n_samples,)
+        Data.
+    color : color
+        Color of the line and band.
+    n_boot, ci, seed
+        See ``bootstrap_band``.
+    line_kws : dict or None (default: None)
+        Additional keyword arguments for ``ax.plot``.
+    """
+    grid = np.linspace(*ax.get_xlim(), num=100)
+    yhat, band = bootstrap_band(x, y, grid, n_boot=n_boot, ci=ci, seed=seed)
+    kws = {'color': color}
+    kws.update(line_kws or {})
+    if 'lw' not in kws:
+        kws.setdefault('linewidth', 2)
+    line, = ax.plot(grid, yhat, **kws)
+    line.sticky_edges.x[:] = (grid[0], grid[-1])
+    ax.fill_between(grid, *band, facecolor=color, alpha=.15)
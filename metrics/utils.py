@@ -1,4 +1,13 @@
-import statsmodels.api as sm
+import os
+import sys
+
+_ROOT = os.path.normpath(os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), os.pardir))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from common.instrumentation import stage
+from robust_regression import robust_fit, plot_robust_fit
 
 def robust_reg_model_p(x, y):
     """Fits a robust regression model using the Huber method and returns
@@ -17,9 +26,7 @@ def robust_reg_model_p(x, y):
         P-value of the robust regression fit
     """
     
-    x = sm.add_constant(x)
-    mdl = sm.RLM(y, x)
-    mdl = mdl.fit()
-    p = mdl.pvalues[1]
+    _, _, pvalues = robust_fit(x, y)
+    p = pvalues[1]
     
     return p
\ No newline at end of file
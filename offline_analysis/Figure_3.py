@@ -1,16 +1,25 @@
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns; sns.set()
 import warnings
 
-from utils import load_results, load_confusion_matrices
+from utils import load_results, load_confusion_matrices, confusion_group_sizes
+from utils import bootstrap_frame, plot_point_intervals, stage
+
+HERE = os.path.dirname(os.path.abspath(__file__))
 
 warnings.filterwarnings("ignore")
 
 # Load results and confusion matrices
-results_df = load_results('data/offline_analysis_results.csv')
-cm_ab_mean, cm_amp_mean, labels = load_confusion_matrices(
-        'data/confusion_matrices_all.npy', classifier='RDA', n_sensors=2)
+with stage('load'):
+    results_df = load_results(
+            os.path.join(HERE, 'data', 'offline_analysis_results.csv'))
+    cm_path = os.path.join(HERE, 'data', 'confusion_matrices_all.npy')
+    cm_ab_mean, cm_amp_mean, labels = load_confusion_matrices(
+            cm_path, classifier='RDA', n_sensors=2)
+    # Group sizes of the subjects whose confusion matrices are averaged
+    n_subjects = confusion_group_sizes(cm_path)
 
 # Make the plot
 sns.set(rc={'axes.facecolor':'#f5f5f5'}, style="darkgrid",
@@ -30,6 +39,14 @@ n_boot = 1000
 hue_order = ["LDA", "RDA", "QDA"]
 linewidth = 1.
 point_scale = 1.
+bootstrap_cache = os.path.join(HERE, '.bootstrap_cache')
+
+# Median confidence intervals for all groups, computed once and cached
+with stage('bootstrap'):
+    ci_df = bootstrap_frame(results_df, 'logloss',
+                            ['participant', 'Classifier', 'number of sensors'],
+                            estimator='median', n_boot=n_boot, ci=ci,
+                            cache_dir=bootstrap_cache)
 
 # Swarmplot properties
 swarm_size = 3
@@ -50,13 +67,17 @@ sns.pointplot(x="number of sensors", y="logloss", hue="Classifier",
               data=results_df[results_df.participant=="Able-bodied"], 
               estimator=estimator, ax=ax1, dodge=dodge, n_boot=n_boot,
               hue_order = hue_order, capsize=capsize, errwidth=errwidth,
-              ci=ci, markers = markers, 
+              ci=None, markers = markers, 
               linestyles = linestyles, scale=point_scale, palette=palette)
+plot_point_intervals(ax1, ci_df[ci_df.participant=="Able-bodied"],
+                     x="number of sensors", hue="Classifier",
+                     hue_order=hue_order, palette=palette, dodge=dodge,
+                     errwidth=errwidth, capsize=capsize)
 plt.setp(ax1.collections, sizes=[point_size])
 plt.setp(ax1.lines, linewidth=linewidth)
 ax1.legend(loc=2, ncol=2, frameon=True, edgecolor='.3',
            bbox_to_anchor=(0., 1.03))
-ax1.set_title("Able-bodied (n=12)")
+ax1.set_title("Able-bodied (n={})".format(n_subjects["Able-bodied"]))
 ax1.set_ylabel('Cross-entropy loss')
 ax1.set_xlabel('Number of added sensors')
 ax1.xaxis.set_ticks(np.arange(0, 16, 4))
@@ -67,13 +88,17 @@ sns.pointplot(x="number of sensors", y="logloss", hue="Classifier",
               data=results_df[results_df.participant=="Amputee"], 
               estimator=estimator, ax=ax2, dodge=dodge, n_boot=n_boot,
              hue_order = hue_order, capsize=capsize, errwidth=errwidth,
-             ci=ci, markers = markers, 
+             ci=None, markers = markers, 
               linestyles = linestyles, scale=point_scale, palette=palette)
+plot_point_intervals(ax2, ci_df[ci_df.participant=="Amputee"],
+                     x="number of sensors", hue="Classifier",
+                     hue_order=hue_order, palette=palette, dodge=dodge,
+                     errwidth=errwidth, capsize=capsize)
 plt.setp(ax2.get_yticklabels(), visible=False)
 plt.setp(ax2.collections, sizes=[point_size])
 plt.setp(ax2.lines, linewidth=linewidth)
 ax2.legend_.remove()
-ax2.set_title("Amputee (n=2)")
+ax2.set_title("Amputee (n={})".format(n_subjects["Amputee"]))
 ax2.set_xlabel('Number of added sensors')
 ax2.set_ylabel('')
 ax2.xaxis.set_ticks(np.arange(0, 16, 4))
@@ -141,8 +166,10 @@ fig.text(0.02, 0.96, "a", weight="bold")
 fig.text(0.02, 0.67, "b", weight="bold")
 fig.text(0.02, 0.36, "c", weight="bold")
 
-fig.align_ylabels(axs=[ax1, ax3, ax5])
-fig.tight_layout(rect=[0, 0.02, 1, 1])
-plt.subplots_adjust(wspace=0.02, hspace=0.4)
-plt.savefig('Figure_3.pdf', dpi=600, bbox_inches='tight',transparent=False,
-            pad_inches=0)
\ No newline at end of file
+with stage('layout'):
+    fig.align_ylabels(axs=[ax1, ax3, ax5])
+    fig.tight_layout(rect=[0, 0.02, 1, 1])
+    plt.subplots_adjust(wspace=0.02, hspace=0.4)
+with stage('save'):
+    plt.savefig(os.path.join(HERE, 'Figure_3.pdf'), dpi=600,
+                bbox_inches='tight', transparent=False, pad_inches=0)
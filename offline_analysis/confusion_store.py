@@ -0,0 +1,525 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Named axes of the confusion-matrix tensor
+AXES = ('subject', 'n_sensors', 'classifier', 'true', 'predicted')
+
+CHUNK_SUBJECTS = 256 # Subjects read at once when computing group means
+
+
+def _sidecar_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _means_path(path):
+    return os.path.splitext(path)[0] + '.means.npy'
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _atomic_save(path, array):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _atomic_dump(path, obj):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+class ConfusionStore(object):
+    """Memory-mapped confusion matrices with named axes.
+
+    The tensor is stored as a ``.npy`` file with shape (n_subjects,
+    n_sensor_counts, n_classifiers, n_classes, n_classes) and is memory
+    mapped, so that queries only read the slices they touch. A JSON sidecar
+    next to it (same name, ``.json`` extension) holds the coordinates of
+    every axis and the group of every subject. Group means for every
+    (classifier, sensor count) pair are computed once, by streaming over
+    subjects, and cached next to the tensor (``.means.npy``); the cache is
+    rebuilt when the tensor or the sidecar change.
+
+    Parameters
+    ----------
+    path : str
+        Path of the ``.npy`` tensor.
+
+    Attributes
+    ----------
+    data : memmap
+        The tensor.
+    coords : dict
+        Coordinates of each axis in ``AXES`` and ``group``, the group of
+        each subject.
+    groups : list of str
+        Participant groups, in order of first appearance.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.data = np.load(path, mmap_mode='r')
+        with open(_sidecar_path(path), 'r') as f:
+            meta = json.load(f)
+        if tuple(meta['axes']) != AXES:
+            raise ValueError("Unexpected axes {}.".format(meta['axes']))
+        self.coords = meta['coords']
+        shape = tuple(len(self.coords[axis]) for axis in AXES)
+        if shape != self.data.shape:
+            raise ValueError("Tensor shape {} does not match coordinates "
+                             "{}.".format(self.data.shape, shape))
+        if len(self.coords['group']) != shape[0]:
+            raise ValueError("A group is needed for every subject.")
+        self.groups = []
+        for g in self.coords['group']:
+            if g not in self.groups:
+                self.groups.append(g)
+        self._means = None
+
+    @classmethod
+    def create(cls, path, data, coords):
+        """Writes a tensor and its sidecar and opens the store.
+
+        Parameters
+        ----------
+        path : str
+            Path of the ``.npy`` tensor.
+        data : array
+            Confusion matrices, with axes ``AXES``.
+        coords : dict
+            Coordinates of each axis in ``AXES`` and ``group``.
+
+        Returns
+        -------
+        store : ConfusionStore
+        """
+        _atomic_save(path, np.asarray(data))
+        write_sidecar(path, coords)
+        return cls(path)
+
+    @property
+    def labels(self):
+        """Class labels."""
+        return list(self.coords['true'])
+
+    def index(self, axis, labels):
+        """Returns the positions of coordinate labels along an axis.
+
+        Parameters
+        ----------
+        axis : str
+            One of ``AXES``.
+        labels : label or list of labels
+            Coordinates to look up.
+
+        Returns
+        -------
+        idx : int or array
+            Position(s) along the axis.
+        """
+        coords = list(self.coords[axis])
+        if isinstance(labels, (list, tuple, np.ndarray, pd.Index)):
+            return np.array([coords.index(label) for label in labels],
+                            dtype=np.intp)
+        return coords.index(labels)
+
+    def subjects_of(self, group):
+        """Returns the positions of the subjects of a group."""
+        return np.flatnonzero(np.asarray(self.coords['group']) == group)
+
+    def sel(self, group=None, **query):
+        """Selects confusion matrices by coordinate labels.
+
+        Only the selected slices are read from disk. Axes queried with a
+        single label are dropped; axes queried with a list are kept in the
+        order of the list.
+
+        Parameters
+        ----------
+        group : str or None (default: None)
+            If not None, only subjects of this group are selected.
+        **query
+            Labels (single or list) for any of ``AXES``.
+
+        Returns
+        -------
+        cm : array
+            Selected confusion matrices.
+        """
+        unknown = set(query) - set(AXES)
+        if unknown:
+            raise ValueError("Unknown axes {}.".format(sorted(unknown)))
+        if group is not None:
+            if 'subject' in query:
+                raise ValueError("Select either subjects or a group.")
+            query['subject'] = [self.coords['subject'][i]
+                                for i in self.subjects_of(group)]
+        basic, fancy = [], []
+        for axis in AXES:
+            if axis not in query:
+                basic.append(slice(None))
+                continue
+            idx = self.index(axis, query[axis])
+            if np.ndim(idx) == 0:
+                basic.append(idx)
+            else:
+                basic.append(slice(None))
+                fancy.append((axis, idx))
+        # Basic indexing gives a view of the memory map; lists are taken
+        # one axis at a time
+        view = self.data[tuple(basic)]
+        remaining = [axis for axis, b in zip(AXES, basic)
+                     if isinstance(b, slice)]
+        for axis, idx in fancy:
+            view = np.take(view, idx, axis=remaining.index(axis))
+        return np.array(view)
+
+    def group_means(self):
+        """Returns the mean confusion matrices of every group.
+
+        Returns
+        -------
+        means : array, shape=(n_groups, n_sensor_counts, n_classifiers,
+                              n_classes, n_classes)
+            Means over the subjects of each group (in the order of
+            ``groups``). Values are NaN where any subject of the group has
+            no results, as with ``np.mean``.
+        """
+        if self._means is None:
+            self._means = self._load_means()
+        return self._means
+
+    def group_mean(self, group, classifier, n_sensors):
+        """Returns the mean confusion matrix of a group for a classifier and
+        sensor count.
+
+        Parameters
+        ----------
+        group : str
+            Participant group.
+        classifier : str
+            Classifier.
+        n_sensors : int
+            Number of sensors.
+
+        Returns
+        -------
+        cm_mean : array, shape=(n_classes, n_classes)
+            Mean confusion matrix.
+        """
+        return np.array(self.group_means()[
+            self.groups.index(group), self.index('n_sensors', n_sensors),
+            self.index('classifier', classifier)])
+
+    def _load_means(self):
+        means_path = _means_path(self.path)
+        meta_path = means_path + '.json'
+        stamp = {'tensor': _stamp(self.path),
+                 'sidecar': _stamp(_sidecar_path(self.path))}
+        if os.path.exists(means_path) and os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                if json.load(f) == stamp:
+                    return np.load(means_path, mmap_mode='r')
+        means = self._compute_means()
+        _atomic_save(means_path, means)
+        _atomic_dump(meta_path, stamp)
+        return np.load(means_path, mmap_mode='r')
+
+    def _compute_means(self):
+        group_idx = np.array([self.groups.index(g)
+                              for g in self.coords['group']])
+        sums = np.zeros((len(self.groups),) + self.data.shape[1:])
+        for start in range(0, self.data.shape[0], CHUNK_SUBJECTS):
+            chunk = np.array(self.data[start:start + CHUNK_SUBJECTS])
+            # Subjects are added one at a time, in order, so that means are
+            # identical to np.mean over the group
+            for g, cm in zip(group_idx[start:], chunk):
+                sums[g] += cm
+        counts = np.bincount(group_idx, minlength=len(self.groups))
+        return sums / counts.reshape((-1,) + (1,) * (sums.ndim - 1))
+
+
+def write_sidecar(path, coords):
+    """Writes the coordinate sidecar of a confusion-matrix tensor.
+
+    Parameters
+    ----------
+    path : str
+        Path of the ``.npy`` tensor.
+    coords : dict
+        Coordinates of each axis in ``AXES`` and ``group``, the group of
+        each subject.
+    """
+    coords = {key: [v.item() if isinstance(v, np.generic) else v
+                    for v in values] for key, values in coords.items()}
+    _atomic_dump(_sidecar_path(path), {'axes': list(AXES), 'coords': coords})
+
+
+class ConfusionAccumulator(object):
+    """Append-only confusion matrices stored as one chunk per subject.
+
+    Every subject's block of shape (n_sensor_counts, n_classifiers,
+    n_classes, n_classes) is saved as its own ``.npy`` file in a directory,
+    so adding a subject never rewrites the results of the others. Running
+    sums and subject counts of every group are updated on each append, which
+    makes group means available without reading any chunk.
+
+    The coordinates shared by all subjects are written once to a JSON
+    header. Subjects are recorded in a JSON-lines log, one line per subject
+    with its group, chunk and the file of the group sums after it was
+    added, so an append writes a chunk, the sums and one line, whatever the
+    number of subjects already stored. The line is written last: an
+    interrupted append leaves an incomplete line, which is ignored when the
+    store is opened and overwritten by the next append. Only one process
+    should append at a time.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the store, created with ``ConfusionAccumulator.create``.
+
+    Attributes
+    ----------
+    coords : dict
+        Coordinates of each axis in ``AXES`` and ``group``, the group of
+        each subject, in order of appending.
+    groups : list of str
+        Participant groups, in order of first appearance.
+    counts : list of int
+        Number of subjects of each group.
+    """
+    HEADER = 'header.json'
+    LOG = 'subjects.jsonl'
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, self.HEADER), 'r') as f:
+            header = json.load(f)
+        if tuple(header['axes']) != AXES:
+            raise ValueError("Unexpected axes {}.".format(header['axes']))
+        self.coords = dict(header['coords'], subject=[], group=[])
+        self.groups, self.counts = [], []
+        self.shape = tuple(len(self.coords[axis]) for axis in AXES[1:])
+        self._chunks = []
+        self._positions = {} # Position of every subject, in order
+        self._sums_file = None
+        # Bytes of complete records in the log
+        self._log_size = 0
+        with open(os.path.join(directory, self.LOG), 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break # Interrupted append
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                self._add_record(record)
+                self._log_size += len(line)
+        if self._sums_file is None:
+            self._sums = np.zeros((0,) + self.shape)
+        else:
+            self._sums = np.load(os.path.join(directory, self._sums_file))
+
+    def _add_record(self, record):
+        """Adds a subject record of the log to the in-memory index."""
+        self._positions[record['subject']] = len(self._chunks)
+        self._chunks.append(record['chunk'])
+        self.coords['subject'].append(record['subject'])
+        self.coords['group'].append(record['group'])
+        if record['group'] not in self.groups:
+            self.groups.append(record['group'])
+            self.counts.append(0)
+        self.counts[self.groups.index(record['group'])] += 1
+        self._sums_file = record['sums']
+
+    @classmethod
+    def create(cls, directory, n_sensors, classifiers, labels):
+        """Creates an empty store.
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the store. It is created if needed and must not
+            already hold a store.
+        n_sensors : list of int
+            Sensor counts.
+        classifiers : list of str
+            Classifiers.
+        labels : list of str
+            Class labels.
+
+        Returns
+        -------
+        store : ConfusionAccumulator
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        header_path = os.path.join(directory, cls.HEADER)
+        if os.path.exists(header_path):
+            raise ValueError("{} already holds a store.".format(directory))
+        coords = {'n_sensors': list(n_sensors),
+                  'classifier': list(classifiers),
+                  'true': list(labels), 'predicted': list(labels)}
+        coords = {key: [v.item() if isinstance(v, np.generic) else v
+                        for v in values] for key, values in coords.items()}
+        open(os.path.join(directory, cls.LOG), 'wb').close()
+        _atomic_dump(header_path, {'axes': list(AXES), 'coords': coords})
+        return cls(directory)
+
+    @classmethod
+    def from_store(cls, directory, store):
+        """Creates a store holding the subjects of a ``ConfusionStore``.
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the new store.
+        store : ConfusionStore
+            Existing tensor store.
+
+        Returns
+        -------
+        store : ConfusionAccumulator
+        """
+        acc = cls.create(directory, store.coords['n_sensors'],
+                         store.coords['classifier'], store.labels)
+        for i, (subject, group) in enumerate(zip(store.coords['subject'],
+                                                 store.coords['group'])):
+            acc.append(subject, group, store.data[i])
+        return acc
+
+    @property
+    def labels(self):
+        """Class labels."""
+        return list(self.coords['true'])
+
+    def __len__(self):
+        return len(self.coords['subject'])
+
+    def append(self, subject, group, cm):
+        """Adds the confusion matrices of a subject.
+
+        Parameters
+        ----------
+        subject : int or str
+            Subject ID, not already in the store.
+        group : str
+            Participant group of the subject.
+        cm : array, shape=(n_sensor_counts, n_classifiers, n_classes,
+                           n_classes)
+            Confusion matrices of the subject, NaN where there are no
+            results.
+        """
+        if isinstance(subject, np.generic):
+            subject = subject.item()
+        if subject in self._positions:
+            raise ValueError("Subject {} is already stored.".format(subject))
+        cm = np.asarray(cm, dtype=np.float64)
+        if cm.shape != self.shape:
+            raise ValueError("Expected confusion matrices of shape {}, got "
+                             "{}.".format(self.shape, cm.shape))
+        n = len(self)
+        chunk = 'subject_{:06d}.npy'.format(n)
+        _atomic_save(os.path.join(self.directory, chunk), cm)
+
+        if group not in self.groups:
+            sums = np.concatenate((self._sums, np.zeros((1,) + self.shape)))
+            g = len(self.groups)
+        else:
+            sums = self._sums.copy()
+            g = self.groups.index(group)
+        sums[g] += cm
+        # Sums are written under a new name for every append, so that the
+        # log keeps pointing to consistent sums until the record is written
+        sums_file = 'sums_{:06d}.npy'.format(n + 1)
+        _atomic_save(os.path.join(self.directory, sums_file), sums)
+
+        record = {'subject': subject, 'group': group, 'chunk': chunk,
+                  'sums': sums_file}
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        with open(os.path.join(self.directory, self.LOG), 'r+b') as f:
+            # Overwrites the incomplete record of an interrupted append
+            f.seek(self._log_size)
+            f.truncate()
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_size += len(line)
+
+        old_sums = self._sums_file
+        self._add_record(record)
+        self._sums = sums
+        if old_sums is not None:
+            os.remove(os.path.join(self.directory, old_sums))
+
+    def subject(self, subject):
+        """Returns the memory-mapped confusion matrices of a subject."""
+        return np.load(os.path.join(self.directory,
+                                    self._chunks[self._positions[subject]]),
+                       mmap_mode='r')
+
+    def group_mean(self, group, classifier, n_sensors):
+        """Returns the mean confusion matrix of a group for a classifier and
+        sensor count.
+
+        Parameters
+        ----------
+        group : str
+            Participant group.
+        classifier : str
+            Classifier.
+        n_sensors : int
+            Number of sensors.
+
+        Returns
+        -------
+        cm_mean : array, shape=(n_classes, n_classes)
+            Mean confusion matrix, NaN where any subject of the group has no
+            results.
+        """
+        g = self.groups.index(group)
+        return (self._sums[g, self.coords['n_sensors'].index(n_sensors),
+                           self.coords['classifier'].index(classifier)] /
+                self.counts[g])
+
+    def group_mean_normalised(self, group, classifier, n_sensors):
+        """Returns the mean confusion matrix of a group with rows normalised
+        to sum to one, as shown in Figure 3c.
+
+        Parameters and returns are as ``group_mean``.
+        """
+        cm_mean = self.group_mean(group, classifier, n_sensors)
+        return cm_mean / cm_mean.sum(axis=1)[:, np.newaxis]
+
+    def consolidate(self, path):
+        """Writes all subjects to a single tensor with its sidecar, readable
+        with ``ConfusionStore``. Subjects are copied one at a time.
+
+        Parameters
+        ----------
+        path : str
+            Path of the ``.npy`` tensor.
+
+        Returns
+        -------
+        store : ConfusionStore
+        """
+        tmp = path + '.tmp'
+        data = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float64,
+                                         shape=(len(self),) + self.shape)
+        for i, chunk in enumerate(self._chunks):
+            data[i] = np.load(os.path.join(self.directory, chunk),
+                              mmap_mode='r')
+        data.flush()
+        del data
+        os.replace(tmp, path)
+        write_sidecar(path, self.coords)
+        return ConfusionStore(path)
@@ -0,0 +1,274 @@
+import functools
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import scipy
+from scipy.special import chdtrc, erfc
+
+EXACT_MAX_N = 50 # Largest sample size for exact Wilcoxon p-values
+
+
+def scipy_exact_max_n(version=scipy.__version__):
+    """Largest sample size for which ``scipy.stats.wilcoxon`` computes exact
+    p-values by default: none before scipy 1.3, 25 up to 1.8 and 50 since
+    1.9."""
+    major, minor = (int(part) for part in version.split('.')[:2])
+    if (major, minor) < (1, 3):
+        return 0
+    return 25 if (major, minor) < (1, 9) else 50
+
+
+def _average_ranks(a):
+    """Ranks the rows of a 2-d array, averaging the ranks of ties.
+
+    Parameters
+    ----------
+    a : array, shape=(n_rows, n)
+        Data.
+
+    Returns
+    -------
+    ranks : array, shape=(n_rows, n)
+        Ranks (starting at 1) within each row, as ``scipy.stats.rankdata``.
+    ties : array, shape=(n_rows,)
+        Tie term sum(t**3 - t) over the groups of tied values of each row.
+    """
+    n_rows, n = a.shape
+    order = np.argsort(a, axis=1, kind='mergesort')
+    sorted_a = np.take_along_axis(a, order, axis=1)
+    new_run = np.ones((n_rows, n), dtype=bool)
+    new_run[:, 1:] = sorted_a[:, 1:] != sorted_a[:, :-1]
+    new_run = new_run.ravel()
+    run_id = np.cumsum(new_run) - 1
+    run_start = np.flatnonzero(new_run)
+    counts = np.bincount(run_id).astype(np.float64)
+    mean_rank = run_start % n + (counts + 1) / 2.
+    ranks = np.empty((n_rows, n))
+    np.put_along_axis(ranks, order, mean_rank[run_id].reshape(n_rows, n),
+                      axis=1)
+    ties = np.bincount(run_start // n, weights=counts ** 3 - counts,
+                       minlength=n_rows)
+    return ranks, ties
+
+
+@functools.lru_cache(maxsize=None)
+def _signed_rank_cdf(n):
+    """Cumulative null distribution of the Wilcoxon signed-rank statistic
+    for n observations without ties, i.e. P(W <= w) for w = 0..n(n+1)/2."""
+    counts = np.zeros(n * (n + 1) // 2 + 1)
+    counts[0] = 1.
+    for k in range(1, n + 1):
+        counts[k:] = counts[k:] + counts[:-k]
+    cdf = np.cumsum(counts) / 2. ** n
+    cdf.flags.writeable = False
+    return cdf
+
+
+def friedman(ranks, ties, n):
+    """Friedman test statistics from within-block ranks.
+
+    Parameters
+    ----------
+    ranks : array, shape=(n_tests, k)
+        Sum over blocks of the ranks of each treatment.
+    ties : array, shape=(n_tests,)
+        Sum over blocks of the tie terms sum(t**3 - t).
+    n : array, shape=(n_tests,)
+        Number of blocks.
+
+    Returns
+    -------
+    statistic : array, shape=(n_tests,)
+        Chi-square statistics, as ``scipy.stats.friedmanchisquare``.
+    pvalue : array, shape=(n_tests,)
+        P-values.
+    """
+    k = ranks.shape[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = 1 - ties / (k * (k * k - 1) * n)
+        ssbn = np.sum(ranks ** 2, axis=1)
+        statistic = (12.0 / (k * n * (k + 1)) * ssbn - 3 * n * (k + 1)) / c
+    return statistic, chdtrc(k - 1, statistic)
+
+
+def signed_rank(d, method='auto'):
+    """Wilcoxon signed-rank tests on the rows of a 2-d array of paired
+    differences.
+
+    Zero differences are discarded. With ``method='approx'`` p-values use
+    the normal approximation with tie correction and no continuity
+    correction, as ``scipy.stats.wilcoxon`` with its defaults in scipy 1.2.
+    With ``method='exact'``, p-values of tests without ties and with at most
+    ``EXACT_MAX_N`` non-zero differences are computed from the exact null
+    distribution, which is cached for each sample size. With
+    ``method='auto'``, p-values are exact for tests without zeros or ties
+    and with at most ``scipy_exact_max_n()`` differences and approximate
+    otherwise, like the default of the installed ``scipy.stats.wilcoxon``.
+    (Since scipy 1.13, that default instead uses permutation p-values for
+    samples of at most 13 with zeros or ties.)
+
+    Parameters
+    ----------
+    d : array, shape=(n_tests, n)
+        Paired differences.
+    method : str (default: 'auto')
+        One of 'auto', 'approx' or 'exact'.
+
+    Returns
+    -------
+    statistic : array, shape=(n_tests,)
+        Smaller of the sums of positive and negative ranks.
+    pvalue : array, shape=(n_tests,)
+        Two-sided p-values.
+    exact : array, shape=(n_tests,)
+        Whether each p-value is exact rather than approximate.
+    """
+    if method not in ('auto', 'approx', 'exact'):
+        raise ValueError("method must be 'auto', 'approx' or 'exact'.")
+    d = np.asarray(d, dtype=np.float64)
+    zero = d == 0
+    n_zero = zero.sum(axis=1)
+    # Zeros are ranked below all non-zero values, so that the ranks of the
+    # non-zero values are shifted by the number of zeros
+    ranks, ties = _average_ranks(np.where(zero, -1., np.abs(d)))
+    ranks -= n_zero[:, np.newaxis]
+    ties -= n_zero ** 3 - n_zero
+    r_plus = np.sum(np.where(d > 0, ranks, 0.), axis=1)
+    r_minus = np.sum(np.where(d < 0, ranks, 0.), axis=1)
+    statistic = np.minimum(r_plus, r_minus)
+
+    count = (d.shape[1] - n_zero).astype(np.float64)
+    mn = count * (count + 1.) * 0.25
+    se = count * (count + 1.) * (2. * count + 1.) - 0.5 * ties
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (statistic - mn) / np.sqrt(se / 24)
+    pvalue = erfc(np.abs(z) / np.sqrt(2))
+
+    if method == 'exact':
+        exact = (ties == 0) & (count > 0) & (count <= EXACT_MAX_N)
+    elif method == 'auto':
+        exact = ((ties == 0) & (n_zero == 0) & (count > 0) &
+                 (count <= scipy_exact_max_n()))
+    else:
+        exact = np.zeros(len(d), dtype=bool)
+    for i in np.flatnonzero(exact):
+        cdf = _signed_rank_cdf(int(count[i]))
+        pvalue[i] = min(1., 2. * cdf[int(statistic[i])])
+    return statistic, pvalue, exact
+
+
+def nonparametric_tests(results_df, value='logloss', treatment='Classifier',
+                        treatments=('LDA', 'RDA', 'QDA'), block='subject',
+                        by='number of sensors', group='participant',
+                        pooled='All', alpha=0.05, method='auto'):
+    """Runs Friedman tests and pairwise Wilcoxon signed-rank tests with Šidák
+    correction for every level of ``by`` (e.g. sensor count) and every
+    participant group at once.
+
+    Within-block ranks for the Friedman tests are computed once for all
+    blocks and shared between groups; signed-rank statistics are computed
+    for all comparisons, groups and levels with the same number of blocks
+    in one batch. Only blocks with values for all treatments are used.
+
+    Parameters
+    ----------
+    results_df : DataFrame
+        Results in long format.
+    value : str (default: 'logloss')
+        Column with the compared values.
+    treatment : str (default: 'Classifier')
+        Column identifying the treatments.
+    treatments : sequence of str (default: ('LDA', 'RDA', 'QDA'))
+        Treatments, in comparison order.
+    block : str (default: 'subject')
+        Column identifying the blocks (repeated measures).
+    by : str (default: 'number of sensors')
+        Column with the levels tested separately.
+    group : str (default: 'participant')
+        Column with the participant group of each block.
+    pooled : str or None (default: 'All')
+        Name of the group pooling all blocks. If None, only the individual
+        groups are tested.
+    alpha : float (default: 0.05)
+        Family-wise significance level of the pairwise comparisons.
+    method : str (default: 'auto')
+        P-value method of the Wilcoxon tests, see ``signed_rank``. The
+        default follows the installed scipy.
+
+    Returns
+    -------
+    friedman_df : DataFrame
+        One row per group and level, with columns ``Group``, ``by``, ``n``,
+        ``statistic`` and ``p-value``.
+    comparison_df : DataFrame
+        One row per group, level and pair of treatments, with columns
+        ``Group``, ``by``, ``Algorithm 1``, ``Algorithm 2``, ``n``,
+        ``statistic``, ``p-value``, ``Method`` (``'exact'`` or ``'approx'``,
+        how the p-value was computed), ``Alpha corrected`` and
+        ``Significant``.
+    """
+    treatments = list(treatments)
+    wide = results_df.pivot_table(index=[by, block], columns=treatment,
+                                  values=value)[treatments].dropna()
+    values = wide.values
+    levels = wide.index.get_level_values(by).values
+    block_group = results_df.drop_duplicates(block).set_index(block)[group]
+    row_group = block_group.reindex(
+        wide.index.get_level_values(block)).values
+
+    group_names = list(pd.unique(results_df[group]))
+    selections = [(name, row_group == name) for name in group_names]
+    if pooled is not None:
+        selections.insert(0, (pooled, np.ones(len(wide), dtype=bool)))
+    # One test per group and level; rows of every test in block order
+    test_group, test_level, test_rows = [], [], []
+    for name, mask in selections:
+        for level in np.unique(levels):
+            rows = np.flatnonzero(mask & (levels == level))
+            if rows.size:
+                test_group.append(name)
+                test_level.append(level)
+                test_rows.append(rows)
+    n = np.array([rows.size for rows in test_rows])
+
+    # Friedman tests
+    ranks, ties = _average_ranks(values)
+    rank_sums = np.array([ranks[rows].sum(axis=0) for rows in test_rows])
+    tie_sums = np.array([ties[rows].sum() for rows in test_rows])
+    f_stat, f_p = friedman(rank_sums, tie_sums, n)
+    friedman_df = pd.DataFrame({'Group': test_group, by: test_level, 'n': n,
+                                'statistic': f_stat, 'p-value': f_p},
+                               columns=['Group', by, 'n', 'statistic',
+                                        'p-value'])
+
+    # Pairwise Wilcoxon tests, batched over tests with the same size
+    pairs = list(combinations(range(len(treatments)), 2))
+    diffs = np.column_stack([values[:, i] - values[:, j] for i, j in pairs])
+    w_stat = np.empty((n.size, len(pairs)))
+    w_p = np.empty((n.size, len(pairs)))
+    w_exact = np.empty((n.size, len(pairs)), dtype=bool)
+    for size in np.unique(n):
+        tests = np.flatnonzero(n == size)
+        # Shape (n_tests, n_pairs, size)
+        d = np.stack([diffs[test_rows[t]].T for t in tests])
+        stat, p, exact = signed_rank(d.reshape(-1, size), method=method)
+        w_stat[tests] = stat.reshape(-1, len(pairs))
+        w_p[tests] = p.reshape(-1, len(pairs))
+        w_exact[tests] = exact.reshape(-1, len(pairs))
+    alpha_corrected = 1 - (1 - alpha) ** (1. / len(pairs)) # Sidak
+    comparison_df = pd.DataFrame({
+        'Group': np.repeat(test_group, len(pairs)),
+        by: np.repeat(test_level, len(pairs)),
+        'Algorithm 1': np.tile([treatments[i] for i, _ in pairs], n.size),
+        'Algorithm 2': np.tile([treatments[j] for _, j in pairs], n.size),
+        'n': np.repeat(n, len(pairs)),
+        'statistic': w_stat.ravel(),
+        'p-value': w_p.ravel(),
+        'Method': np.where(w_exact.ravel(), 'exact', 'approx'),
+        'Alpha corrected': alpha_corrected,
+        'Significant': w_p.ravel() < alpha_corrected},
+        columns=['Group', by, 'Algorithm 1', 'Algorithm 2', 'n',
+                 'statistic', 'p-value', 'Method', 'Alpha corrected',
+                 'Significant'])
+    return friedman_df, comparison_df
@@ -0,0 +1,317 @@
+"""Sequential forward sensor selection for the discriminant analysis
+classifiers.
+
+Starting from no sensors, the sensor whose addition gives the lowest
+cross-validated cross-entropy loss is added at every step. This produces the
+loss against "Number of added sensors" curves of Figure 3a.
+
+Class means and covariances of all features are computed once per fold. The
+covariance of a set of sensors is a sub-matrix of those, so adding a sensor
+only extends the Cholesky factors of the current set by bordering: the cost
+of scoring a candidate grows with the square of the number of selected
+features rather than the cube, and all candidates of a step are scored at
+once.
+
+Examples
+--------
+Feature files are ``.npz`` archives with the feature matrix ``X`` (columns
+grouped by feature, then by channel, as ``working_principle/features.py``)
+and the labels ``y``, as well as ``subject`` and ``participant``:
+
+    python sensor_selection.py features/*.npz -o results.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+
+_ROOT = os.path.normpath(os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), os.pardir))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from common.discriminant_analysis import (CLASSIFIERS, CLASSIFIER_PARAMS,
+                                          class_statistics,
+                                          regularize_covariances)
+from common.model_selection import stratified_folds
+
+RESULTS_COLUMNS = ['subject', 'Classifier', 'number of sensors', 'logloss',
+                   'participant']
+
+
+def channel_columns(n_channels, n_features):
+    """Returns the feature columns of every channel.
+
+    Parameters
+    ----------
+    n_channels : int
+        Number of channels (sensors).
+    n_features : int
+        Number of features per channel. Columns are expected to be grouped by
+        feature, then by channel.
+
+    Returns
+    -------
+    columns : array, shape=(n_channels, n_features)
+        Column indices of each channel.
+    """
+    return (np.arange(n_features)[np.newaxis] * n_channels +
+            np.arange(n_channels)[:, np.newaxis])
+
+
+class _FoldModel(object):
+    """Regularised discriminant analysis on one training/test split, grown
+    one block of features at a time.
+
+    Attributes
+    ----------
+    chol : array, shape=(n_cov, n_selected, n_selected)
+        Cholesky factors of the covariances of the selected features.
+    log_dets : array, shape=(n_cov,)
+        Log-determinants of those covariances.
+    z : array, shape=(n_classes, n_test, n_selected)
+        Test samples centred on each class mean and whitened with the
+        factor of the class covariance.
+    """
+    def __init__(self, X_train, y_train, X_test, y_test, reg_lambda,
+                 reg_gamma):
+        classes, counts, means, class_cov, pooled = class_statistics(
+            X_train, y_train)
+        n_classes = classes.size
+        if reg_lambda == 1.:
+            # All classes share one covariance (LDA)
+            self.covariances = regularize_covariances(
+                pooled[np.newaxis], pooled, reg_lambda, reg_gamma)
+            self.cov_of = np.zeros(n_classes, dtype=int)
+        else:
+            self.covariances = regularize_covariances(
+                class_cov, pooled, reg_lambda, reg_gamma)
+            self.cov_of = np.arange(n_classes)
+        self.log_priors = np.log(counts / float(X_train.shape[0]))
+        self.centred = X_test[np.newaxis] - means[:, np.newaxis]
+        self.y_test = np.searchsorted(classes, y_test)
+        if not np.array_equal(classes[self.y_test], y_test):
+            raise ValueError("Test labels missing from the training data.")
+
+        n_cov = self.covariances.shape[0]
+        self.selected = np.empty(0, dtype=int)
+        self.chol = np.empty((n_cov, 0, 0))
+        self.log_dets = np.zeros(n_cov)
+        self.z = np.empty((n_classes, X_test.shape[0], 0))
+
+    def _border(self, candidates):
+        """Extends the Cholesky factors with each block of candidate
+        columns.
+
+        Returns
+        -------
+        W : array, shape=(n_cov, n_candidates, n_selected, block_size)
+            Off-diagonal blocks of the extended factors, transposed.
+        L22 : array, shape=(n_cov, n_candidates, block_size, block_size)
+            New diagonal blocks of the extended factors.
+        """
+        n_cand, block = candidates.shape
+        flat = candidates.ravel()
+        n_cov, m = self.chol.shape[:2]
+        W = np.empty((n_cov, m, n_cand * block))
+        for j in range(n_cov):
+            C_SR = self.covariances[j][np.ix_(self.selected, flat)]
+            W[j] = (solve_triangular(self.chol[j], C_SR, lower=True) if m
+                    else C_SR)
+        W = W.reshape(n_cov, m, n_cand, block).transpose(0, 2, 1, 3)
+        C_RR = self.covariances[:, candidates[:, :, np.newaxis],
+                                candidates[:, np.newaxis, :]]
+        schur = C_RR - np.einsum('jcmb,jcmd->jcbd', W, W)
+        return W, np.linalg.cholesky(schur)
+
+    def _whiten(self, candidates, W, L22):
+        """Whitens the candidate columns of the test samples given the
+        selected ones; returns shape (n_classes, n_candidates, n_test,
+        block_size)."""
+        W = W[self.cov_of]
+        L22 = L22[self.cov_of]
+        # Residuals of the candidate columns given the selected ones
+        resid = (self.centred[:, :, candidates] -
+                 np.einsum('knm,kcmb->kncb', self.z, W))
+        resid = resid.transpose(0, 2, 3, 1)
+        z_new = np.linalg.solve(L22, resid)
+        return z_new.transpose(0, 1, 3, 2)
+
+    def log_losses(self, candidates):
+        """Returns the summed test cross-entropy loss of each candidate.
+
+        Parameters
+        ----------
+        candidates : array, shape=(n_candidates, block_size)
+            Feature columns of each candidate sensor.
+
+        Returns
+        -------
+        losses : array, shape=(n_candidates,)
+            Sum over test samples of the negative log posterior of the true
+            class.
+        """
+        W, L22 = self._border(candidates)
+        z_new = self._whiten(candidates, W, L22)
+        quad = (np.sum(self.z ** 2, axis=2)[:, np.newaxis] +
+                np.sum(z_new ** 2, axis=3))
+        log_dets = (self.log_dets[:, np.newaxis] +
+                    2. * np.sum(np.log(np.diagonal(L22, axis1=2, axis2=3)),
+                                axis=2))
+        # Shape (n_classes, n_candidates, n_test)
+        scores = (-0.5 * quad - 0.5 * log_dets[self.cov_of][:, :, np.newaxis]
+                  + self.log_priors[:, np.newaxis, np.newaxis])
+        top = scores.max(axis=0)
+        log_norm = top + np.log(np.sum(np.exp(scores - top), axis=0))
+        true_scores = np.take_along_axis(
+            scores, self.y_test[np.newaxis, np.newaxis], axis=0)[0]
+        return np.sum(log_norm - true_scores, axis=1)
+
+    def add(self, columns):
+        """Adds a block of feature columns to the model."""
+        columns = np.asarray(columns)[np.newaxis]
+        W, L22 = self._border(columns)
+        z_new = self._whiten(columns, W, L22)
+        n_cov, m = self.chol.shape[:2]
+        b = columns.shape[1]
+        chol = np.zeros((n_cov, m + b, m + b))
+        chol[:, :m, :m] = self.chol
+        chol[:, m:, :m] = np.swapaxes(W[:, 0], 1, 2)
+        chol[:, m:, m:] = L22[:, 0]
+        self.chol = chol
+        self.log_dets = self.log_dets + 2. * np.sum(
+            np.log(np.diagonal(L22[:, 0], axis1=1, axis2=2)), axis=1)
+        self.z = np.concatenate((self.z, z_new[:, 0]), axis=2)
+        self.selected = np.concatenate((self.selected, columns[0]))
+
+
+def forward_selection(X, y, n_channels, reg_lambda=0., reg_gamma=0.,
+                      folds=None, n_select=None):
+    """Sequential forward selection of sensors.
+
+    Parameters
+    ----------
+    X : array, shape=(n_samples, n_features * n_channels)
+        Feature matrix, with columns grouped by feature, then by channel.
+    y : array, shape=(n_samples,)
+        Class labels.
+    n_channels : int
+        Number of channels (sensors).
+    reg_lambda, reg_gamma : float (default: 0.)
+        Classifier regularisation (see
+        ``common.discriminant_analysis.DiscriminantAnalysis``).
+    folds : list of (array, array) or None (default: None)
+        Training and test indices of the cross-validation folds. If None,
+        ``stratified_folds(y)`` is used.
+    n_select : int or None (default: None)
+        Number of sensors to select. If None, all sensors are ranked.
+
+    Returns
+    -------
+    order : array, shape=(n_select,)
+        Selected channels, in order of addition.
+    losses : array, shape=(n_select,)
+        Cross-validated cross-entropy loss after each addition.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    if X.shape[1] % n_channels:
+        raise ValueError("The number of columns is not a multiple of the "
+                         "number of channels.")
+    columns = channel_columns(n_channels, X.shape[1] // n_channels)
+    if folds is None:
+        folds = stratified_folds(y)
+    if n_select is None:
+        n_select = n_channels
+    models = [_FoldModel(X[train], y[train], X[test], y[test], reg_lambda,
+                         reg_gamma) for train, test in folds]
+    n_test = sum(test.size for _, test in folds)
+
+    remaining = list(range(n_channels))
+    order, losses = [], []
+    for _ in range(n_select):
+        candidates = columns[remaining]
+        total = sum(model.log_losses(candidates) for model in models)
+        best = int(np.argmin(total))
+        for model in models:
+            model.add(candidates[best])
+        order.append(remaining.pop(best))
+        losses.append(total[best] / n_test)
+    return np.array(order), np.array(losses)
+
+
+def selection_results(datasets, n_channels, classifiers=CLASSIFIERS,
+                      n_folds=5, n_select=None, seed=None):
+    """Forward selection curves of several subjects and classifiers.
+
+    Parameters
+    ----------
+    datasets : iterable of (subject, participant, X, y)
+        Feature matrix and labels of each subject, with the subject ID and
+        participant group.
+    n_channels : int
+        Number of channels (sensors).
+    classifiers : list of str (default: CLASSIFIERS)
+        Classifiers, keys of ``CLASSIFIER_PARAMS``.
+    n_folds : int (default: 5)
+        Number of cross-validation folds. All classifiers of a subject use
+        the same folds.
+    n_select : int or None (default: None)
+        Number of sensors to select. If None, all sensors are ranked.
+    seed : int or None (default: None)
+        Seed of the fold assignment.
+
+    Returns
+    -------
+    results_df : DataFrame
+        Results with the columns of ``offline_analysis_results.csv``.
+    """
+    rows = []
+    for subject, participant, X, y in datasets:
+        folds = stratified_folds(y, n_folds=n_folds, seed=seed)
+        for name in classifiers:
+            _, losses = forward_selection(X, y, n_channels, folds=folds,
+                                          n_select=n_select,
+                                          **CLASSIFIER_PARAMS[name])
+            rows.extend((subject, name, i + 1, loss, participant)
+                        for i, loss in enumerate(losses))
+    results_df = pd.DataFrame(rows, columns=RESULTS_COLUMNS)
+    return results_df.sort_values(['subject', 'number of sensors'],
+                                  kind='mergesort').reset_index(drop=True)
+
+
+def _load_dataset(path):
+    with np.load(path, allow_pickle=False) as f:
+        return (f['subject'].item(), str(f['participant']), f['X'], f['y'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run forward sensor selection on feature files.")
+    parser.add_argument('paths', nargs='+',
+                        help=".npz files with X, y, subject and participant")
+    parser.add_argument('-n', '--n-channels', type=int, required=True,
+                        help="number of channels (sensors)")
+    parser.add_argument('-o', '--output', required=True,
+                        help="CSV file to write the results to")
+    parser.add_argument('--folds', type=int, default=5,
+                        help="number of cross-validation folds")
+    parser.add_argument('--n-select', type=int, default=None,
+                        help="number of sensors to select (default: all)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed of the fold assignment")
+    args = parser.parse_args(argv)
+
+    datasets = (_load_dataset(path) for path in args.paths)
+    results_df = selection_results(datasets, args.n_channels,
+                                   n_folds=args.folds,
+                                   n_select=args.n_select, seed=args.seed)
+    results_df.to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,38 +1,38 @@
-import pandas as pd
-from itertools import combinations
-from scipy.stats import wilcoxon, friedmanchisquare
+import os
 
-from utils import load_results
+from utils import load_results, stage
+from nonparametric import nonparametric_tests
 
-results_df = load_results('data/offline_analysis_results.csv')
+HERE = os.path.dirname(os.path.abspath(__file__))
 
-lda_logloss = results_df[(results_df["number of sensors"]==2) & (results_df["Classifier"] == "LDA")].logloss.values
-rda_logloss = results_df[(results_df["number of sensors"]==2) & (results_df["Classifier"] == "RDA")].logloss.values
-qda_logloss = results_df[(results_df["number of sensors"]==2) & (results_df["Classifier"] == "QDA")].logloss.values
+with stage('load'):
+    results_df = load_results(
+            os.path.join(HERE, 'data', 'offline_analysis_results.csv'))
 
-st, p = friedmanchisquare(lda_logloss, rda_logloss, qda_logloss)
+# Friedman tests and post-hoc pair-wise comparisons for all sensor counts and
+# participant groups; the manuscript reports the two-sensor case for all
+# participants
+alpha = 0.05
+with stage('tests'):
+    friedman_df, comparison_df = nonparametric_tests(
+            results_df, value='logloss', treatments=["LDA", "RDA", "QDA"],
+            alpha=alpha)
+friedman_df = friedman_df[(friedman_df["Group"] == "All") &
+                          (friedman_df["number of sensors"] == 2)]
+comparison_df = comparison_df[(comparison_df["Group"] == "All") &
+                              (comparison_df["number of sensors"] == 2)]
+
+st, p = friedman_df[["statistic", "p-value"]].values[0]
 print("Friedman test outcome")
 print("------------------------------------")
 print("statistic: {:.3f}, p-value {:.3e}".format(st, p))
 print('\n')
 
 # Pair-wise comparisons
-alpha = 0.05
-comparison_df = pd.DataFrame(columns=["Algorithm 1", "Algorithm 2", "p-value"])
-df_idx = 0
-algorithm_names = ["LDA", "RDA", "QDA"]
-algorithm_accuracies = [lda_logloss, rda_logloss, qda_logloss]
-pvals = []
-for ((name_ii, name_jj), (ii, jj)) in zip(combinations(algorithm_names, r=2), combinations(algorithm_accuracies, r=2)):
-    _, p = wilcoxon(ii,jj)
-    comparison_df.loc[df_idx] = [name_ii, name_jj, p]
-    df_idx += 1
-pvals = comparison_df["p-value"].values
-num_comp = pvals.size
-alpha_corrected = 1 - (1-alpha)**(1/num_comp) # Sidak comparison
-comparison_df["Significant"] = comparison_df["p-value"]<alpha_corrected
+alpha_corrected = comparison_df["Alpha corrected"].values[0] # Sidak
 print("Post-hoc pairwise comparisons:")
 print("Wilcocoxon signed rank tests and Šidák correction")
 print("-------------------------------------------------")
 print("Alpha corrected: {:.3f}".format(alpha_corrected))
-print(comparison_df.to_string(index=False))
\ No newline at end of file
+print(comparison_df[["Algorithm 1", "Algorithm 2", "p-value", "Method",
+                     "Significant"]].to_string(index=False))
@@ -1,6 +1,19 @@
+import os
+import sys
+
 import numpy as np
 import pandas as pd
 
+_ROOT = os.path.normpath(os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), os.pardir))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from common.bootstrap import bootstrap_frame, plot_point_intervals
+from common.instrumentation import stage
+from common.subjects import subject_attribute
+from confusion_store import ConfusionAccumulator, ConfusionStore
+
 def load_results(path):
     """Loads results file.
     
@@ -17,10 +30,64 @@ def load_results(path):
     results_df = pd.read_csv(path)
     return results_df
 
+def load_confusion_store(path):
+    """Opens stored confusion matrices and checks the group of every
+    subject against the subject registry.
+    
+    Parameters
+    ----------
+    path : str
+        Path of a ``.npy`` tensor (see ``confusion_store.ConfusionStore``)
+        or directory of an append-only store (see
+        ``confusion_store.ConfusionAccumulator``).
+    
+    Returns
+    -------
+    store : ConfusionStore or ConfusionAccumulator
+        The store, whose groups agree with the registry.
+    """
+    if os.path.isdir(path):
+        store = ConfusionAccumulator(path)
+    else:
+        store = ConfusionStore(path)
+    subjects = store.coords['subject']
+    groups = subject_attribute(subjects)
+    mismatched = [subject for subject, stored, group in
+                  zip(subjects, store.coords['group'], groups)
+                  if stored != group]
+    if mismatched:
+        raise ValueError("Groups of subjects {} in {} do not match the "
+                         "subject registry.".format(mismatched, path))
+    return store
+
+def confusion_group_sizes(path):
+    """Returns the number of subjects of every group in stored confusion
+    matrices.
+    
+    Parameters
+    ----------
+    path : str
+        See ``load_confusion_store``.
+    
+    Returns
+    -------
+    sizes : Series
+        Number of subjects, indexed by participant group.
+    """
+    return pd.Series(subject_attribute(
+            load_confusion_store(path).coords['subject'])).value_counts()
+
 def load_confusion_matrices(path, classifier='RDA', n_sensors=2):
     """Loads offline confusion matrices and computes averages across able-
     bodied and amputee populations for a specified classifier.
     
+    Subjects, groups and class labels are read from the coordinate sidecar
+    of the tensor and group means are precomputed (see
+    ``confusion_store.ConfusionStore``). ``path`` can also be the directory
+    of an append-only store (see ``confusion_store.ConfusionAccumulator``).
+    Stored groups must agree with the subject registry (see
+    ``load_confusion_store``).
+    
     Parameters
     ----------
     path : str
@@ -39,17 +106,8 @@ def load_confusion_matrices(path, classifier='RDA', n_sensors=2):
     labels : list of str
         Class labels.
     """
-    CLASSIFIERS = ["LDA", "RDA", "QDA"]
-    LABELS = ['rest', 'power', 'lateral', 'tripod', 'pointer', 'open']
-    N_AB = 12 # number of able-bodied participants
-    N_AMP = 2 # number of amptuee participants
-    
-    confusion_matrices = np.load(path)
-    cm_ab = confusion_matrices[0:N_AB, n_sensors-1,
-                               CLASSIFIERS.index(classifier), :, :]
-    cm_amp = confusion_matrices[N_AB:N_AB + N_AMP, n_sensors-1,
-                                CLASSIFIERS.index(classifier), :, :]
-    cm_ab_mean = np.mean(cm_ab, axis=0)
-    cm_amp_mean = np.mean(cm_amp, axis=0)
-    
-    return (cm_ab_mean, cm_amp_mean, LABELS)
\ No newline at end of file
+    store = load_confusion_store(path)
+    cm_ab_mean = store.group_mean('Able-bodied', classifier, n_sensors)
+    cm_amp_mean = store.group_mean('Amputee', classifier, n_sensors)
+    
+    return (cm_ab_mean, cm_amp_mean, store.labels)
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -5,13 +6,25 @@ import seaborn as sns; sns.set()
 import warnings
 
 from utils import get_early_late_times, get_df_mean_rates, get_df_early_late
+from utils import load_cached, stage
+from utils import bootstrap_frame, plot_intervals, plot_point_intervals
+from utils import load_groups, subject_attribute
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, '.frame_cache')
 
 warnings.filterwarnings("ignore")
 
 # Load data
-df = pd.read_csv('data/experimental_results.csv')
-df_mean = get_df_mean_rates(df) # Results with mean completion rates
-df_average_time_block_type  = get_df_early_late(df) # Early vs. late
+RESULTS_PATH = os.path.join(HERE, 'data', 'experimental_results.csv')
+with stage('load'):
+    df = pd.read_csv(RESULTS_PATH)
+    # Results with mean completion rates
+    df_mean = load_cached(get_df_mean_rates, RESULTS_PATH,
+                          cache_dir=CACHE_DIR)
+    # Early vs. late
+    df_average_time_block_type = load_cached(get_df_early_late, RESULTS_PATH,
+                                             cache_dir=CACHE_DIR)
 # Get early_times and late_times as numpy arrays
 early_times, late_times = get_early_late_times(df_average_time_block_type)
 
@@ -28,6 +41,7 @@ linewidth = 1.
 ci=95
 n_boot=1000
 estimator = np.median
+bootstrap_cache = os.path.join(HERE, '.bootstrap_cache')
 
 # Boxplot properties
 box_width = 0.5
@@ -43,20 +57,32 @@ swarm_color = 'k'
 # Violinplot properties
 violin_cut = 1.
 
+# Subjects and groups in plotting order (sorted by subject number and by
+# first appearance, respectively)
+subjects = np.sort(df['Subject number'].unique())
+group_order = list(pd.unique(df_mean['Participant']))
+xticklabels = subject_attribute(subjects, 'Label')
+group_xticklabels = load_groups()['Abbreviation'].reindex(group_order).values
+
 # Colours
-palette_subjects = sns.color_palette("Paired", 12)[0:2]
+palette_subjects = sns.color_palette("Paired", 12)[0:len(group_order)]
 palette_blocks = sns.color_palette("Paired", 12)[2:4]
+colors = [palette_subjects[group_order.index(p)]
+          for p in subject_attribute(subjects)]
 
 
 # First row: completion rate
-xticklabels = ["AB " + str(i) for i in range(1,13)] + ["Amp 1", "Amp 2"]
-colors = [palette_subjects[0] for i in range(12)] + [
-        palette_subjects[1] for i in range(2)]
 ax1 = plt.subplot2grid((3, 20), (0, 0), colspan=17)
 sns.barplot(data=df_mean, y='Mean completion rate', x="Subject number",
             ax = ax1, palette=colors,
            estimator=estimator, errwidth=errwidth, linewidth=linewidth,
-           edgecolor='k',ci=ci, n_boot=n_boot)#, color=colors[0])
+           edgecolor='k',ci=None)#, color=colors[0])
+with stage('bootstrap'):
+    rate_ci = bootstrap_frame(df_mean, 'Mean completion rate',
+                              'Subject number', estimator='median',
+                              n_boot=n_boot, ci=ci, cache_dir=bootstrap_cache)
+plot_intervals(ax1, np.arange(len(rate_ci)), rate_ci['ci_low'].values,
+               rate_ci['ci_high'].values, color='.26', errwidth=errwidth)
 ax1.set_ylabel("Completion rate [%]")
 ax1.set_xlabel('')
 ax1.set_ylim([0, 120])
@@ -75,7 +101,7 @@ ax2.set_yticks(ax1.get_yticks())
 ax2.set_ylabel('')
 ax2.set_ylim(ax1.get_ylim())
 plt.setp(ax2.get_yticklabels(), visible=False)
-ax2.set_xticklabels(["AB", "Amp"], rotation=30)
+ax2.set_xticklabels(group_xticklabels, rotation=30)
 
 # Second row: completion time
 ax3 = plt.subplot2grid((3, 20), (1, 0), colspan=17)
@@ -87,7 +113,6 @@ sns.swarmplot(data = df[df["Trial_success"]==1], y="Trial_time",
              size=swarm_size, color=swarm_color)
 ax3.set_ylabel("Completion time [s]")
 ax3.set_xlabel("")
-xticklabels = ["AB " + str(i) for i in range(1,13)] + ["Amp 1", "Amp 2"]
 ax3.set_xticklabels(xticklabels, rotation=30)
 ax4 = plt.subplot2grid((3,20), (1,17), colspan=3, sharey=ax3)
 sns.violinplot(data = df[df["Trial_success"]==1], y="Trial_time",
@@ -96,8 +121,7 @@ sns.violinplot(data = df[df["Trial_success"]==1], y="Trial_time",
 plt.setp(ax4.get_yticklabels(), visible=False)
 ax4.set_ylabel('')
 ax4.set_xlabel('')
-xticklabels = ["AB", "Amp"]
-ax4.set_xticklabels(xticklabels, rotation=30)
+ax4.set_xticklabels(group_xticklabels, rotation=30)
 plt.setp(ax4.get_yticklabels(), visible=False)
 
 ax1.set_title("Individual participants")
@@ -106,11 +130,19 @@ ax2.set_title("Grouped")
 # Row 3: completion time vs. trial number
 palette = sns.color_palette("deep", n_colors=2)
 estimator = np.median
+dodge = 0.1
 ax5 = plt.subplot2grid((3,20), (2,0), colspan=17, sharey=ax3)
 sns.pointplot(x="Trial", y="Trial_time", hue="Participant",data=df, \
-              estimator=estimator, palette=palette_subjects, ax=ax5, dodge=0.1, 
-              markers = ["s", "o"], linestyles = ['-', '--'], 
-              capsize=.05, ci=95, n_boot=1000)
+              estimator=estimator, palette=palette_subjects, ax=ax5,
+              dodge=dodge, markers = ["s", "o"], linestyles = ['-', '--'], 
+              capsize=.05, ci=None)
+with stage('bootstrap'):
+    time_ci = bootstrap_frame(df, 'Trial_time', ['Participant', 'Trial'],
+                              estimator='median', n_boot=n_boot, ci=ci,
+                              cache_dir=bootstrap_cache)
+plot_point_intervals(ax5, time_ci, x="Trial", hue="Participant",
+                     hue_order=list(pd.unique(df["Participant"])),
+                     palette=palette_subjects, dodge=dodge, capsize=.05)
 ax5.set_xticklabels(np.arange(1,11))
 ax5.set_xlabel("Trial number")
 plt.setp(ax5.collections, sizes=[30])
@@ -145,10 +177,12 @@ fig.text(0.02, 0.97, "a", weight="bold")
 fig.text(0.02, 0.65, "b", weight="bold")
 fig.text(0.02, 0.38, "c", weight="bold")
 
-fig.align_labels()
-fig.tight_layout()
-fig.subplots_adjust(wspace=0.15, hspace=0.3)
+with stage('layout'):
+    fig.align_labels()
+    fig.tight_layout()
+    fig.subplots_adjust(wspace=0.15, hspace=0.3)
 
 sns.despine(bottom=True, left=True)
-plt.savefig('Figure_5.pdf', dpi=600, bbox_inches='tight',
-            transparent=False, pad_inches=0)
\ No newline at end of file
+with stage('save'):
+    plt.savefig(os.path.join(HERE, 'Figure_5.pdf'), dpi=600,
+                bbox_inches='tight', transparent=False, pad_inches=0)
@@ -1,18 +1,28 @@
-import pandas as pd
+import os
 from scipy.stats import wilcoxon
 import warnings
 
-from utils import get_early_late_times, get_df_early_late
+from utils import get_early_late_times, get_df_early_late, load_cached
+from utils import stage
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, '.frame_cache')
 
 warnings.filterwarnings("ignore")
 
 # Load data
-df = pd.read_csv('data/experimental_results.csv')
-df_average_time_block_type  = get_df_early_late(df) # Early vs. late
+with stage('load'):
+    # Early vs. late
+    df_average_time_block_type = load_cached(
+            get_df_early_late,
+            os.path.join(HERE, 'data', 'experimental_results.csv'),
+            cache_dir=CACHE_DIR)
 # Get early_times and late_times as numpy arrays
 early_times, late_times = get_early_late_times(df_average_time_block_type)
 
+with stage('tests'):
+    p = wilcoxon(early_times, late_times)[1]
+
 print("Wilcoxon signed-rank test (early vs. late trials)")
 print("-------------------------------------------------")
-print("p={:.3f}, n={}".format(wilcoxon(early_times, late_times)[1],
-      early_times.size))
\ No newline at end of file
+print("p={:.3f}, n={}".format(p, early_times.size))
\ No newline at end of file
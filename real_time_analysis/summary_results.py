@@ -1,15 +1,26 @@
+import os
 import numpy as np
 import pandas as pd
 import warnings
 
 from utils import get_early_late_times, get_df_early_late, get_df_mean_rates
+from utils import load_cached, stage
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, '.frame_cache')
 
 warnings.filterwarnings("ignore")
 
 # Load data
-df = pd.read_csv('data/experimental_results.csv')
-df_mean = get_df_mean_rates(df) # Results with mean completion rates
-df_average_time_block_type  = get_df_early_late(df) # Early vs. late
+RESULTS_PATH = os.path.join(HERE, 'data', 'experimental_results.csv')
+with stage('load'):
+    df = pd.read_csv(RESULTS_PATH)
+    # Results with mean completion rates
+    df_mean = load_cached(get_df_mean_rates, RESULTS_PATH,
+                          cache_dir=CACHE_DIR)
+    # Early vs. late
+    df_average_time_block_type = load_cached(get_df_early_late, RESULTS_PATH,
+                                             cache_dir=CACHE_DIR)
 # Get early_times and late_times as numpy arrays
 early_times, late_times = get_early_late_times(df_average_time_block_type)
 
@@ -1,95 +1,89 @@
-import numpy as np
+import os
+import sys
+
 import pandas as pd
 
-# Subject numbers convention
-# Able-bodied: 1-12
-# Amputee: 20-21
-SUBJECTS = np.concatenate((np.arange(1,13), np.array([20,21]))).astype(
-        np.int32)
+_ROOT = os.path.normpath(os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), os.pardir))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from common.aggregation import aggregate_blocks, paired_blocks
+from common.bootstrap import (bootstrap_frame, plot_intervals,
+                              plot_point_intervals)
+from common.cache import cached_frame, source_files
+from common.instrumentation import stage, staged
+from common.subjects import (SUBJECTS_PATH, load_groups, subject_attribute,
+                             subject_ids)
 
+@staged('aggregate')
 def get_df_mean_rates(df):
     """Creates a new data frame with mean completion rates for each
     participant.
-    
+
     Parameters
     ----------
     df : DataFrame
         Data frame with results for each participant. Must have a column
         ```Trial_success```.
-    
+
     Returns
     -------
     df_mean : DataFrame
         Data frame including mean completion rates.
     """
-    df_mean = pd.DataFrame(columns=['Subject number', "Participant",
-                                    'Mean completion rate'])
-    # Able-bodied
-    i = 0
-    for subject in np.unique(df['Subject number']):
-        df_sub = df[df["Subject number"]==subject]
-        mn = df_sub['Trial_success'].mean()
-        df_mean.loc[i] = [int(subject), df_sub.Participant.unique()[0], 100*mn]
-        i += 1
-    
-    return df_mean
+    df_mean = df.groupby('Subject number', sort=True).agg(
+            {'Participant': 'first', 'Trial_success': 'mean'}).reset_index()
+    df_mean['Subject number'] = df_mean['Subject number'].astype(int)
+    df_mean['Trial_success'] *= 100
+    df_mean = df_mean.rename(columns={'Trial_success': 'Mean completion rate'})
+
+    return df_mean[['Subject number', 'Participant', 'Mean completion rate']]
 
+@staged('aggregate')
 def get_df_early_late(df, early_limit=3, late_limit=7):
     """Creates a new data frame for storing results where trials are
     categorised as either ```early``` or ```late```.
-    
+
     Parameters
     ----------
     df : DataFrame
-        Data frame with results for each participant. 
-    
+        Data frame with results for each participant.
+
     early_limit : int
         Limit for a trial to be considered as ```early``` (not inclusive).
-    
+
     late_limit : int
         Limit for a trial to be considered as ```late``` (not inclusive).
-    
+
     Returns
     -------
     df_avg_time_block : DataFrame
         Data frame with average completion times for early and late trials.
     """
-    average_function = np.median
-    df_avg_time_block = pd.DataFrame(columns=['Subject number',
-                                              'Participant',
-                                              'Block type',
-                                              'Average completion time'])
-    i = 0
-    for subject in SUBJECTS:
-        if subject == 20 or subject == 21:
-            participant = "Amputee"
-        else:
-            participant = "Able-bodied"
-        avg_early_time = average_function(
-            df[(df["Subject number"]==subject) & 
-               (df["Trial_success"]==1) &
-              (df["Trial"]<early_limit)]["Trial_time"])
-        avg_late_time = average_function(
-            df[(df["Subject number"]==subject) & 
-               (df["Trial_success"]==1) &
-              (df["Trial"]>late_limit)]["Trial_time"])
-        df_avg_time_block.loc[i] = [subject, participant, 'early',
-                             avg_early_time]
-        df_avg_time_block.loc[i+1] = [subject, participant, 'late',
-                             avg_late_time]
-        i = i + 2
-    
-    return df_avg_time_block
-    
+    success = df["Trial_success"] == 1
+    df_avg_time_block = aggregate_blocks(
+            df, 'Trial_time',
+            blocks=[('early', success & (df["Trial"] < early_limit)),
+                    ('late', success & (df["Trial"] > late_limit))],
+            levels=[('Subject number',
+                     subject_ids(among=df['Subject number']))],
+            func='median', block_name='Block type')
+    df_avg_time_block.insert(1, 'Participant', subject_attribute(
+            df_avg_time_block['Subject number']))
+
+    return df_avg_time_block.rename(
+            columns={'Trial_time': 'Average completion time'})
+
 def get_early_late_times(df_average):
     """Returns early and late trial completion times for statistical
-    comparisons.
-    
+    comparisons. Participants missing either time are excluded.
+
     Parameters
     ----------
     df_average : DataFrame
         Data frame with results for each participant.
-    
+
     Returns
     -------
     early_times : array
@@ -97,16 +91,16 @@ def get_early_late_times(df_average):
     late_times : array
         Array with late times.
     """
-    early_times = df_average[df_average[
-            "Block type"]=='early']['Average completion time'].values
-    late_times = df_average[df_average[
-            "Block type"]=='late']['Average completion time'].values
-    early_none = np.where(np.isnan(early_times))
-    late_none = np.where(np.isnan(late_times))
-    
-    early_times = np.delete(early_times, np.concatenate((early_none[0],
-                                                         late_none[0])))
-    late_times = np.delete(late_times, np.concatenate((early_none[0],
-                                                       late_none[0])))
-    
-    return (early_times, late_times)
\ No newline at end of file
+    return paired_blocks(df_average, 'Subject number', 'Block type',
+                         'Average completion time', 'early', 'late')
+
+def load_cached(func, path, cache_dir=None, **params):
+    """Computes a frame from the results file at ``path`` with one of the
+    functions above, or loads it from the frame cache in ``cache_dir``.
+
+    The subject registry and the shared aggregation and registry code are
+    inputs of every frame. See ``common.cache.cached_frame``.
+    """
+    depends = [SUBJECTS_PATH] + source_files(aggregate_blocks, subject_ids)
+    return cached_frame(func, path, params=params, depends=depends,
+                        cache_dir=cache_dir)
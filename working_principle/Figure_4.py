@@ -1,24 +1,30 @@
+import os
 import numpy as np
 from matplotlib import pyplot as plt
 import matplotlib.patches as mpatches
 import seaborn as sns
 
-from utils import HandlerEllipse
+from utils import HandlerEllipse, plot_decimated, stage
+from loaders import load_txt
+from features import RAW_FS, PROC_FS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
 
 c = mpatches.Circle((0.5, 0.5), 1, facecolor='#f5f5f5', edgecolor='red',
                     linewidth=1)
 
 MOVEMENTS = ['rest', 'power', 'lateral', 'tripod', 'pointer', 'open']
-RAW_FS = 2000 # Raw data sampling rate
-PROC_FS = 20 # Processed/binned data sampling rate
 
 # Load data
-raw_emg_chan_1 = np.loadtxt('data/raw_emg_channel_1.txt')
-raw_emg_chan_2 = np.loadtxt('data/raw_emg_channel_2.txt')
-pred = np.loadtxt('data/prediction.txt')
-pred_proba = np.loadtxt('data/posterior_proba.txt')
-state = np.loadtxt('data/control_state.txt')
-thresh = np.loadtxt('data/rejection_thresholds.txt')
+with stage('load'):
+    raw_emg_chan_1 = load_txt(
+            os.path.join(HERE, 'data', 'raw_emg_channel_1.txt'))
+    raw_emg_chan_2 = load_txt(
+            os.path.join(HERE, 'data', 'raw_emg_channel_2.txt'))
+    pred = load_txt(os.path.join(HERE, 'data', 'prediction.txt'))
+    pred_proba = load_txt(os.path.join(HERE, 'data', 'posterior_proba.txt'))
+    state = load_txt(os.path.join(HERE, 'data', 'control_state.txt'))
+    thresh = load_txt(os.path.join(HERE, 'data', 'rejection_thresholds.txt'))
 
 # Compute time vectors for raw data and predictions
 t_raw = np.arange(raw_emg_chan_1.shape[0]) / RAW_FS
@@ -37,10 +43,12 @@ ax=[]
 palette = sns.color_palette("Greys", 4)[1:]
 lw=2
 ax.append(plt.subplot2grid((11, 1), (0, 0), rowspan=2, colspan=1))
-ax[0].plot(t_raw, raw_emg_chan_1, color=sns.color_palette("Paired")[8],
-  label='EMG channel 1')
-ax[0].plot(t_raw, raw_emg_chan_2, color=sns.color_palette("Paired")[9],
-  label='EMG channel 2')
+# Long series are decimated to the output resolution; raw EMG is also
+# rasterised
+plot_decimated(ax[0], t_raw, raw_emg_chan_1,
+               color=sns.color_palette("Paired")[8], label='EMG channel 1')
+plot_decimated(ax[0], t_raw, raw_emg_chan_2,
+               color=sns.color_palette("Paired")[9], label='EMG channel 2')
 ax[0].set_ylabel('EMG')
 ax[0].set_xlabel('')
 plt.setp(ax[0].get_xticklabels(),visible=False)
@@ -56,10 +64,12 @@ ellipse_lw = 1.
 
 ax.append(plt.subplot2grid((11, 1), (2, 0), rowspan=2, colspan=1,
                            sharex=ax[0]))
-ax[1].plot(t_proc, pred,label='classification prediction',
-  linewidth=lw_prediction, color='k')
-ax[1].plot(t_proc, state, label='prosthesis state',
-  linewidth=lw_control, color="#3498db")
+plot_decimated(ax[1], t_proc, pred, rasterized=False,
+               label='classification prediction', linewidth=lw_prediction,
+               color='k')
+plot_decimated(ax[1], t_proc, state, rasterized=False,
+               label='prosthesis state', linewidth=lw_control,
+               color="#3498db")
 ax[1].set_yticklabels(MOVEMENTS)
 ax[1].set_yticks(np.arange(len(MOVEMENTS)))
 
@@ -94,8 +104,9 @@ for cc, class_ in enumerate(MOVEMENTS):
     else:
         ax.append(plt.subplot2grid((11, 1), (cc+4, 0), rowspan=1, colspan=1,
                                    sharex=ax[1], sharey=ax[2]))
-    plt.plot(t_proc, pred_proba[:, cc], color = palette[cc],
-             label = MOVEMENTS[cc], linewidth=lw_posterior)
+    plot_decimated(ax[cc+2], t_proc, pred_proba[:, cc], rasterized=False,
+                   color=palette[cc], label=MOVEMENTS[cc],
+                   linewidth=lw_posterior)
     ax[cc+2].set_ylabel(class_)
     ax[cc+2].spines['top'].set_visible(False)
     ax[cc+2].spines['right'].set_visible(False)
@@ -121,7 +132,9 @@ fig.text(0.02, 0.97, "a", weight="bold")
 fig.text(0.02, 0.81, "b", weight="bold")
 fig.text(0.02, 0.61, "c", weight="bold")
 
-fig.tight_layout()
-fig.subplots_adjust(hspace=0.2)
-plt.savefig('Figure_4.pdf', dpi=600, bbox_inches='tight',
-            transparent=False, pad_inches=0)
\ No newline at end of file
+with stage('layout'):
+    fig.tight_layout()
+    fig.subplots_adjust(hspace=0.2)
+with stage('save'):
+    plt.savefig(os.path.join(HERE, 'Figure_4.pdf'), dpi=600,
+                bbox_inches='tight', transparent=False, pad_inches=0)
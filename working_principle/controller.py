@@ -0,0 +1,164 @@
+import numpy as np
+
+REST = 0 # Index of the rest class
+
+
+def _forward_fill(pred, accept, reset, initial_state):
+    """Carries accepted decisions forward along the last axis.
+
+    At every bin the state is the latest accepted decision. Bins where
+    ``reset`` is True start from ``initial_state`` unless the decision at
+    that bin is itself accepted.
+    """
+    n_bins = pred.shape[-1]
+    values = np.where(accept, pred, initial_state)
+    idx = np.where(accept | reset, np.arange(n_bins), -1)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    state = np.take_along_axis(values, np.maximum(idx, 0), axis=-1)
+    state[idx < 0] = initial_state
+    return state
+
+
+def _accept(proba, thresholds, hold_classes):
+    """Returns decisions and acceptance masks, broadcast over batches."""
+    proba = np.asarray(proba)
+    thresholds = np.asarray(thresholds)
+    if proba.ndim < 2 or thresholds.ndim < 1:
+        raise ValueError("proba must have shape (..., n_bins, n_classes) "
+                         "and thresholds (..., n_classes).")
+    if proba.shape[-1] != thresholds.shape[-1]:
+        raise ValueError("proba and thresholds must have the same number "
+                         "of classes.")
+    n_bins, n_classes = proba.shape[-2:]
+    batch = np.broadcast(proba[..., 0, 0], thresholds[..., 0]).shape
+
+    pred = np.argmax(proba, axis=-1)
+    p_max = np.take_along_axis(proba, pred[..., np.newaxis], axis=-1)[..., 0]
+    thresh_b = np.broadcast_to(thresholds[..., np.newaxis, :],
+                               batch + (n_bins, n_classes))
+    pred_b = np.broadcast_to(pred, batch + (n_bins,))
+    thresh_pred = np.take_along_axis(thresh_b, pred_b[..., np.newaxis],
+                                     axis=-1)[..., 0]
+    accept = p_max >= thresh_pred
+    if len(hold_classes):
+        accept &= ~np.isin(pred_b, hold_classes)
+    return pred_b, accept
+
+
+def control_state(proba, thresholds, hold_classes=(REST,),
+                  initial_state=REST):
+    """Replays the confidence-based rejection controller.
+
+    A decision changes the prosthesis state only if its posterior
+    probability reaches the rejection threshold of the predicted class;
+    otherwise the previous state is kept. Decisions for ``hold_classes``
+    (by default rest) never change the state, i.e. the hand holds its
+    current posture. With the defaults this reproduces
+    ``control_state.txt`` from ``posterior_proba.txt`` and
+    ``rejection_thresholds.txt``.
+
+    All bins are processed at once with a masked forward-fill. Leading
+    dimensions of ``proba`` and ``thresholds`` broadcast against each other,
+    so a batch of sessions, a batch of threshold vectors, or both can be
+    simulated in one call.
+
+    Parameters
+    ----------
+    proba : array, shape=(..., n_bins, n_classes)
+        Posterior class probabilities.
+    thresholds : array, shape=(..., n_classes)
+        Rejection thresholds for each class.
+    hold_classes : sequence of int (default: (REST,))
+        Classes whose decisions never change the state.
+    initial_state : int (default: REST)
+        State before the first accepted decision.
+
+    Returns
+    -------
+    state : array, shape=(..., n_bins)
+        Prosthesis state at every bin. Leading dimensions are the broadcast
+        of those of ``proba`` and ``thresholds``.
+    """
+    pred, accept = _accept(proba, thresholds, hold_classes)
+    reset = np.zeros(pred.shape[-1], dtype=bool)
+    reset[0] = True
+    return _forward_fill(pred, accept, reset, initial_state)
+
+
+def control_state_sessions(sessions, thresholds, hold_classes=(REST,),
+                           initial_state=REST):
+    """Replays the controller for sessions of different lengths.
+
+    Sessions are concatenated along time and processed in a single call;
+    the state is reset to ``initial_state`` at the start of every session.
+
+    Parameters
+    ----------
+    sessions : list of arrays, shape=(n_bins_i, n_classes)
+        Posterior class probabilities for each session.
+    thresholds : array, shape=(..., n_classes)
+        Rejection thresholds, e.g. one vector per threshold setting.
+    hold_classes : sequence of int (default: (REST,))
+        Classes whose decisions never change the state.
+    initial_state : int (default: REST)
+        State at the start of every session.
+
+    Returns
+    -------
+    states : list of arrays, shape=(..., n_bins_i)
+        Prosthesis state of every session.
+    """
+    lengths = [session.shape[0] for session in sessions]
+    starts = np.cumsum([0] + lengths[:-1])
+    pred, accept = _accept(np.concatenate(sessions), thresholds,
+                           hold_classes)
+    reset = np.zeros(pred.shape[-1], dtype=bool)
+    reset[starts[np.asarray(lengths) > 0]] = True
+    state = _forward_fill(pred, accept, reset, initial_state)
+    return np.split(state, starts[1:], axis=-1)
+
+
+class StreamingController(object):
+    """Confidence-based rejection controller updated as decisions arrive.
+
+    Gives the same states as ``control_state`` over the concatenation of all
+    blocks passed to ``update``.
+
+    Parameters
+    ----------
+    thresholds : array, shape=(n_classes,)
+        Rejection thresholds for each class.
+    hold_classes : sequence of int (default: (REST,))
+        Classes whose decisions never change the state.
+    initial_state : int (default: REST)
+        State before the first accepted decision.
+
+    Attributes
+    ----------
+    state : int
+        Current prosthesis state.
+    """
+    def __init__(self, thresholds, hold_classes=(REST,), initial_state=REST):
+        self.thresholds = np.asarray(thresholds)
+        self.hold_classes = hold_classes
+        self.state = initial_state
+
+    def update(self, proba):
+        """Processes a block of decisions.
+
+        Parameters
+        ----------
+        proba : array, shape=(n_bins, n_classes)
+            Posterior class probabilities of consecutive bins.
+
+        Returns
+        -------
+        state : array, shape=(n_bins,)
+            Prosthesis state at every bin.
+        """
+        pred, accept = _accept(proba, self.thresholds, self.hold_classes)
+        state = _forward_fill(pred, accept, np.zeros(pred.shape, dtype=bool),
+                              self.state)
+        if state.size:
+            self.state = state[-1]
+        return state
@@ -0,0 +1,212 @@
+from itertools import islice
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+RAW_FS = 2000 # Raw data sampling rate
+PROC_FS = 20 # Processed/binned data sampling rate
+BIN_SIZE = RAW_FS // PROC_FS # Number of raw samples per decision bin
+CHUNK_SIZE = 100 * BIN_SIZE # Default number of raw samples read at once
+
+
+def _mav(windows):
+    return np.mean(np.abs(windows), axis=1)
+
+
+def _wl(windows):
+    return np.sum(np.abs(np.diff(windows, axis=1)), axis=1)
+
+
+def _var(windows):
+    return np.var(windows, axis=1)
+
+
+def _logvar(windows):
+    return np.log(np.var(windows, axis=1))
+
+
+def _rms(windows):
+    return np.sqrt(np.mean(windows ** 2, axis=1))
+
+
+# Per-bin features. Each maps windows, shape=(n_bins, bin_size, n_channels)
+# to an array of shape=(n_bins, n_channels).
+FEATURES = {'mav': _mav, 'wl': _wl, 'var': _var, 'logvar': _logvar,
+            'rms': _rms}
+DEFAULT_FEATURES = ('logvar', 'wl')
+
+
+def iter_array_chunks(data, chunk_size=CHUNK_SIZE):
+    """Yields consecutive blocks of a multi-channel recording.
+
+    Parameters
+    ----------
+    data : array, shape=(n_samples, n_channels) or list of arrays
+        Recording, e.g. a memory map returned by ``loaders.load_txt``. A
+        list of one-dimensional arrays (one per channel) is also accepted,
+        in which case each block is stacked on the fly.
+    chunk_size : int
+        Number of samples per block.
+
+    Yields
+    ------
+    chunk : array, shape=(chunk_size, n_channels)
+        Block of samples. The last block may be shorter. For
+        two-dimensional input blocks are views, not copies.
+    """
+    if isinstance(data, (list, tuple)):
+        n_samples = min(channel.shape[0] for channel in data)
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            yield np.column_stack([channel[start:stop] for channel in data])
+    else:
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data[:, np.newaxis]
+        for start in range(0, data.shape[0], chunk_size):
+            yield data[start:start + chunk_size]
+
+
+def iter_txt_chunks(paths, chunk_size=CHUNK_SIZE, dtype=np.float64):
+    """Reads single-channel text files in lockstep, one block at a time.
+
+    Parameters
+    ----------
+    paths : list of str
+        One text file per channel (e.g. ``raw_emg_channel_1.txt``).
+    chunk_size : int
+        Number of samples per block.
+    dtype : data-type (default: np.float64)
+        Data type of the samples.
+
+    Yields
+    ------
+    chunk : array, shape=(chunk_size, n_channels)
+        Block of samples. Reading stops at the end of the shortest file.
+    """
+    files = [open(path, 'r') for path in paths]
+    try:
+        while True:
+            lines = [list(islice(f, chunk_size)) for f in files]
+            n = min(len(l) for l in lines)
+            if n == 0:
+                return
+            yield np.column_stack([np.loadtxt(l[:n], dtype=dtype, ndmin=1)
+                                   for l in lines])
+            if n < chunk_size:
+                return
+    finally:
+        for f in files:
+            f.close()
+
+
+def _as_windows(data, bin_size, step, n_windows):
+    """Returns a read-only strided view of overlapping windows."""
+    s0, s1 = data.strides
+    return as_strided(data, shape=(n_windows, bin_size, data.shape[1]),
+                      strides=(step * s0, s0, s1), writeable=False)
+
+
+def iter_windows(chunks, bin_size=BIN_SIZE, overlap=0):
+    """Cuts a stream of sample blocks into (possibly overlapping) bins.
+
+    Only the samples that are still needed by a future bin are carried over
+    between blocks, so memory use is bounded by the block size regardless
+    of the recording length.
+
+    Parameters
+    ----------
+    chunks : iterable of arrays, shape=(n_samples, n_channels)
+        Stream of sample blocks, e.g. from ``iter_array_chunks``.
+    bin_size : int (default: BIN_SIZE)
+        Number of samples per bin.
+    overlap : int (default: 0)
+        Number of samples shared by consecutive bins. Bins start every
+        ``bin_size - overlap`` samples.
+
+    Yields
+    ------
+    windows : array, shape=(n_bins, bin_size, n_channels)
+        Read-only strided view of all bins completed by the latest block.
+        The view is only valid until the next block is requested.
+    """
+    step = bin_size - overlap
+    if step <= 0 or overlap < 0:
+        raise ValueError("overlap must be in [0, bin_size).")
+
+    buf = None
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        if chunk.ndim == 1:
+            chunk = chunk[:, np.newaxis]
+        if buf is None or buf.shape[0] == 0:
+            buf = chunk
+        else:
+            buf = np.concatenate((buf, chunk))
+        if buf.shape[0] >= bin_size:
+            n_windows = (buf.shape[0] - bin_size) // step + 1
+            yield _as_windows(buf, bin_size, step, n_windows)
+            buf = buf[n_windows * step:]
+
+
+def iter_feature_blocks(chunks, bin_size=BIN_SIZE, overlap=0,
+                        features=DEFAULT_FEATURES):
+    """Computes features for every bin, one block of bins at a time.
+
+    Parameters
+    ----------
+    chunks : iterable of arrays, shape=(n_samples, n_channels)
+        Stream of sample blocks.
+    bin_size : int (default: BIN_SIZE)
+        Number of samples per bin.
+    overlap : int (default: 0)
+        Number of samples shared by consecutive bins.
+    features : sequence of str (default: DEFAULT_FEATURES)
+        Names of features to compute (keys of ``FEATURES``).
+
+    Yields
+    ------
+    X : array, shape=(n_bins, n_features * n_channels)
+        Feature matrix for the bins completed by the latest block. Columns
+        are grouped by feature, then by channel.
+    """
+    funcs = [FEATURES[name] for name in features]
+    for windows in iter_windows(chunks, bin_size=bin_size, overlap=overlap):
+        yield np.concatenate([func(windows) for func in funcs], axis=1)
+
+
+def iter_features(chunks, bin_size=BIN_SIZE, overlap=0,
+                  features=DEFAULT_FEATURES):
+    """Yields one feature vector per bin. See ``iter_feature_blocks``."""
+    for X in iter_feature_blocks(chunks, bin_size=bin_size, overlap=overlap,
+                                 features=features):
+        for x in X:
+            yield x
+
+
+def extract_features(data, bin_size=BIN_SIZE, overlap=0,
+                     features=DEFAULT_FEATURES, chunk_size=CHUNK_SIZE):
+    """Computes the feature matrix of a whole recording.
+
+    Parameters
+    ----------
+    data : array, shape=(n_samples, n_channels) or list of arrays
+        Recording.
+    bin_size, overlap, features
+        See ``iter_feature_blocks``.
+    chunk_size : int
+        Number of samples processed at once.
+
+    Returns
+    -------
+    X : array, shape=(n_bins, n_features * n_channels)
+        Feature matrix.
+    """
+    blocks = list(iter_feature_blocks(iter_array_chunks(data, chunk_size),
+                                      bin_size=bin_size, overlap=overlap,
+                                      features=features))
+    if not blocks:
+        n_channels = len(data) if isinstance(data, (list, tuple)) else (
+            1 if np.ndim(data) == 1 else np.shape(data)[1])
+        return np.empty((0, len(features) * n_channels))
+    return np.concatenate(blocks)
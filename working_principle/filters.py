@@ -0,0 +1,209 @@
+"""Streaming band-pass and notch filtering of raw EMG.
+
+Filters are cascades of second-order sections whose state is carried from
+one chunk to the next, so filtering a recording chunk by chunk gives the
+same output as filtering it at once, without discontinuities at chunk
+boundaries, while memory use only depends on the chunk size.
+
+Examples
+--------
+Filter the raw channels of a session, one chunk at a time, into
+``filtered``:
+
+    python filters.py data/raw_emg_channel_1.txt data/raw_emg_channel_2.txt \\
+        --output-dir filtered
+"""
+import argparse
+import os
+
+import numpy as np
+from scipy.signal import butter, iirnotch, sosfilt, sosfilt_zi, tf2sos
+
+from features import CHUNK_SIZE, RAW_FS, iter_txt_chunks
+
+BAND = (20., 500.) # Pass band of surface EMG in Hz
+NOTCH = (50.,) # Mains frequency and harmonics to suppress in Hz
+NOTCH_QUALITY = 30. # Quality factor of the notch filters
+ORDER = 4 # Order of the Butterworth band-pass filter
+
+
+def emg_filter_sos(fs=RAW_FS, band=BAND, notch=NOTCH, quality=NOTCH_QUALITY,
+                   order=ORDER):
+    """Designs a Butterworth band-pass filter followed by notch filters.
+
+    Parameters
+    ----------
+    fs : float (default: RAW_FS)
+        Sampling rate in Hz.
+    band : tuple of float or None (default: BAND)
+        Pass band edges in Hz. If None, there is no band-pass filter.
+    notch : sequence of float (default: NOTCH)
+        Frequencies of notch filters in Hz, e.g. ``(50., 100., 150.)`` to
+        also suppress harmonics. Frequencies at or above the Nyquist
+        frequency are ignored.
+    quality : float (default: NOTCH_QUALITY)
+        Quality factor of the notch filters.
+    order : int (default: ORDER)
+        Order of the band-pass filter.
+
+    Returns
+    -------
+    sos : array, shape=(n_sections, 6)
+        Second-order sections.
+    """
+    sections = []
+    if band is not None:
+        sections.append(butter(order, band, btype='bandpass', fs=fs,
+                               output='sos'))
+    for f0 in notch:
+        if f0 < fs / 2.:
+            b, a = iirnotch(f0 / (fs / 2.), quality)
+            sections.append(tf2sos(b, a))
+    if not sections:
+        raise ValueError("No filter specified.")
+    return np.concatenate(sections)
+
+
+class StreamingFilter(object):
+    """Filters consecutive chunks of a multi-channel recording.
+
+    All channels are filtered in one call; the state of every section and
+    channel is kept between chunks.
+
+    Parameters
+    ----------
+    sos : array, shape=(n_sections, 6) or None (default: None)
+        Second-order sections. If None, ``emg_filter_sos()`` is used.
+    steady_state : bool (default: False)
+        If True, the state is initialised to the steady state of a signal
+        equal to the first sample of each channel, which avoids a start-up
+        transient. If False, it starts at zero, like ``scipy.signal.sosfilt``
+        without ``zi``.
+    """
+    def __init__(self, sos=None, steady_state=False):
+        self.sos = emg_filter_sos() if sos is None else np.asarray(sos)
+        self.steady_state = steady_state
+        self.reset()
+
+    def reset(self):
+        """Forgets the state, e.g. before a new recording."""
+        self._zi = None
+
+    def process(self, chunk):
+        """Filters the next chunk.
+
+        Parameters
+        ----------
+        chunk : array, shape=(n_samples, n_channels) or (n_samples,)
+            Samples. The number of channels must not change between chunks.
+
+        Returns
+        -------
+        filtered : array, same shape as ``chunk``
+            Filtered samples.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        squeeze = chunk.ndim == 1
+        if squeeze:
+            chunk = chunk[:, np.newaxis]
+        if chunk.shape[0] == 0:
+            return chunk[:, 0] if squeeze else chunk
+        if self._zi is None:
+            # State of shape (n_sections, 2, n_channels) for axis 0
+            zi = sosfilt_zi(self.sos)[:, :, np.newaxis]
+            if self.steady_state:
+                self._zi = zi * chunk[0]
+            else:
+                self._zi = np.zeros(zi.shape[:2] + (chunk.shape[1],))
+        elif self._zi.shape[2] != chunk.shape[1]:
+            raise ValueError("Expected {} channels, got {}.".format(
+                self._zi.shape[2], chunk.shape[1]))
+        filtered, self._zi = sosfilt(self.sos, chunk, axis=0, zi=self._zi)
+        return filtered[:, 0] if squeeze else filtered
+
+
+def iter_filtered(chunks, sos=None, steady_state=False):
+    """Filters a stream of sample blocks.
+
+    Parameters
+    ----------
+    chunks : iterable of arrays, shape=(n_samples, n_channels)
+        Stream of sample blocks, e.g. from ``features.iter_txt_chunks``.
+        The output can be passed on to ``features.iter_feature_blocks``.
+    sos, steady_state
+        See ``StreamingFilter``.
+
+    Yields
+    ------
+    filtered : array, shape=(n_samples, n_channels)
+        Filtered block.
+    """
+    stage = StreamingFilter(sos, steady_state=steady_state)
+    for chunk in chunks:
+        yield stage.process(chunk)
+
+
+def filter_txt(paths, output_dir, sos=None, chunk_size=CHUNK_SIZE,
+               steady_state=False):
+    """Filters single-channel text files in lockstep, one chunk at a time.
+
+    Parameters
+    ----------
+    paths : list of str
+        One text file per channel (e.g. ``raw_emg_channel_1.txt``).
+    output_dir : str
+        Directory of the filtered files, which keep the input file names.
+    sos, steady_state
+        See ``StreamingFilter``.
+    chunk_size : int (default: CHUNK_SIZE)
+        Number of samples read at once.
+
+    Returns
+    -------
+    out_paths : list of str
+        Paths of the filtered files.
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    out_paths = [os.path.join(output_dir, os.path.basename(path))
+                 for path in paths]
+    if any(os.path.abspath(out) == os.path.abspath(path)
+           for out, path in zip(out_paths, paths)):
+        raise ValueError("Filtered files would overwrite their sources.")
+    files = [open(out, 'wb') for out in out_paths]
+    try:
+        for block in iter_filtered(iter_txt_chunks(paths, chunk_size),
+                                   sos=sos, steady_state=steady_state):
+            for f, channel in zip(files, block.T):
+                np.savetxt(f, channel)
+    finally:
+        for f in files:
+            f.close()
+    return out_paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Band-pass and notch filter raw EMG text files.")
+    parser.add_argument('paths', nargs='+', help="one text file per channel")
+    parser.add_argument('--output-dir', required=True,
+                        help="directory of the filtered files")
+    parser.add_argument('--band', type=float, nargs=2, default=BAND,
+                        metavar=('LOW', 'HIGH'),
+                        help="pass band in Hz (default: {:g} {:g})".format(
+                            *BAND))
+    parser.add_argument('--notch', type=float, nargs='*', default=NOTCH,
+                        help="notch frequencies in Hz (default: {})".format(
+                            ' '.join('{:g}'.format(f) for f in NOTCH)))
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="samples read at once (default: {})".format(
+                            CHUNK_SIZE))
+    args = parser.parse_args(argv)
+    sos = emg_filter_sos(band=tuple(args.band), notch=args.notch)
+    for path in filter_txt(args.paths, args.output_dir, sos=sos,
+                           chunk_size=args.chunk_size):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Text streams recorded for every real-time session
+SESSION_FILES = {'raw_emg_chan_1': 'raw_emg_channel_1.txt',
+                 'raw_emg_chan_2': 'raw_emg_channel_2.txt',
+                 'pred': 'prediction.txt',
+                 'pred_proba': 'posterior_proba.txt',
+                 'state': 'control_state.txt',
+                 'thresh': 'rejection_thresholds.txt'}
+
+SIDECAR_EXT = '.npy'
+META_EXT = '.npy.json'
+
+
+def _file_hash(path, block_size=1 << 20):
+    """Returns the SHA-1 hex digest of a file, read in blocks."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _write_meta(path, meta):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+
+def _build_sidecar(path, npy_path, dtype):
+    """Parses a text file and writes it to ``npy_path`` atomically."""
+    data = np.loadtxt(path, dtype=dtype)
+    tmp = npy_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, data)
+    os.replace(tmp, npy_path)
+
+
+def load_txt(path, dtype=np.float64, check_hash=False, cache_dir=None):
+    """Loads a numeric text file through a memory-mapped ``.npy`` sidecar.
+
+    The first time a file is read it is parsed with ``np.loadtxt`` and
+    stored in binary form next to the source (or in ``cache_dir``, under a
+    name derived from the absolute path of the source, so that files with
+    the same name in different sessions do not share a sidecar). Later
+    reads return a read-only memory map of the sidecar, so no parsing or
+    copying takes place. The sidecar is rebuilt whenever the size or
+    modification time of the source changes and its content hash no longer
+    matches.
+
+    Parameters
+    ----------
+    path : str
+        Path to the text file.
+    dtype : data-type (default: np.float64)
+        Data type used when parsing the text file.
+    check_hash : bool (default: False)
+        If True, the content hash of the source is verified on every read,
+        even when its size and modification time are unchanged.
+    cache_dir : str or None (default: None)
+        Directory where sidecars are stored. If None, sidecars are stored
+        next to the source file.
+
+    Returns
+    -------
+    data : memmap
+        Read-only memory map with the file contents.
+    """
+    path = os.path.abspath(path)
+    if cache_dir is None:
+        base = path
+    else:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # Sessions share file names, so the directory is part of the key
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        base = os.path.join(cache_dir, '{}-{}'.format(
+            digest, os.path.basename(path)))
+    npy_path = base + SIDECAR_EXT
+    meta_path = base + META_EXT
+
+    st = os.stat(path)
+    meta = _read_meta(meta_path)
+    dtype_str = np.dtype(dtype).str
+    fresh = (meta is not None and os.path.exists(npy_path) and
+             meta.get('dtype') == dtype_str and
+             meta.get('size') == st.st_size and
+             meta.get('mtime_ns') == st.st_mtime_ns)
+
+    if not fresh or check_hash:
+        sha1 = _file_hash(path)
+        if not (meta is not None and os.path.exists(npy_path) and
+                meta.get('dtype') == dtype_str and
+                meta.get('sha1') == sha1):
+            _build_sidecar(path, npy_path, dtype)
+        _write_meta(meta_path, {'size': st.st_size,
+                                'mtime_ns': st.st_mtime_ns,
+                                'sha1': sha1,
+                                'dtype': dtype_str})
+
+    return np.load(npy_path, mmap_mode='r')
+
+
+def load_session(directory, **kwargs):
+    """Loads all text streams of a real-time session.
+
+    Parameters
+    ----------
+    directory : str
+        Directory containing the session files (see ``SESSION_FILES``).
+    **kwargs
+        Passed on to ``load_txt``.
+
+    Returns
+    -------
+    session : dict
+        Memory-mapped arrays keyed as in ``SESSION_FILES``.
+    """
+    return {key: load_txt(os.path.join(directory, fname), **kwargs)
+            for key, fname in SESSION_FILES.items()}
@@ -0,0 +1,397 @@
+"""Replays recorded real-time sessions and measures decision latency.
+
+The raw EMG of a session is streamed in acquisition packets, at the
+recording rate or faster, and every packet goes through the real-time
+pipeline: optional band-pass and notch filtering, windowing into 50 ms
+bins, feature extraction, classification and confidence-based rejection.
+The latency of a decision is the time from the moment the packet completing
+its bin is due (when its last sample is acquired) to the update of the
+prosthesis state, so that delays of the event loop in delivering packets
+count as latency. These delays are also reported separately as producer
+lag. Several sessions can be replayed concurrently on one event loop, each
+with its own source and pipeline, to measure latency under load.
+
+Examples
+--------
+Replay the shipped session in real time:
+
+    python replay.py
+
+Replay four copies of it concurrently at ten times the recording speed:
+
+    python replay.py --sessions 4 --speed 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from controller import StreamingController
+from features import BIN_SIZE, DEFAULT_FEATURES, FEATURES, PROC_FS, RAW_FS
+from filters import StreamingFilter, emg_filter_sos
+from loaders import load_session
+from ring_buffer import RingBuffer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PACKET_SIZE = 20 # Raw samples per acquisition packet (10 ms)
+DEADLINE = 1. / PROC_FS # Latency budget of a decision in seconds
+
+# Edges of latency histograms in seconds, from 10 us to 10 s
+HISTOGRAM_EDGES = np.logspace(-5, 1, 31)
+
+
+class RecordedPosteriors(object):
+    """Classifier returning the posterior probabilities of a recording.
+
+    Stands in for the classifier used during the session, so that a replay
+    reproduces its decisions. Any object with a ``predict_proba`` method
+    (e.g. a fitted ``common.discriminant_analysis.DiscriminantAnalysis``)
+    can be used instead.
+
+    Parameters
+    ----------
+    proba : array, shape=(n_bins, n_classes)
+        Recorded posterior probabilities, one row per decision.
+    """
+    def __init__(self, proba):
+        self.proba = np.asarray(proba)
+        self._next = 0
+
+    def predict_proba(self, X):
+        start, self._next = self._next, self._next + len(X)
+        proba = self.proba[start:self._next]
+        if len(proba) < len(X):
+            raise ValueError("More bins than recorded decisions.")
+        return proba
+
+
+async def stream_packets(emg, queue, speed=1., packet_size=PACKET_SIZE):
+    """Puts packets of a recording on a queue at the acquisition rate.
+
+    Parameters
+    ----------
+    emg : array, shape=(n_samples, n_channels)
+        Raw EMG.
+    queue : asyncio.Queue
+        Receives ``(packet, due_time)`` tuples, followed by None at the end
+        of the recording. Due times are the ``time.perf_counter`` values at
+        which the last sample of each packet is acquired, whenever the
+        packet is actually sent.
+    speed : float or None (default: 1.)
+        Replay speed relative to the recording. If None, packets are sent
+        as fast as they are consumed and are due when they are sent.
+    packet_size : int (default: PACKET_SIZE)
+        Samples per packet.
+
+    Returns
+    -------
+    lag : array, shape=(n_packets,)
+        Producer lag of every packet in seconds: the delay between its due
+        time and the wake-up of the source to send it. Empty if ``speed`` is
+        None.
+    """
+    start = time.perf_counter()
+    lags = []
+    for first in range(0, emg.shape[0], packet_size):
+        packet = np.array(emg[first:first + packet_size])
+        if speed is None:
+            due = time.perf_counter()
+        else:
+            due = start + (first + packet.shape[0]) / (RAW_FS * speed)
+            await asyncio.sleep(max(due - time.perf_counter(), 0.))
+            lags.append(time.perf_counter() - due)
+        await queue.put((packet, due))
+    await queue.put(None)
+    return np.array(lags)
+
+
+async def process_packets(queue, classifier, controller, bin_size=BIN_SIZE,
+                          overlap=0, features=DEFAULT_FEATURES, sos=None):
+    """Runs the decision pipeline on packets taken from a queue.
+
+    Parameters
+    ----------
+    queue : asyncio.Queue
+        Packets from ``stream_packets``.
+    classifier : object
+        Has a ``predict_proba`` method mapping features of shape
+        ``(n_bins, n_features * n_channels)`` to posterior probabilities.
+    controller : StreamingController
+        Confidence-based rejection controller.
+    bin_size, overlap, features
+        See ``features.iter_feature_blocks``.
+    sos : array, shape=(n_sections, 6) or None (default: None)
+        If not None, packets are filtered with these second-order sections
+        before windowing (see ``filters.StreamingFilter``).
+
+    Returns
+    -------
+    result : dict
+        Per-decision arrays ``pred`` and ``state`` and ``latency`` in
+        seconds, measured from the due time of the packet completing each
+        bin.
+    """
+    step = bin_size - overlap
+    if step <= 0 or overlap < 0:
+        raise ValueError("overlap must be in [0, bin_size).")
+    funcs = [FEATURES[name] for name in features]
+    stage = StreamingFilter(sos) if sos is not None else None
+    buffer = None
+    preds, states, latencies = [], [], []
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        packet, due = item
+        if stage is not None:
+            packet = stage.process(packet)
+        if buffer is None:
+            # Room for a bin in progress and a new packet
+            buffer = RingBuffer(bin_size + packet.shape[0],
+                                packet.shape[1], dtype=packet.dtype)
+        if not buffer.write(packet):
+            raise ValueError("Packets must not be larger than the first one.")
+        windows = buffer.windows(bin_size, step)
+        if len(windows) == 0:
+            continue
+        X = np.concatenate([func(windows) for func in funcs], axis=1)
+        buffer.consume(len(windows) * step)
+        proba = classifier.predict_proba(X)
+        states.append(controller.update(proba))
+        done = time.perf_counter()
+        preds.append(np.argmax(proba, axis=1))
+        latencies.append(np.full(len(X), done - due))
+    return {key: np.concatenate(values) if values else np.empty(0)
+            for key, values in [('pred', preds), ('state', states),
+                                ('latency', latencies)]}
+
+
+async def replay_session(session, classifier=None, speed=1.,
+                         packet_size=PACKET_SIZE, max_packets=None,
+                         **kwargs):
+    """Replays one session.
+
+    Parameters
+    ----------
+    session : dict
+        Session streams as returned by ``loaders.load_session``.
+    classifier : object or None (default: None)
+        Classifier with a ``predict_proba`` method. If None, the recorded
+        posteriors are used (see ``RecordedPosteriors``).
+    speed : float or None (default: 1.)
+        Replay speed relative to the recording; None for as fast as
+        possible.
+    packet_size : int (default: PACKET_SIZE)
+        Samples per packet.
+    max_packets : int or None (default: None)
+        Size of the packet queue: the source waits when the pipeline falls
+        this many packets behind. If None, the queue is unbounded, unless
+        ``speed`` is None, in which case packets are sent one at a time.
+    **kwargs
+        Passed on to ``process_packets``.
+
+    Returns
+    -------
+    result : dict
+        See ``process_packets``, with the producer lag of every packet
+        (``lag``, see ``stream_packets``).
+    """
+    emg = np.column_stack([session['raw_emg_chan_1'],
+                           session['raw_emg_chan_2']])
+    if classifier is None:
+        classifier = RecordedPosteriors(session['pred_proba'])
+    controller = StreamingController(session['thresh'])
+    if max_packets is None and speed is None:
+        max_packets = 1
+    queue = asyncio.Queue(maxsize=max_packets or 0)
+    lag, result = await asyncio.gather(
+        stream_packets(emg, queue, speed=speed, packet_size=packet_size),
+        process_packets(queue, classifier, controller, **kwargs))
+    result['lag'] = lag
+    return result
+
+
+def replay_sessions(sessions, classifiers=None, **kwargs):
+    """Replays several sessions concurrently on a new event loop.
+
+    Parameters
+    ----------
+    sessions : list of dict
+        Session streams as returned by ``loaders.load_session``.
+    classifiers : list or None (default: None)
+        One classifier per session; if None, the recorded posteriors are
+        used.
+    **kwargs
+        Passed on to ``replay_session``.
+
+    Returns
+    -------
+    results : list of dict
+        Output of ``replay_session`` for every session.
+    """
+    if classifiers is None:
+        classifiers = [None] * len(sessions)
+
+    async def replay_all():
+        return await asyncio.gather(*[
+            replay_session(session, classifier=classifier, **kwargs)
+            for session, classifier in zip(sessions, classifiers)])
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(replay_all())
+    finally:
+        loop.close()
+
+
+def _percentiles(values):
+    """50th and 99th percentiles, mean and maximum of an array, or NaNs if
+    it is empty."""
+    if values.size == 0:
+        return [np.nan] * 4
+    return list(np.percentile(values, [50, 99])) + [values.mean(),
+                                                    values.max()]
+
+
+def latency_summary(latency, deadline=DEADLINE, edges=HISTOGRAM_EDGES,
+                    lag=None):
+    """Summarises decision latencies.
+
+    Parameters
+    ----------
+    latency : array
+        Latencies in seconds.
+    deadline : float (default: DEADLINE)
+        Latency budget in seconds.
+    edges : array (default: HISTOGRAM_EDGES)
+        Histogram bin edges in seconds; latencies outside them are counted
+        in the first or last bin.
+    lag : array or None (default: None)
+        Producer lag of every packet in seconds (see ``stream_packets``).
+
+    Returns
+    -------
+    summary : dict
+        Number of decisions, 50th and 99th percentiles, mean and maximum
+        latency in seconds, number of decisions later than the deadline and
+        histogram counts. Since latencies count from the due time of the
+        packets, late packets also make decisions late. With ``lag``,
+        ``lag`` holds the same statistics of the producer lag and, as
+        ``missed``, the number of packets sent later than the deadline after
+        they were due.
+    """
+    latency = np.asarray(latency)
+    counts = np.histogram(np.clip(latency, edges[0], edges[-1]),
+                          bins=edges)[0]
+    p50, p99, mean, peak = _percentiles(latency)
+    summary = {'decisions': int(latency.size), 'p50': float(p50),
+               'p99': float(p99), 'mean': float(mean), 'max': float(peak),
+               'deadline': deadline,
+               'missed': int(np.sum(latency > deadline)),
+               'histogram': {'edges': [float(e) for e in edges],
+                             'counts': [int(c) for c in counts]}}
+    if lag is not None:
+        lag = np.asarray(lag)
+        p50, p99, mean, peak = _percentiles(lag)
+        late = int(np.sum(lag > deadline))
+        summary['lag'] = {'packets': int(lag.size), 'p50': float(p50),
+                          'p99': float(p99), 'mean': float(mean),
+                          'max': float(peak), 'missed': late}
+    return summary
+
+
+def format_summary(summary, name):
+    """Formats a latency summary and its histogram as text."""
+    lines = ["{}: {} decisions, p50 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms, "
+             "{} missed deadlines ({:.0f} ms)".format(
+                 name, summary['decisions'], 1e3 * summary['p50'],
+                 1e3 * summary['p99'], 1e3 * summary['max'],
+                 summary['missed'], 1e3 * summary['deadline'])]
+    lag = summary.get('lag')
+    if lag is not None and lag['packets']:
+        lines.append("  producer lag: p50 {:.3f} ms, p99 {:.3f} ms, max "
+                     "{:.3f} ms, {} packets sent after the deadline".format(
+                         1e3 * lag['p50'], 1e3 * lag['p99'],
+                         1e3 * lag['max'], lag['missed']))
+    edges = summary['histogram']['edges']
+    counts = summary['histogram']['counts']
+    scale = 50. / max(max(counts), 1)
+    for low, high, count in zip(edges[:-1], edges[1:], counts):
+        if count:
+            lines.append("  {:>9.3f}-{:<9.3f} ms {:>7d} {}".format(
+                1e3 * low, 1e3 * high, count,
+                '#' * int(np.ceil(count * scale))))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay real-time sessions and measure decision "
+        "latency.")
+    parser.add_argument('directories', nargs='*',
+                        default=[os.path.join(HERE, 'data')],
+                        help="session directories (default: the shipped "
+                        "session)")
+    parser.add_argument('--sessions', type=int, default=1,
+                        help="concurrent copies of every session "
+                        "(default: 1)")
+    parser.add_argument('--speed', type=float, default=1.,
+                        help="replay speed relative to the recording; 0 for "
+                        "as fast as possible (default: 1)")
+    parser.add_argument('--packet-size', type=int, default=PACKET_SIZE,
+                        help="samples per packet (default: {})".format(
+                            PACKET_SIZE))
+    parser.add_argument('--filter', action='store_true',
+                        help="band-pass and notch filter the raw EMG "
+                        "(changes the features but not the recorded "
+                        "posteriors)")
+    parser.add_argument('--deadline', type=float, default=1e3 * DEADLINE,
+                        help="latency budget in ms (default: {:.0f})".format(
+                            1e3 * DEADLINE))
+    parser.add_argument('--output', default=None,
+                        help="path of a JSON file with the latency "
+                        "summaries")
+    args = parser.parse_args(argv)
+
+    names, sessions = [], []
+    for directory in args.directories:
+        session = load_session(directory)
+        for copy in range(args.sessions):
+            names.append('{} #{}'.format(directory, copy + 1))
+            sessions.append(session)
+    results = replay_sessions(sessions, speed=args.speed or None,
+                              packet_size=args.packet_size,
+                              sos=emg_filter_sos() if args.filter else None)
+
+    deadline = args.deadline / 1e3
+    summaries = {}
+    for name, session, result in zip(names, sessions, results):
+        n = result['state'].size
+        matches = np.array_equal(result['state'],
+                                 np.asarray(session['state'][:n]))
+        summaries[name] = latency_summary(result['latency'], deadline,
+                                          lag=result['lag'])
+        summaries[name]['matches_recording'] = matches
+        print(format_summary(summaries[name], name))
+        print("  control states {} the recording".format(
+            'match' if matches else 'differ from'))
+    if len(results) > 1:
+        summaries['all'] = latency_summary(
+            np.concatenate([r['latency'] for r in results]), deadline,
+            lag=np.concatenate([r['lag'] for r in results]))
+        print(format_summary(summaries['all'], 'all sessions'))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(summaries, f, indent=2)
+    # Fail on late decisions or on packets sent after the deadline
+    return int(any(s['missed'] or s['lag']['missed']
+                   for s in summaries.values()))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Fixed-capacity sample buffer for real-time windowing."""
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+class RingBuffer(object):
+    """Preallocated multi-channel ring buffer with contiguous window views.
+
+    Samples are stored twice, in two consecutive copies of the ring, so that
+    any run of up to ``capacity`` unread samples is contiguous in memory and
+    can be returned as a view, whatever its position in the ring. Writing
+    costs two copies of every block; reading never copies and nothing is
+    allocated after construction (apart from the views themselves).
+
+    One producer thread may call ``write`` while one consumer thread calls
+    the reading methods and ``consume``. The producer only writes to free
+    space and the consumer only frees samples it has finished with, and each
+    side publishes its position after touching the data, so views returned
+    to the consumer are never overwritten until it calls ``consume``.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of unread samples.
+    n_channels : int
+        Number of channels.
+    dtype : data-type (default: np.float64)
+        Data type of the samples.
+
+    Attributes
+    ----------
+    overruns : int
+        Number of blocks rejected by ``write`` for lack of space.
+    """
+    def __init__(self, capacity, n_channels, dtype=np.float64):
+        if capacity < 1 or n_channels < 1:
+            raise ValueError("capacity and n_channels must be positive.")
+        self.capacity = capacity
+        self.n_channels = n_channels
+        self._buf = np.zeros((2 * capacity, n_channels), dtype=dtype)
+        # Total samples written and consumed; only the producer changes
+        # _written and only the consumer changes _consumed
+        self._written = 0
+        self._consumed = 0
+        self.overruns = 0
+
+    def __len__(self):
+        """Number of unread samples."""
+        return self._written - self._consumed
+
+    @property
+    def free(self):
+        """Number of samples that can be written."""
+        return self.capacity - len(self)
+
+    def write(self, block):
+        """Appends a block of samples, unless there is not enough space.
+
+        Parameters
+        ----------
+        block : array, shape=(n_samples, n_channels) or (n_samples,)
+            Samples; one-dimensional blocks are single-channel.
+
+        Returns
+        -------
+        written : bool
+            False if the block does not fit in the free space, in which case
+            nothing is written and ``overruns`` is incremented.
+        """
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        n = block.shape[0]
+        if n > self.capacity - (self._written - self._consumed):
+            self.overruns += 1
+            return False
+        cap = self.capacity
+        start = self._written % cap
+        first = min(n, cap - start)
+        buf = self._buf
+        buf[start:start + first] = block[:first]
+        buf[cap + start:cap + start + first] = block[:first]
+        if first < n:
+            buf[:n - first] = block[first:]
+            buf[cap:cap + n - first] = block[first:]
+        self._written += n
+        return True
+
+    def peek(self, n, offset=0):
+        """Returns a view of unread samples, without consuming them.
+
+        Parameters
+        ----------
+        n : int
+            Number of samples.
+        offset : int (default: 0)
+            Number of unread samples skipped.
+
+        Returns
+        -------
+        samples : array, shape=(n, n_channels) or None
+            Read-only view, valid until the samples are consumed. None if
+            fewer than ``offset + n`` samples are unread.
+        """
+        if offset + n > self._written - self._consumed:
+            return None
+        start = (self._consumed + offset) % self.capacity
+        view = self._buf[start:start + n]
+        view.flags.writeable = False
+        return view
+
+    def windows(self, window_size, step=None):
+        """Returns all complete windows of the unread samples.
+
+        Parameters
+        ----------
+        window_size : int
+            Samples per window.
+        step : int or None (default: None)
+            Samples between the starts of consecutive windows; defaults to
+            ``window_size`` (no overlap).
+
+        Returns
+        -------
+        windows : array, shape=(n_windows, window_size, n_channels)
+            Read-only strided view, valid until the samples are consumed.
+            Call ``consume(n_windows * step)`` once the windows have been
+            processed; samples still needed by the next window are kept.
+        """
+        step = step or window_size
+        if window_size > self.capacity or not 0 < step <= window_size:
+            raise ValueError("window_size must not exceed the capacity and "
+                             "step must be in (0, window_size].")
+        available = self._written - self._consumed
+        n_windows = max((available - window_size) // step + 1, 0)
+        view = self.peek(available) if n_windows else self._buf[:0]
+        s0, s1 = self._buf.strides
+        return as_strided(view, shape=(n_windows, window_size,
+                                       self.n_channels),
+                          strides=(step * s0, s0, s1), writeable=False)
+
+    def consume(self, n):
+        """Frees the oldest ``n`` unread samples for writing."""
+        if not 0 <= n <= self._written - self._consumed:
+            raise ValueError("Cannot consume more samples than are unread.")
+        self._consumed += n
@@ -1,6 +1,17 @@
+import os
+import sys
+
 from matplotlib.legend_handler import HandlerPatch
 import matplotlib.patches as mpatches
 
+_ROOT = os.path.normpath(os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), os.pardir))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from common.instrumentation import stage
+from common.plotting import plot_decimated
+
 # Define an ellipse handler for legends
 class HandlerEllipse(HandlerPatch):
     def create_artists(self, legend, orig_handle,